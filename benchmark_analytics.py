@@ -0,0 +1,303 @@
+"""Scaling benchmarks for the headless analytics on synthetic sales data
+
+Usage:
+    python benchmark_analytics.py                       # 20k, 1M and 10M rows
+    python benchmark_analytics.py --rows 20000 1000000 --json results.json
+    python benchmark_analytics.py --baseline results.json --tolerance 0.25
+    python benchmark_analytics.py --write-csv synthetic.csv --rows 1000000
+    python benchmark_analytics.py --rows 10000000 --workers 1 2 4 8 16 32   # parallel scaling
+"""
+import argparse
+import itertools
+import json
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import sales_analytics as analytics
+from cohorts import cohort_matrices
+from crosstab import crosstab
+from rollups import SalesRollups
+from sales_cube import build_sales_cube, cube_kpis
+from sales_data import CustomerDimension, clean_column_name, prepare_sales_data
+from sketches import SalesSketches
+
+DEFAULT_ROWS = [20_000, 1_000_000, 10_000_000]
+
+# Original CSV header, in file order
+CSV_HEADER = ['Customer ID', 'Age', 'Gender', 'Loyalty Member', 'Product Type', 'SKU', 'Rating',
+              'Order Status', 'Payment Method', 'Total Price', 'Unit Price', 'Quantity',
+              'Purchase Date', 'Shipping Type', 'Add-ons Purchased', 'Add-on Total']
+
+# Distributions measured on Electronic_sales_Sep2023-Sep2024.csv
+SKU_CATALOG = [  # (product_type, sku, unit_price, share of orders)
+    ('Smartphone', 'SKU1004', 791.19, 0.101), ('Smartphone', 'SMP234', 1139.68, 0.099),
+    ('Smartphone', 'SKU1001', 20.75, 0.099), ('Tablet', 'TBL345', 786.41, 0.103),
+    ('Tablet', 'SKU1002', 247.03, 0.102), ('Laptop', 'SKU1005', 463.96, 0.100),
+    ('Laptop', 'LTP123', 674.32, 0.098), ('Smartwatch', 'SWT567', 459.50, 0.099),
+    ('Smartwatch', 'SKU1003', 844.83, 0.098), ('Headphones', 'HDP456', 361.18, 0.101),
+]
+RATING_SHARES = [0.103, 0.199, 0.398, 0.102, 0.198]
+PAYMENT_SHARES = {'Credit Card': 0.293, 'Bank Transfer': 0.169, 'PayPal': 0.164,
+                  'Paypal': 0.126, 'Cash': 0.125, 'Debit Card': 0.123}
+SHIPPING_SHARES = {'Standard': 0.336, 'Express': 0.168, 'Overnight': 0.168,
+                   'Same Day': 0.164, 'Expedited': 0.164}
+ADDON_TYPES = ['Accessory', 'Impulse Item', 'Extended Warranty']
+COMPLETED_SHARE = 0.672
+LOYALTY_SHARE = 0.217
+ORDERS_PER_CUSTOMER = 1.65
+DATE_RANGE = ('2023-09-24', '2024-09-23')
+
+
+def _choice(rng, values, n, p=None):
+    """Categorical column of ``n`` draws from ``values``"""
+    return pd.Categorical.from_codes(rng.choice(len(values), n, p=p), list(values))
+
+
+def generate_raw_sales(n_rows, seed=0):
+    """Synthetic orders with the CSV's schema (cleaned names) and value distributions"""
+    rng = np.random.default_rng(seed)
+
+    # Customers place a geometric number of orders; demographics are per customer
+    n_customers = max(1, int(n_rows / ORDERS_PER_CUSTOMER))
+    orders = rng.geometric(1 / ORDERS_PER_CUSTOMER, n_customers)
+    customer = np.repeat(np.arange(n_customers), orders)[:n_rows]
+    if len(customer) < n_rows:
+        customer = np.concatenate([customer, rng.integers(0, n_customers, n_rows - len(customer))])
+    customer = rng.permutation(customer)
+    ages = rng.integers(18, 81, n_customers)
+    genders = rng.choice(2, n_customers, p=[0.508, 0.492])
+
+    product_types = list(dict.fromkeys(s[0] for s in SKU_CATALOG))
+    product_codes = np.array([product_types.index(s[0]) for s in SKU_CATALOG])
+    shares = np.array([s[3] for s in SKU_CATALOG])
+    catalog = rng.choice(len(SKU_CATALOG), n_rows, p=shares / shares.sum())
+    unit_price = np.array([s[2] for s in SKU_CATALOG])[catalog]
+    quantity = rng.integers(1, 11, n_rows)
+
+    # Each order carries 0-3 add-on items; the list text is picked from every
+    # possible ordered combination, so no per-row string building is needed
+    combos = [combo for k in range(1, 4) for combo in itertools.product(ADDON_TYPES, repeat=k)]
+    offsets = np.array([-1, 0, 3, 12])
+    n_addons = rng.integers(0, 4, n_rows)
+    digits = rng.integers(0, len(ADDON_TYPES), (n_rows, 3))
+    combo_codes = np.zeros(n_rows, dtype=np.int64)
+    for i in range(3):
+        combo_codes = np.where(n_addons > i, combo_codes * len(ADDON_TYPES) + digits[:, i], combo_codes)
+    addon_lists = pd.Categorical.from_codes(np.where(n_addons > 0, offsets[n_addons] + combo_codes, -1),
+                                            [','.join(combo) for combo in combos])
+    addon_total = np.round(rng.uniform(0, 33.33, n_rows) * n_addons, 2)
+
+    days = pd.date_range(*DATE_RANGE).strftime('%Y-%m-%d')
+
+    return pd.DataFrame({
+        'customer_id': customer + 1000,
+        'age': ages[customer],
+        'gender': pd.Categorical.from_codes(genders[customer], ['Male', 'Female']),
+        'loyalty_member': pd.Categorical.from_codes((rng.random(n_rows) < LOYALTY_SHARE).astype(np.int8),
+                                                    ['No', 'Yes']),
+        'product_type': pd.Categorical.from_codes(product_codes[catalog], product_types),
+        'sku': pd.Categorical.from_codes(catalog, [s[1] for s in SKU_CATALOG]),
+        'rating': rng.choice(np.arange(1, 6), n_rows, p=RATING_SHARES),
+        'order_status': pd.Categorical.from_codes((rng.random(n_rows) < COMPLETED_SHARE).astype(np.int8),
+                                                  ['Cancelled', 'Completed']),
+        'payment_method': _choice(rng, PAYMENT_SHARES, n_rows, list(PAYMENT_SHARES.values())),
+        'total_price': np.round(unit_price * quantity, 2),
+        'unit_price': unit_price,
+        'quantity': quantity,
+        'purchase_date': _choice(rng, days, n_rows),
+        'shipping_type': _choice(rng, SHIPPING_SHARES, n_rows, list(SHIPPING_SHARES.values())),
+        'add_ons_purchased': addon_lists,
+        'add_on_total': addon_total,
+    })
+
+
+def generate_sales_data(n_rows, seed=0):
+    """Synthetic orders prepared exactly like load_sales_data() output"""
+    raw = generate_raw_sales(n_rows, seed)
+    for col in ['gender', 'loyalty_member', 'product_type', 'sku', 'order_status',
+                'payment_method', 'shipping_type', 'add_ons_purchased', 'purchase_date']:
+        raw[col] = raw[col].astype('category')
+    for col in ['customer_id', 'age', 'rating', 'quantity']:
+        raw[col] = pd.to_numeric(raw[col], downcast='integer')
+    return prepare_sales_data(raw)
+
+
+def _seasonal_multipliers(df):
+    daily = analytics.daily_revenue(analytics.completed_orders(df))
+    return analytics.seasonal_multipliers(analytics.season_totals(daily))
+
+
+# Each benchmark runs one dashboard computation end to end from the order frame
+BENCHMARKS = {
+    'kpis': analytics.kpis,
+    'product_summary': analytics.product_summary,
+    'top_customers': lambda df: analytics.top_customers(
+        analytics.customer_metrics(analytics.completed_orders(df))),
+    'sku_performance': lambda df: analytics.sku_performance(analytics.completed_orders(df), n=15),
+    'addon_analysis': analytics.addon_analysis,
+    'addon_type_summary': analytics.addon_type_summary,
+    'customer_lifetime_value': lambda df: analytics.customer_lifetime_value(
+        analytics.customer_metrics(analytics.completed_orders(df))),
+    'cohort_matrices': lambda df: cohort_matrices(analytics.completed_orders(df)),
+    'customer_dimension': lambda df: CustomerDimension.from_orders(df).completed_metrics(),
+    'conversion_rates': analytics.conversion_rates,
+    'seasonal_multipliers': _seasonal_multipliers,
+    'revenue_heatmap': lambda df: analytics.revenue_heatmap(analytics.completed_orders(df)),
+    'crosstab': lambda df: crosstab(df, 'age_group', 'payment_method', value='total_price'),
+    'build_sales_cube': build_sales_cube,
+    'build_rollups': SalesRollups,
+    'build_sketches': SalesSketches,
+}
+
+# Benchmarks that take the cube rather than raw orders
+CUBE_BENCHMARKS = {
+    'cube_kpis': cube_kpis,
+}
+
+# Benchmarks with a parallel mode, taking the order frame and a worker count (see parallel_agg)
+PARALLEL_BENCHMARKS = {
+    'top_customers': lambda df, workers: analytics.top_customers(
+        analytics.customer_metrics(analytics.completed_orders(df), workers)),
+    'sku_performance': lambda df, workers: analytics.sku_performance(analytics.completed_orders(df), n=15,
+                                                                     workers=workers),
+    'customer_lifetime_value': lambda df, workers: analytics.customer_lifetime_value(
+        analytics.customer_metrics(analytics.completed_orders(df), workers)),
+    'customer_dimension': lambda df, workers: CustomerDimension.from_orders(df, workers).fields,
+}
+
+
+def measure(func, arg, repeat=3):
+    """Best wall time over ``repeat`` runs, plus peak traced memory of one run"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak
+
+
+def run_benchmarks(row_counts, repeat=3, seed=0, only=None):
+    """Time every benchmark at each dataset size; returns a list of result dicts"""
+    results = []
+    for n_rows in row_counts:
+        df = generate_sales_data(n_rows, seed)
+        cube = build_sales_cube(df)
+        suites = [(BENCHMARKS, df), (CUBE_BENCHMARKS, cube)]
+        for benchmarks, arg in suites:
+            for name, func in benchmarks.items():
+                if only and name not in only:
+                    continue
+                seconds, peak = measure(func, arg, repeat)
+                results.append({'name': name, 'rows': n_rows, 'seconds': seconds, 'peak_bytes': peak})
+                print(f"{name:26s} {n_rows:>12,} rows  {seconds * 1000:10.1f} ms  {peak / 2 ** 20:9.1f} MiB peak",
+                      flush=True)
+        del df, cube
+    return results
+
+
+def identical(left, right):
+    """Whether two benchmark results are exactly equal, NaNs in the same places included"""
+    if isinstance(left, (pd.DataFrame, pd.Series)):
+        return left.equals(right) and left.index.equals(right.index)
+    if isinstance(left, np.ndarray):
+        return np.array_equal(left, right, equal_nan=left.dtype.kind == 'f')
+    if isinstance(left, dict):
+        return left.keys() == right.keys() and all(identical(left[k], right[k]) for k in left)
+    if isinstance(left, (tuple, list)):
+        return len(left) == len(right) and all(identical(a, b) for a, b in zip(left, right))
+    return left == right or (left != left and right != right)
+
+
+def run_scaling(row_counts, worker_counts, repeat=3, seed=0, only=None):
+    """Time every parallel benchmark at each dataset size and worker count
+
+    Each result records throughput, the speedup over one worker and whether
+    the output is identical to the serial one.
+    """
+    results = []
+    for n_rows in row_counts:
+        df = generate_sales_data(n_rows, seed)
+        for name, func in PARALLEL_BENCHMARKS.items():
+            if only and name not in only:
+                continue
+            serial = func(df, 1)
+            serial_seconds = None
+            for workers in worker_counts:
+                # The first run also starts the worker pool, so it is not timed
+                same = identical(serial, func(df, workers))
+                seconds, peak = measure(lambda arg: func(arg, workers), df, repeat)
+                serial_seconds = serial_seconds or (seconds if workers == 1 else None)
+                speedup = serial_seconds / seconds if serial_seconds else None
+                results.append({'name': name, 'rows': n_rows, 'workers': workers, 'seconds': seconds,
+                                'rows_per_second': n_rows / seconds, 'speedup': speedup, 'identical': same,
+                                'peak_bytes': peak})
+                print(f"{name:26s} {n_rows:>12,} rows  {workers:3d} workers  {seconds * 1000:10.1f} ms  "
+                      f"{n_rows / seconds / 1e6:8.2f} M rows/s  "
+                      f"{f'{speedup:5.2f}x' if speedup else '     -'}  {'identical' if same else 'MISMATCH'}",
+                      flush=True)
+        del df
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Names of benchmarks slower than the baseline by more than ``tolerance``"""
+    previous = {(r['name'], r['rows'], r.get('workers')): r['seconds'] for r in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result['name'], result['rows'], result.get('workers')))
+        if before and result['seconds'] > before * (1 + tolerance):
+            workers = f" x {result['workers']} workers" if result.get('workers') else ""
+            regressions.append(f"{result['name']} @ {result['rows']:,} rows{workers}: "
+                               f"{before * 1000:.1f} ms -> {result['seconds'] * 1000:.1f} ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS, help="dataset sizes to run")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per benchmark (best is reported)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='+', help="run only these benchmarks")
+    parser.add_argument('--json', help="write results to this JSON file")
+    parser.add_argument('--baseline', help="fail if slower than the results in this JSON file")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown vs baseline")
+    parser.add_argument('--write-csv', help="write a synthetic CSV of --rows[0] rows instead of benchmarking")
+    parser.add_argument('--workers', type=int, nargs='+',
+                        help="run the parallel benchmarks at these worker counts instead (include 1 for speedups)")
+    args = parser.parse_args(argv)
+
+    if args.write_csv:
+        raw = generate_raw_sales(args.rows[0], args.seed)
+        raw.columns = [dict((clean_column_name(h), h) for h in CSV_HEADER)[c] for c in raw.columns]
+        raw.to_csv(args.write_csv, index=False)
+        return 0
+
+    if args.workers:
+        results = run_scaling(args.rows, args.workers, args.repeat, args.seed, args.only)
+        if not all(r['identical'] for r in results):
+            return 1
+    else:
+        results = run_benchmarks(args.rows, args.repeat, args.seed, args.only)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,350 @@
+"""Batched, resumable bulk loader for the sales table with deferred index builds
+
+The CSV is streamed in chunks. Each chunk is validated (ENUM columns coerced
+to their canonical spelling, required fields and numbers checked) and inserted
+in one transaction together with the loader's progress, so an interrupted load
+resumes from the last committed chunk. Secondary indexes are captured from the
+catalog and dropped before the load, then rebuilt once at the end instead of
+being maintained row by row. Rows that fail validation go to a rejects CSV
+with the reason.
+
+Backends: SQLite (the relaxed schema of sql_engine.py; new database files are
+created) and MySQL via the optional pymysql package (the table from
+Electronic_sales_database.sql, whose ENUMs are enforced).
+
+Usage:
+    python bulk_loader.py                                   # CSV into sales.db
+    python bulk_loader.py --csv big.csv --db big.db --chunk-size 200000
+    MYSQL_PWD=... python bulk_loader.py --backend mysql --host db01 --user loader --database electronic_sales_db
+    python bulk_loader.py --restart                         # ignore an unfinished load and start over
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+
+import pandas as pd
+
+try:
+    import pymysql
+    HAS_PYMYSQL = True
+except ImportError:
+    HAS_PYMYSQL = False
+
+from sales_data import DATA_FILE
+from sql_engine import (DB_FILE, NULL_VALUES, SALES_INDEXES, SALES_TABLE, chunk_rows, connect,
+                        invalidate_summaries, record_source, source_meta, sql_column_names)
+
+CHUNK_SIZE = 100_000  # Rows per chunk, and per transaction
+REJECTS_FILE = 'sales_rejects.csv'
+STATE_TABLE = 'bulk_load_state'
+
+# ENUM columns of the sales table in Electronic_sales_database.sql
+ENUM_COLUMNS = {
+    'gender': ['Male', 'Female'],
+    'loyalty_member': ['Yes', 'No'],
+    'order_status': ['Completed', 'Cancelled'],
+    'payment_method': ['Credit Card', 'Paypal', 'Cash', 'Debit Card'],
+    'shipping_type': ['Standard', 'Express', 'Overnight'],
+}
+# Column defaults applied to missing values, as the schema would
+COLUMN_DEFAULTS = {'loyalty_member': 'No', 'quantity': 1, 'addon_total': 0}
+INTEGER_COLUMNS = ['customer_id', 'age', 'rating', 'quantity']
+DECIMAL_COLUMNS = ['total_price', 'unit_price', 'addon_total']
+REQUIRED_COLUMNS = ['customer_id', 'product_type', 'sku', 'order_status', 'payment_method', 'total_price',
+                    'unit_price', 'purchase_date', 'shipping_type']
+
+
+def clean_chunk(chunk, enums, strict_enums):
+    """Typed rows ready to insert, plus the rejected raw rows with a ``reject_reason``
+
+    ``chunk`` holds the raw CSV text under SQL column names. ENUM values are
+    matched ignoring case and surrounding spaces and stored in their canonical
+    spelling; with ``strict_enums`` a value outside the ENUM (or a missing one)
+    rejects the row, otherwise it is kept as is.
+    """
+    clean = chunk.copy()
+    reasons = pd.Series('', index=chunk.index, dtype=object)
+
+    def reject(mask, reason):
+        reasons[mask & (reasons == '')] = reason
+
+    for col, default in COLUMN_DEFAULTS.items():
+        clean[col] = clean[col].fillna(default)
+    for col, members in enums.items():
+        text = clean[col].str.strip()
+        canonical = text.str.casefold().map({member.casefold(): member for member in members})
+        if strict_enums:
+            reject(canonical.isna(), f"{col} not in ENUM")
+            clean[col] = canonical
+        else:
+            clean[col] = canonical.fillna(text)
+    for col in INTEGER_COLUMNS + DECIMAL_COLUMNS:
+        values = pd.to_numeric(clean[col], errors='coerce')
+        reject(values.isna() & clean[col].notna(), f"{col} is not a number")
+        if col in INTEGER_COLUMNS:
+            reject(values.notna() & (values % 1 != 0), f"{col} is not an integer")
+            values = values.where(values % 1 == 0).astype('Int64')
+        clean[col] = values
+    dates = pd.to_datetime(clean['purchase_date'], format='%Y-%m-%d', errors='coerce')
+    reject(dates.isna() & clean['purchase_date'].notna(), "purchase_date is not a YYYY-MM-DD date")
+    clean['purchase_date'] = dates.dt.strftime('%Y-%m-%d')
+    for col in REQUIRED_COLUMNS:
+        reject(clean[col].isna(), f"{col} is missing")
+
+    rejected = (reasons != '').to_numpy()
+    return clean[~rejected], chunk[rejected].assign(reject_reason=reasons[rejected])
+
+
+class _Backend:
+    """Load-state bookkeeping shared by the backends; subclasses set ``placeholder``"""
+
+    def state(self):
+        """Saved state of the last load, or None"""
+        self.execute(f'CREATE TABLE IF NOT EXISTS {STATE_TABLE} (id INT PRIMARY KEY, state TEXT)')
+        rows = self.execute(f'SELECT state FROM {STATE_TABLE} WHERE id = 1')
+        self.commit()
+        return json.loads(rows[0][0]) if rows else None
+
+    def save_state(self, state):
+        """Store the load state in the open transaction, so it commits with the chunk"""
+        self.execute(f'DELETE FROM {STATE_TABLE} WHERE id = 1')
+        self.execute(f'INSERT INTO {STATE_TABLE} (id, state) VALUES (1, {self.placeholder})', (json.dumps(state),))
+
+    def insert(self, columns, rows):
+        """Batched insert into the open transaction"""
+        marks = ', '.join([self.placeholder] * len(columns))
+        self.executemany(f"INSERT INTO sales ({', '.join(columns)}) VALUES ({marks})", rows)
+
+
+class SQLiteBackend(_Backend):
+    """SQLite database with sql_engine's relaxed schema (ENUMs stored as TEXT)"""
+
+    placeholder = '?'
+    strict_enums = False
+
+    def __init__(self, path=DB_FILE):
+        self.conn = connect(path)
+        # Commits survive a crashed process; only an OS crash can lose the last one
+        self.conn.execute('PRAGMA synchronous = NORMAL')
+        self.conn.execute('PRAGMA cache_size = -262144')
+
+    def execute(self, sql, params=()):
+        return self.conn.execute(sql, params).fetchall()
+
+    def executemany(self, sql, rows):
+        self.conn.executemany(sql, rows)
+
+    def commit(self):
+        self.conn.commit()
+
+    def enum_domains(self):
+        """The schema script's ENUM members; the TEXT columns accept others too"""
+        return ENUM_COLUMNS
+
+    def reset_table(self):
+        """Empty the sales table without its secondary indexes; returns their DDL to rebuild"""
+        indexes = self.execute("SELECT name, sql FROM sqlite_master "
+                               "WHERE type = 'index' AND tbl_name = 'sales' AND sql IS NOT NULL")
+        if not self.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sales'"):
+            indexes = [(name, f'CREATE INDEX {name} ON sales({cols})') for name, cols in SALES_INDEXES.items()]
+        # Recreating the table is much faster than deleting every row
+        self.execute('DROP TABLE IF EXISTS sales')
+        self.execute(SALES_TABLE)
+        self.commit()
+        return [list(index) for index in indexes]
+
+    def build_indexes(self, indexes):
+        for _, sql in indexes:
+            self.execute(sql)
+        self.commit()
+
+    def finish(self, source):
+        """Record the source so sql_engine.ensure_loaded treats the database as fresh
+
+        The summary tables' watermark is dropped: they summarize the old rows.
+        """
+        record_source(self.conn, source)
+        invalidate_summaries(self.conn)
+        self.commit()
+        self.execute('ANALYZE')
+
+    def close(self):
+        self.conn.close()
+
+
+class MySQLBackend(_Backend):
+    """MySQL table created by Electronic_sales_database.sql, ENUMs enforced"""
+
+    placeholder = '%s'
+    strict_enums = True
+
+    def __init__(self, host='localhost', user=None, password=None, database='electronic_sales_db', port=3306):
+        if not HAS_PYMYSQL:
+            raise ImportError("The MySQL backend needs the pymysql package")
+        self.conn = pymysql.connect(host=host, port=port, user=user, password=password, database=database,
+                                    autocommit=False)
+        # Checks the load doesn't need: the data is validated and the table has no foreign keys
+        self.execute('SET SESSION unique_checks = 0, foreign_key_checks = 0')
+
+    def execute(self, sql, params=()):
+        with self.conn.cursor() as cursor:
+            cursor.execute(sql, params or None)
+            return cursor.fetchall()
+
+    def executemany(self, sql, rows):
+        # pymysql rewrites this into multi-row INSERT statements
+        with self.conn.cursor() as cursor:
+            cursor.executemany(sql, rows)
+
+    def commit(self):
+        self.conn.commit()
+
+    def enum_domains(self):
+        """ENUM members as declared by the live table"""
+        rows = self.execute("SELECT column_name, column_type FROM information_schema.columns "
+                            "WHERE table_schema = DATABASE() AND table_name = 'sales' AND data_type = 'enum'")
+        return {name: [member.replace("''", "'") for member in re.findall(r"'((?:[^']|'')*)'", column_type)]
+                for name, column_type in rows}
+
+    def reset_table(self):
+        """Truncate the sales table and drop its secondary indexes; returns their DDL to rebuild"""
+        rows = self.execute("SELECT index_name, non_unique, column_name FROM information_schema.statistics "
+                            "WHERE table_schema = DATABASE() AND table_name = 'sales' AND index_name <> 'PRIMARY' "
+                            "ORDER BY index_name, seq_in_index")
+        if not rows and not self.execute("SHOW TABLES LIKE 'sales'"):
+            raise RuntimeError("No sales table; run the CREATE TABLE from Electronic_sales_database.sql first")
+        columns, unique = {}, {}
+        for name, non_unique, column in rows:
+            columns.setdefault(name, []).append(column)
+            unique[name] = not int(non_unique)
+        self.execute('TRUNCATE TABLE sales')
+        if columns:
+            self.execute('ALTER TABLE sales ' + ', '.join(f'DROP INDEX {name}' for name in columns))
+        self.commit()
+        return [[name, f"CREATE {'UNIQUE ' if unique[name] else ''}INDEX {name} ON sales ({', '.join(cols)})"]
+                for name, cols in columns.items()]
+
+    def build_indexes(self, indexes):
+        # One ALTER builds every index in a single pass over the table
+        if indexes:
+            adds = [re.sub(r'^CREATE (UNIQUE )?INDEX (\w+) ON sales ', r'ADD \1INDEX \2 ', sql) for _, sql in indexes]
+            self.execute('ALTER TABLE sales ' + ', '.join(adds))
+        self.commit()
+
+    def finish(self, source):
+        """Refresh table statistics and make the next refresh_sales_summaries() rebuild"""
+        if self.execute("SHOW TABLES LIKE 'summary_refresh'"):
+            self.execute('DELETE FROM summary_refresh')
+        self.execute('ANALYZE TABLE sales')
+        self.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def _truncate(path, size):
+    """Cut a rejects file back to ``size`` bytes (what the last committed chunk left)"""
+    if os.path.exists(path):
+        with open(path, 'r+b') as f:
+            f.truncate(size)
+
+
+def bulk_load(backend, path=DATA_FILE, chunk_size=CHUNK_SIZE, rejects_path=REJECTS_FILE, restart=False,
+              log=sys.stderr):
+    """Load the CSV into the backend's sales table, resuming an unfinished load of the same file
+
+    Returns a summary dict: rows loaded and rejected, load and index build
+    seconds, and rows per second over the whole run.
+    """
+    source = source_meta(path)
+    state = None if restart else backend.state()
+    resuming = (state is not None and state['status'] == 'loading' and state['source'] == source
+                and state['chunk_size'] == chunk_size)
+    if resuming:
+        _truncate(rejects_path, state['rejects_bytes'])
+        print(f"Resuming after chunk {state['chunks']:,} ({state['rows']:,} rows)", file=log)
+    else:
+        indexes = backend.reset_table()
+        state = {'status': 'loading', 'source': source, 'chunk_size': chunk_size, 'chunks': 0, 'rows': 0,
+                 'rejected': 0, 'rejects_bytes': 0, 'indexes': indexes}
+        _truncate(rejects_path, 0)
+        backend.save_state(state)
+        backend.commit()
+        print(f"Dropped {len(indexes)} secondary indexes for the load", file=log)
+
+    enums = backend.enum_domains()
+    start = time.perf_counter()
+    rows_this_run = 0
+    # Every field is read as text so rejects keep what the file said
+    chunks = pd.read_csv(path, dtype=str, keep_default_na=False, na_values=NULL_VALUES, chunksize=chunk_size,
+                         skiprows=range(1, 1 + state['chunks'] * chunk_size))
+    with open(rejects_path, 'a', newline='') as rejects_file:
+        rejects = csv.writer(rejects_file)
+        for chunk in chunks:
+            chunk.columns = sql_column_names(chunk.columns)
+            clean, rejected = clean_chunk(chunk, enums, backend.strict_enums)
+            backend.insert(list(clean.columns), chunk_rows(clean))
+            if len(rejected):
+                if state['rejects_bytes'] == 0:
+                    rejects.writerow(rejected.columns)
+                rejects.writerows(rejected.fillna('').itertuples(index=False))
+            rejects_file.flush()
+
+            state.update(chunks=state['chunks'] + 1, rows=state['rows'] + len(clean),
+                         rejected=state['rejected'] + len(rejected), rejects_bytes=rejects_file.tell())
+            backend.save_state(state)
+            backend.commit()
+            rows_this_run += len(chunk)
+            elapsed = time.perf_counter() - start
+            print(f"chunk {state['chunks']:,}: {state['rows']:,} rows loaded, {state['rejected']:,} rejected, "
+                  f"{rows_this_run / elapsed:,.0f} rows/s", file=log)
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    backend.build_indexes(state['indexes'])
+    index_seconds = time.perf_counter() - start
+    state['status'] = 'done'
+    backend.save_state(state)
+    backend.commit()
+    backend.finish(path)
+
+    summary = {'rows': state['rows'], 'rejected': state['rejected'], 'load_seconds': load_seconds,
+               'index_seconds': index_seconds,
+               'rows_per_second': rows_this_run / (load_seconds + index_seconds) if rows_this_run else float('nan')}
+    print(f"Loaded {summary['rows']:,} rows ({summary['rejected']:,} rejected to {rejects_path}) in "
+          f"{load_seconds:.1f}s, rebuilt {len(state['indexes'])} indexes in {index_seconds:.1f}s: "
+          f"{summary['rows_per_second']:,.0f} rows/s overall", file=log)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=DATA_FILE, help="source CSV")
+    parser.add_argument('--backend', choices=['sqlite', 'mysql'], default='sqlite')
+    parser.add_argument('--db', default=DB_FILE, help="SQLite database file")
+    parser.add_argument('--host', default='localhost', help="MySQL host")
+    parser.add_argument('--port', type=int, default=3306, help="MySQL port")
+    parser.add_argument('--user', help="MySQL user (the password is read from $MYSQL_PWD)")
+    parser.add_argument('--database', default='electronic_sales_db', help="MySQL database")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="rows per chunk and transaction")
+    parser.add_argument('--rejects', default=REJECTS_FILE, help="CSV receiving rows that fail validation")
+    parser.add_argument('--restart', action='store_true', help="start over even if an unfinished load can resume")
+    args = parser.parse_args(argv)
+
+    if args.backend == 'mysql':
+        backend = MySQLBackend(args.host, args.user, os.environ.get('MYSQL_PWD'), args.database, args.port)
+    else:
+        backend = SQLiteBackend(args.db)
+    try:
+        bulk_load(backend, args.csv, args.chunk_size, args.rejects, args.restart)
+    finally:
+        backend.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""Acquisition-month cohorts: retention and cumulative revenue per customer
+
+Customers are integer-coded and their orders sorted once by (customer, month).
+Every figure after that is a segment reduction over the sorted array or a
+bincount over (cohort, months since first purchase) cells, so the engine
+stays well under a second for millions of orders without any groupby-apply.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _month_numbers(dates):
+    """Months since 1970-01 per order"""
+    return dates.to_numpy().astype('datetime64[M]').astype(np.int64)
+
+
+def cohort_matrices(orders):
+    """Cohort sizes plus retention, active-customer and revenue-per-customer matrices
+
+    A customer's cohort is the month of their first order in ``orders`` (pass
+    completed orders). Matrices are indexed by cohort month and have one
+    column per month since acquisition; cells past the end of the data are
+    NaN. Returns a dict with ``sizes`` (Series), ``active``, ``retention``
+    (share of the cohort ordering in that month) and ``revenue_per_customer``
+    (cumulative revenue divided by cohort size).
+    """
+    ids = orders['customer_id'].to_numpy()
+    # Integer ids already are codes (offset to start at 0); anything else is factorized
+    codes = ids.astype(np.int64) - ids.min(initial=0) if ids.dtype.kind in 'iu' else pd.factorize(ids)[0]
+    months = _month_numbers(orders['purchase_date'])
+    prices = orders['total_price'].to_numpy(dtype=np.float64)
+    if len(codes) == 0:
+        empty = pd.DataFrame(index=pd.PeriodIndex([], freq='M', name='cohort'))
+        return {'sizes': pd.Series(dtype=np.int64), 'active': empty, 'retention': empty,
+                'revenue_per_customer': empty}
+
+    first_month, last_month = months.min(), months.max()
+    n_months = int(last_month - first_month) + 1
+    months = months - first_month
+
+    # The one sort: orders by (customer, month)
+    order = np.argsort(codes * n_months + months)
+    codes, months, prices = codes[order], months[order], prices[order]
+
+    # Customer segments of the sorted array; each starts at the customer's first month
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    cohort = np.repeat(months[starts], np.diff(np.r_[starts, len(codes)]))
+    age = months - cohort
+
+    # Distinct (customer, month) pairs are the first row of each run of equal months
+    new_month = np.r_[True, (codes[1:] != codes[:-1]) | (months[1:] != months[:-1])]
+    cells = cohort * n_months + age
+    size = n_months * n_months
+    active = np.bincount(cells[new_month], minlength=size).reshape(n_months, n_months)
+    revenue = np.bincount(cells, weights=prices, minlength=size).reshape(n_months, n_months)
+
+    sizes = active[:, 0]
+    kept = sizes > 0
+    # Cohort c can only be observed for n_months - c months
+    observed = np.arange(n_months)[None, :] < (n_months - np.arange(n_months))[:, None]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        retention = np.where(observed, active / sizes[:, None], np.nan)
+        revenue_per_customer = np.where(observed, np.cumsum(revenue, axis=1) / sizes[:, None], np.nan)
+
+    index = pd.period_range(pd.Period(np.datetime64(int(first_month), 'M'), freq='M'), periods=n_months,
+                            name='cohort')[kept]
+    columns = pd.RangeIndex(n_months, name='months_since_first')
+    return {
+        'sizes': pd.Series(sizes[kept], index=index, name='customers'),
+        'active': pd.DataFrame(np.where(observed, active, np.nan)[kept], index=index, columns=columns),
+        'retention': pd.DataFrame(retention[kept], index=index, columns=columns),
+        'revenue_per_customer': pd.DataFrame(revenue_per_customer[kept], index=index, columns=columns),
+    }
@@ -0,0 +1,131 @@
+"""Hash-based co-purchase engine - Q11's cross-selling analysis without the self-join
+
+Q11 joins every order to every other order from the same customer on the same
+day, which grows with the square of a customer's orders. Here orders are
+grouped into baskets in one hash (or sort) pass and collapsed to one row per
+(basket, item); pairs are only expanded inside the few baskets holding two or
+more distinct items, so the cost stays close to linear in the number of orders.
+"""
+import itertools
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MIN_COUNT = 5  # Q11's HAVING COUNT(*) >= 5
+
+
+def basket_ids(df, window_days=0):
+    """Basket number per order
+
+    With ``window_days=0`` a basket is one customer's orders on one day (Q11's
+    join key), found by hashing (customer, day). With a positive window each
+    customer's orders are sorted by date and a new basket starts whenever the
+    gap to the previous order exceeds ``window_days``: a basket chains
+    consecutive orders no more than ``window_days`` apart, so it can span
+    longer than the window itself.
+    """
+    customers = df['customer_id'].to_numpy().astype(np.int64)
+    days = df['purchase_date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+    if window_days <= 0:
+        days = days - days.min() if len(days) else days
+        return pd.factorize(customers * (int(days.max(initial=0)) + 1) + days)[0]
+
+    order = np.lexsort((days, customers))
+    sorted_customers, sorted_days = customers[order], days[order]
+    starts = np.ones(len(order), dtype=bool)
+    starts[1:] = (sorted_customers[1:] != sorted_customers[:-1]) | (np.diff(sorted_days) > window_days)
+    baskets = np.empty(len(order), dtype=np.int64)
+    baskets[order] = np.cumsum(starts) - 1
+    return baskets
+
+
+def _basket_items(baskets, items, values, n_items):
+    """One row per (basket, item): order count and value sum, sorted by basket"""
+    keys, inverse, counts = np.unique(baskets * n_items + items, return_inverse=True, return_counts=True)
+    sums = np.bincount(inverse, weights=values, minlength=len(keys))
+    return keys // n_items, keys % n_items, counts, sums
+
+
+def _pairs_within_baskets(basket):
+    """Index pairs (a, b), a != b, of rows sharing a basket in a basket-sorted array
+
+    Baskets are grouped by their number of distinct items so each group expands
+    to all ordered pairs with one vectorized take.
+    """
+    starts = np.flatnonzero(np.r_[True, basket[1:] != basket[:-1]])
+    sizes = np.diff(np.r_[starts, len(basket)])
+    first, second = [], []
+    for size in np.unique(sizes[sizes > 1]):
+        rows = starts[sizes == size][:, None] + np.arange(size)
+        a, b = np.array(list(itertools.permutations(range(size), 2))).T
+        first.append(rows[:, a].ravel())
+        second.append(rows[:, b].ravel())
+    if not first:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(first), np.concatenate(second)
+
+
+def co_purchases(df, item='product_type', window_days=0, min_count=DEFAULT_MIN_COUNT, value='total_price'):
+    """Sparse co-occurrence table of item pairs bought in the same basket
+
+    One row per ordered (primary, secondary) pair with at least ``min_count``
+    co-purchases, matching Q11's columns: ``co_purchase_count`` counts pairs
+    of orders, ``unique_customers`` the customers behind them and
+    ``avg_combined_value`` the mean of the two orders' values. ``baskets``,
+    ``support``, ``confidence`` and ``lift`` are per basket, for ranking
+    bundles. Pass completed orders to reproduce Q11.
+    """
+    columns = ['primary', 'secondary', 'co_purchase_count', 'unique_customers', 'avg_combined_value',
+               'baskets', 'support', 'confidence', 'lift']
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    if isinstance(df[item].dtype, pd.CategoricalDtype):
+        item_codes, labels = df[item].cat.codes.to_numpy().astype(np.int64), df[item].cat.categories
+    else:
+        item_codes, labels = pd.factorize(df[item])
+    n_items = len(labels)
+
+    baskets = basket_ids(df, window_days)
+    basket, item_code, counts, sums = _basket_items(baskets, item_codes, df[value].to_numpy(dtype=np.float64),
+                                                    n_items)
+    customer_of_basket = np.zeros(baskets.max() + 1, dtype=np.int64)
+    customer_of_basket[baskets] = df['customer_id'].to_numpy()
+
+    # Accumulate pair statistics into flat (primary * n_items + secondary) cells
+    a, b = _pairs_within_baskets(basket)
+    cells = item_code[a] * n_items + item_code[b]
+    size = n_items * n_items
+    pair_counts = np.bincount(cells, weights=counts[a] * counts[b], minlength=size)
+    # Every order of one item pairs with every order of the other: sum(v1 + v2)
+    pair_values = np.bincount(cells, weights=sums[a] * counts[b] + counts[a] * sums[b], minlength=size)
+    pair_baskets = np.bincount(cells, minlength=size)
+    customer_cells = np.unique(customer_of_basket[basket[a]] * size + cells)
+    pair_customers = np.bincount(customer_cells % size, minlength=size)
+
+    n_baskets = len(customer_of_basket)
+    item_baskets = np.bincount(item_code, minlength=n_items)
+    kept = np.flatnonzero(pair_counts >= max(min_count, 1))
+    primary, secondary = kept // n_items, kept % n_items
+    support = pair_baskets[kept] / n_baskets
+    confidence = pair_baskets[kept] / item_baskets[primary]
+    result = pd.DataFrame({
+        'primary': np.asarray(labels)[primary],
+        'secondary': np.asarray(labels)[secondary],
+        'co_purchase_count': pair_counts[kept].astype(np.int64),
+        'unique_customers': pair_customers[kept],
+        'avg_combined_value': (pair_values[kept] / pair_counts[kept]).round(2),
+        'baskets': pair_baskets[kept],
+        'support': support,
+        'confidence': confidence,
+        'lift': confidence / (item_baskets[secondary] / n_baskets),
+    }, columns=columns)
+    return result.sort_values(['co_purchase_count', 'primary', 'secondary'],
+                              ascending=[False, True, True], ignore_index=True)
+
+
+def co_occurrence_matrix(pairs, value='co_purchase_count'):
+    """Square item x item matrix of one measure from ``co_purchases`` output"""
+    items = sorted(set(pairs['primary']) | set(pairs['secondary']))
+    matrix = pairs.pivot_table(index='primary', columns='secondary', values=value, aggfunc='sum', fill_value=0)
+    return matrix.reindex(index=items, columns=items, fill_value=0)
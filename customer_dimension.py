@@ -0,0 +1,281 @@
+"""Persistent customer dimension with incrementally maintained RFM aggregates
+
+Customers are integer-coded by their position in a sorted id array, and every
+per-customer figure is a plain NumPy array indexed by that code. Appending
+orders folds a per-customer summary of just the new rows into the arrays
+(sums add, first/last purchase take the min/max), so nothing is recomputed
+from the full order history. Order-level columns such as ``value_segment`` are
+read back with one array lookup per row instead of a groupby and merge.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from parallel_agg import map_shards, shard_workers
+
+VALUE_BINS = [0, 500, 2000, 5000, float('inf')]
+VALUE_LABELS = ['Low (<$500)', 'Regular ($500-2K)', 'Medium ($2K-5K)', 'High ($5K+)']
+
+RFM_LEVELS = 5  # Recency, frequency and monetary scores run 1..RFM_LEVELS
+
+# Order columns the per-customer aggregates read
+ORDER_COLUMNS = ['customer_id', 'order_status', 'total_price', 'rating', 'purchase_date', 'add_on_total']
+
+# Order sums kept per customer
+SUM_FIELDS = ['order_count', 'completed_count', 'spend', 'completed_spend', 'addon_spend',
+              'completed_rating_sum', 'completed_rated']
+# Money sums, kept rounded to cents so they match a pandas groupby sum whatever the summation order
+MONEY_FIELDS = ['spend', 'completed_spend', 'addon_spend']
+# Purchase dates kept per customer, as day numbers (min for first_*, max for last_*)
+DATE_FIELDS = ['first_purchase', 'last_purchase', 'first_completed', 'last_completed']
+
+# Sentinels for customers without a (completed) purchase; they lose every min/max
+_NO_FIRST = np.iinfo(np.int64).max
+_NO_LAST = np.iinfo(np.int64).min
+_NAT = np.datetime64('NaT').astype(np.int64)
+
+
+def _order_days(dates):
+    """Purchase dates as int64 day numbers (NaT's value where missing), parsing distinct values once"""
+    if isinstance(dates.dtype, pd.CategoricalDtype):
+        days = pd.to_datetime(dates.cat.categories).values.astype('datetime64[D]').astype(np.int64)
+        # Code -1 (missing) picks the appended NaT rather than wrapping to the last date
+        return np.append(days, _NAT)[dates.cat.codes.to_numpy()]
+    return pd.to_datetime(dates).to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+def _summarize(orders):
+    """Sorted customer ids and per-customer SUM_FIELDS / DATE_FIELDS arrays for some orders"""
+    ids, codes = np.unique(orders['customer_id'].to_numpy().astype(np.int64), return_inverse=True)
+    n = len(ids)
+    completed = (orders['order_status'] == 'Completed').to_numpy()
+    price = orders['total_price'].to_numpy(dtype=np.float64)
+    rating = orders['rating'].to_numpy(dtype=np.float64)
+    days = _order_days(orders['purchase_date'])
+
+    fields = {
+        'order_count': np.bincount(codes, minlength=n).astype(np.int64),
+        'completed_count': np.bincount(codes, weights=completed, minlength=n).astype(np.int64),
+        'spend': np.bincount(codes, weights=price, minlength=n),
+        'completed_spend': np.bincount(codes, weights=np.where(completed, price, 0), minlength=n),
+        'addon_spend': np.bincount(codes, weights=orders['add_on_total'].to_numpy(dtype=np.float64),
+                                   minlength=n),
+        # Missing ratings are skipped, as groupby mean does
+        'completed_rating_sum': np.bincount(codes, weights=np.where(completed, np.nan_to_num(rating), 0),
+                                            minlength=n),
+        'completed_rated': np.bincount(codes, weights=completed & ~np.isnan(rating),
+                                       minlength=n).astype(np.int64),
+    }
+    # Orders without a purchase date count and sum, but set no first/last purchase
+    dated = days != _NAT
+    for name, sentinel, reduce, mask in [('first_purchase', _NO_FIRST, np.minimum, dated),
+                                         ('last_purchase', _NO_LAST, np.maximum, dated),
+                                         ('first_completed', _NO_FIRST, np.minimum, completed & dated),
+                                         ('last_completed', _NO_LAST, np.maximum, completed & dated)]:
+        out = np.full(n, sentinel, dtype=np.int64)
+        reduce.at(out, codes[mask], days[mask])
+        fields[name] = out
+    for name in MONEY_FIELDS:
+        fields[name] = np.round(fields[name], 2)
+    return ids, fields
+
+
+def _as_dates(days, present):
+    """Day numbers as datetime64, NaT where ``present`` is False"""
+    dates = np.where(present, days, 0).astype('datetime64[D]').astype('datetime64[ns]')
+    dates[~present] = np.datetime64('NaT')
+    return dates
+
+
+def _scores(values, higher_is_better=True):
+    """Quantile score 1..RFM_LEVELS per value; equal values share their average rank and score"""
+    n = len(values)
+    if n == 0:
+        return np.empty(0, dtype=np.int8)
+    values = values if higher_is_better else -values
+    ordered = np.sort(values)
+    # Average 0-based rank of each value's run of ties, doubled to stay integral
+    twice_rank = np.searchsorted(ordered, values, side='left') + np.searchsorted(ordered, values, side='right') - 1
+    return (1 + twice_rank * RFM_LEVELS // (2 * n)).astype(np.int8)
+
+
+class CustomerDimension:
+    """Per-customer order aggregates keyed by integer customer code
+
+    ``ids`` is the sorted array of customer ids; customer ``ids[i]`` has code
+    ``i`` and its figures live at position ``i`` of every field array. Build
+    one with ``from_orders``, grow it with ``update`` and persist it with
+    ``save`` / ``load``.
+    """
+
+    FIELDS = SUM_FIELDS + DATE_FIELDS
+
+    def __init__(self, ids, fields):
+        self.ids = ids
+        self.fields = fields
+
+    @classmethod
+    def from_orders(cls, orders, workers=1):
+        """Build the dimension from an order frame (raw or prepared)
+
+        With ``workers`` > 1, large inputs are summarized by a process pool over
+        customer-sharded rows (see parallel_agg); the result is identical.
+        """
+        workers = shard_workers(orders, ORDER_COLUMNS, workers)
+        if workers == 1:
+            return cls(*_summarize(orders))
+        parts = map_shards(_summarize, orders, 'customer_id', ORDER_COLUMNS, workers)
+        ids = np.concatenate([part_ids for part_ids, _ in parts])
+        order = np.argsort(ids, kind='stable')  # Linear when the shards were key ranges
+        return cls(ids[order], {name: np.concatenate([fields[name] for _, fields in parts])[order]
+                                for name in cls.FIELDS})
+
+    def __len__(self):
+        return len(self.ids)
+
+    def update(self, new_orders):
+        """Fold appended orders into the aggregates in place; returns self
+
+        Only ``new_orders`` is scanned. Existing customers keep their codes
+        unless new ids sort before them, in which case all codes shift.
+        """
+        if len(new_orders) == 0:
+            return self
+        new_ids, new_fields = _summarize(new_orders)
+        pos = np.searchsorted(self.ids, new_ids)
+        known = pos < len(self.ids)
+        known[known] = self.ids[pos[known]] == new_ids[known]
+        if known.all():
+            # Returning customers only: fold in place at their codes
+            self._fold(self.fields, pos, new_fields)
+            return self
+
+        ids = np.sort(np.concatenate([self.ids, new_ids[~known]]), kind='stable')
+        old_pos = np.searchsorted(ids, self.ids)
+        fields = {}
+        for name, old in self.fields.items():
+            if name.startswith('first_'):
+                merged = np.full(len(ids), _NO_FIRST, dtype=np.int64)
+            elif name.startswith('last_'):
+                merged = np.full(len(ids), _NO_LAST, dtype=np.int64)
+            else:
+                merged = np.zeros(len(ids), dtype=old.dtype)
+            merged[old_pos] = old
+            fields[name] = merged
+        self._fold(fields, np.searchsorted(ids, new_ids), new_fields)
+        self.ids, self.fields = ids, fields
+        return self
+
+    @staticmethod
+    def _fold(fields, pos, new_fields):
+        """Combine per-customer ``new_fields`` into ``fields`` at codes ``pos``"""
+        for name, values in fields.items():
+            if name.startswith('first_'):
+                values[pos] = np.minimum(values[pos], new_fields[name])
+            elif name.startswith('last_'):
+                values[pos] = np.maximum(values[pos], new_fields[name])
+            elif name in MONEY_FIELDS:
+                values[pos] = np.round(values[pos] + new_fields[name], 2)
+            else:
+                values[pos] += new_fields[name]
+
+    def codes(self, customer_ids):
+        """Integer code of each customer id; raises KeyError for unknown customers"""
+        customer_ids = np.asarray(customer_ids).astype(np.int64)
+        if len(self.ids) and self.ids[-1] - self.ids[0] < 4 * len(self.ids):
+            # Dense ids: one direct table lookup per row instead of a binary search
+            table = np.full(self.ids[-1] - self.ids[0] + 2, -1, dtype=np.int64)
+            table[self.ids - self.ids[0]] = np.arange(len(self.ids))
+            offsets = customer_ids - self.ids[0]
+            codes = table[np.where((offsets >= 0) & (offsets < len(table) - 1), offsets, -1)]
+            found = codes >= 0
+        else:
+            codes = np.searchsorted(self.ids, customer_ids)
+            found = codes < len(self.ids)
+            found[found] = self.ids[codes[found]] == customer_ids[found]
+        if not found.all():
+            raise KeyError(f"Customers not in the dimension: {np.unique(customer_ids[~found])[:10].tolist()}")
+        return codes
+
+    def segment_codes(self):
+        """VALUE_LABELS position of each customer's total spend across all orders"""
+        edges = np.asarray(VALUE_BINS)
+        codes = np.searchsorted(edges, self.fields['spend'], side='left') - 1
+        # include_lowest: spend equal to the first edge falls in the first bin
+        codes[self.fields['spend'] == edges[0]] = 0
+        codes[(self.fields['spend'] < edges[0]) | np.isnan(self.fields['spend'])] = -1
+        return codes
+
+    def value_segments(self, customer_ids):
+        """Value segment per order, as an ordered categorical over VALUE_LABELS"""
+        return pd.Categorical.from_codes(self.segment_codes()[self.codes(customer_ids)], VALUE_LABELS,
+                                         ordered=True)
+
+    def rfm_scores(self, as_of=None):
+        """Recency, frequency and monetary quintile scores from completed orders
+
+        Recency counts days from the last completed purchase to ``as_of``
+        (default: the latest purchase in the dimension); customers without a
+        completed order score lowest on all three.
+        """
+        # A completed purchase with a date; undated ones cannot place the customer in time
+        has_completed = self.fields['last_completed'] != _NO_LAST
+        if as_of is None:
+            as_of_day = self.fields['last_purchase'].max(initial=0)
+        else:
+            as_of_day = pd.Timestamp(as_of).to_datetime64().astype('datetime64[D]').astype(np.int64)
+        recency = np.where(has_completed, as_of_day - self.fields['last_completed'], np.iinfo(np.int64).max)
+        scores = pd.DataFrame({
+            'recency_days': np.where(has_completed, recency, np.nan),
+            'r_score': _scores(recency, higher_is_better=False),
+            'f_score': _scores(self.fields['completed_count']),
+            'm_score': _scores(self.fields['completed_spend']),
+        }, index=pd.Index(self.ids, name='customer_id'))
+        scores['rfm_score'] = (scores['r_score'] + scores['f_score'] + scores['m_score']).astype(np.int8)
+        return scores
+
+    def frame(self, as_of=None):
+        """One row per customer with every aggregate, value segment and RFM score"""
+        f = self.fields
+        frame = pd.DataFrame({
+            'first_purchase': _as_dates(f['first_purchase'], f['first_purchase'] != _NO_FIRST),
+            'last_purchase': _as_dates(f['last_purchase'], f['last_purchase'] != _NO_LAST),
+            'order_count': f['order_count'],
+            'completed_count': f['completed_count'],
+            'spend': f['spend'],
+            'completed_spend': f['completed_spend'],
+            'addon_spend': f['addon_spend'],
+            'value_segment': pd.Categorical.from_codes(self.segment_codes(), VALUE_LABELS, ordered=True),
+        }, index=pd.Index(self.ids, name='customer_id'))
+        return frame.join(self.rfm_scores(as_of))
+
+    def completed_metrics(self):
+        """Completed-order metrics per customer, shaped like analytics.customer_metrics output"""
+        f = self.fields
+        kept = f['completed_count'] > 0
+        count = f['completed_count'][kept]
+        rated = f['completed_rated'][kept]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_rating = np.where(rated > 0, f['completed_rating_sum'][kept] / rated, np.nan)
+        return pd.DataFrame({
+            'total_spent': f['completed_spend'][kept],
+            'avg_order_value': f['completed_spend'][kept] / count,
+            'order_count': count,
+            'avg_rating': avg_rating,
+            'first_purchase': _as_dates(f['first_completed'][kept], f['first_completed'][kept] != _NO_FIRST),
+            'last_purchase': _as_dates(f['last_completed'][kept], f['last_completed'][kept] != _NO_LAST),
+        }, index=pd.Index(self.ids[kept], name='customer_id'))
+
+    def save(self, path):
+        """Write the dimension to an .npz file, atomically"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, ids=self.ids, **self.fields)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read a dimension written by ``save``"""
+        with np.load(path) as data:
+            return cls(data['ids'], {name: data[name] for name in cls.FIELDS})
@@ -0,0 +1,101 @@
+"""Point-budget helpers that keep chart payloads bounded for any dataset size"""
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_POINTS = 5000
+
+
+def _as_float(values):
+    """Numeric view of a series, with datetimes as int64 nanoseconds"""
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        values = values.astype('datetime64[ns]').astype(np.int64)
+    return values.astype(np.float64)
+
+
+def lttb(x, y, max_points):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling
+
+    The first and last points are always kept. Each bucket in between keeps the
+    point forming the largest triangle with the previously kept point and the
+    average of the next bucket, which preserves peaks and troughs of the line.
+    """
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    x, y = _as_float(x), _as_float(y)
+    every = (n - 2) / (max_points - 2)
+    kept = np.empty(max_points, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        kept[i + 1] = a
+    return kept
+
+
+def _bin_codes(values, n_bins):
+    """Equal-width bin codes, or exact codes when there are few distinct values"""
+    codes, uniques = pd.factorize(values, sort=True)
+    if len(uniques) <= n_bins:
+        return codes
+    values = _as_float(values)
+    lo, hi = np.nanmin(values), np.nanmax(values)
+    if hi == lo:
+        return np.zeros(len(values), dtype=np.int64)
+    return np.clip(((values - lo) / (hi - lo) * n_bins).astype(np.int64), 0, n_bins - 1)
+
+
+def density_bins(df, x, y, by=None, size=None, max_points=DEFAULT_MAX_POINTS):
+    """Aggregate a scatter into at most ``max_points`` grid cells
+
+    Each cell becomes one point at the mean x/y of its orders, with an ``orders``
+    count (and the mean of ``size`` when given) for marker sizing and hover.
+    """
+    n_groups = df[by].nunique() if by else 1
+    cells = max(1, max_points // max(n_groups, 1))
+    x_bins = max(1, min(df[x].nunique(), int(np.sqrt(cells))))
+    y_bins = max(1, cells // x_bins)
+
+    keys = [df[by]] if by else []
+    keys += [pd.Series(_bin_codes(df[x], x_bins), index=df.index, name='_x_bin'),
+             pd.Series(_bin_codes(df[y], y_bins), index=df.index, name='_y_bin')]
+
+    spec = {x: (x, 'mean'), y: (y, 'mean'), 'orders': (y, 'size')}
+    if size:
+        spec[size] = (size, 'mean')
+    binned = df.groupby(keys, observed=True).agg(**spec)
+    return binned.reset_index(level=['_x_bin', '_y_bin'], drop=True).reset_index()
+
+
+def stratified_sample(df, by, value, max_points=DEFAULT_MAX_POINTS, outlier_share=0.1, seed=0):
+    """Sample at most ``max_points`` rows, proportionally per ``by`` group
+
+    Within each group up to ``outlier_share`` of its quota goes to the rows
+    furthest outside the 1.5 x IQR fences on ``value``, so extreme orders stay
+    visible; the rest of the quota is a uniform random sample.
+    """
+    if len(df) <= max_points:
+        return df
+
+    rng = np.random.default_rng(seed)
+    kept = []
+    for _, group in df.groupby(by, observed=True):
+        quota = max(1, int(round(max_points * len(group) / len(df))))
+        values = group[value].to_numpy(dtype=np.float64)
+        q1, q3 = np.nanpercentile(values, [25, 75])
+        fence = 1.5 * (q3 - q1)
+        distance = np.maximum(q1 - fence - values, values - q3 - fence)
+        outliers = np.flatnonzero(distance > 0)
+        outliers = outliers[np.argsort(-distance[outliers])][:int(quota * outlier_share)]
+
+        rest = np.setdiff1d(np.arange(len(group)), outliers, assume_unique=True)
+        sampled = rng.choice(rest, size=min(len(rest), quota - len(outliers)), replace=False)
+        kept.append(group.iloc[np.sort(np.concatenate([outliers, sampled]))])
+    return pd.concat(kept)
@@ -0,0 +1,157 @@
+"""Chunked export of order frames to CSV (plain, gzip, zstd), Parquet and Arrow IPC
+
+Writers work through the frame in bounded row chunks, so no format ever holds
+a full text copy of the data: CSV is encoded and compressed block by block,
+and Parquet / Arrow IPC are written as record batches straight from the
+columns.
+"""
+import gzip
+import tempfile
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+DEFAULT_CHUNK_ROWS = 50_000
+ESTIMATE_SAMPLE_ROWS = 2_000
+
+# Export format name -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'CSV (gzip)': ('csv.gz', 'application/gzip'),
+    'CSV (zstd)': ('csv.zst', 'application/zstd'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'Arrow IPC': ('arrow', 'application/vnd.apache.arrow.file'),
+}
+
+
+def available_formats():
+    """Export formats whose optional dependencies are installed"""
+    formats = ['CSV', 'CSV (gzip)']
+    if HAS_ZSTD:
+        formats.append('CSV (zstd)')
+    if HAS_PYARROW:
+        formats += ['Parquet', 'Arrow IPC']
+    return formats
+
+
+def iter_chunks(df, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Consecutive row slices of at most ``chunk_rows`` rows (views, not copies)"""
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def iter_csv_blocks(df, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """UTF-8 CSV bytes, one block per row chunk; the header is in the first block"""
+    if df.empty:
+        yield df.to_csv(index=False).encode()
+        return
+    for i, chunk in enumerate(iter_chunks(df, chunk_rows)):
+        yield chunk.to_csv(index=False, header=(i == 0)).encode()
+
+
+def write_csv(df, fileobj, compression=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Stream CSV blocks to a binary file object, optionally gzip or zstd compressed"""
+    if compression == 'gzip':
+        with gzip.GzipFile(fileobj=fileobj, mode='wb', compresslevel=6) as out:
+            for block in iter_csv_blocks(df, chunk_rows):
+                out.write(block)
+    elif compression == 'zstd':
+        if not HAS_ZSTD:
+            raise ImportError("zstd export needs the zstandard package")
+        with zstandard.ZstdCompressor(level=3).stream_writer(fileobj, closefd=False) as out:
+            for block in iter_csv_blocks(df, chunk_rows):
+                out.write(block)
+    else:
+        for block in iter_csv_blocks(df, chunk_rows):
+            fileobj.write(block)
+
+
+def _record_batches(df, chunk_rows):
+    """Arrow schema plus one record batch per row chunk, converted column by column"""
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    return schema, (pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False)
+                    for chunk in iter_chunks(df, chunk_rows))
+
+
+def write_parquet(df, fileobj, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Write Parquet, one row group per chunk"""
+    schema, batches = _record_batches(df, chunk_rows)
+    with pyarrow.parquet.ParquetWriter(fileobj, schema, compression='zstd') as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+
+
+def write_arrow_ipc(df, fileobj, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Write an Arrow IPC file, one record batch per chunk"""
+    schema, batches = _record_batches(df, chunk_rows)
+    with pyarrow.ipc.new_file(fileobj, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+
+
+def write_export(df, fmt, fileobj, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Write ``df`` to a binary file object in one of EXPORT_FORMATS"""
+    if fmt == 'CSV':
+        write_csv(df, fileobj, chunk_rows=chunk_rows)
+    elif fmt == 'CSV (gzip)':
+        write_csv(df, fileobj, 'gzip', chunk_rows)
+    elif fmt == 'CSV (zstd)':
+        write_csv(df, fileobj, 'zstd', chunk_rows)
+    elif fmt in ('Parquet', 'Arrow IPC'):
+        if not HAS_PYARROW:
+            raise ImportError(f"{fmt} export needs the pyarrow package")
+        writer = write_parquet if fmt == 'Parquet' else write_arrow_ipc
+        writer(df, fileobj, chunk_rows)
+    else:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {list(EXPORT_FORMATS)}")
+
+
+def export_file(df, fmt, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Export into an anonymous temporary file, rewound and ready to read
+
+    Only the encoding is chunked: the file is written a chunk at a time, so
+    no full text copy of the frame is built while encoding. It is deleted when
+    closed. The unbuffered handle is returned because st.download_button
+    accepts raw file objects, but Streamlit reads the whole file into its
+    media store, so the finished download is still held in memory once.
+    """
+    out = tempfile.TemporaryFile()
+    write_export(df, fmt, out, chunk_rows)
+    out.flush()
+    raw = out.detach()
+    raw.seek(0)
+    return raw
+
+
+def _encoded_size(df, fmt):
+    """Bytes ``df`` takes in ``fmt``"""
+    with tempfile.TemporaryFile() as out:
+        write_export(df, fmt, out)
+        return out.tell()
+
+
+def estimate_export(df, fmt, sample_rows=ESTIMATE_SAMPLE_ROWS, n_rows=None):
+    """Row count and estimated file size, from encoding an evenly spaced sample
+
+    The fixed cost of an empty file (header, schema, footer) is measured
+    separately so only the per-row part is scaled up. Pass ``n_rows`` when
+    ``df`` is itself a sample of the rows to be exported.
+    """
+    sample = df.iloc[::max(1, len(df) // sample_rows)]
+    n_rows = len(df) if n_rows is None else n_rows
+    overhead = _encoded_size(df.iloc[:0], fmt)
+    if sample.empty:
+        return {'rows': 0, 'bytes': overhead}
+    per_row = max(0, _encoded_size(sample, fmt) - overhead) / len(sample)
+    return {'rows': n_rows, 'bytes': int(overhead + per_row * n_rows)}
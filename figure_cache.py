@@ -0,0 +1,179 @@
+"""LRU cache of built plotly figures keyed by a fingerprint of their inputs
+
+Building a plotly express figure costs tens of milliseconds, far more than
+the aggregates behind it. Figures here are produced by zero-argument builder
+functions (usually lambdas over already-aggregated data); the cache key is a
+hash of the builder's code, its constants and the values it closes over, so
+an unchanged aggregate plus an unchanged chart spec is a hit no matter which
+rerun or session asks. Misses requested together are built concurrently on a
+small thread pool.
+
+Each figure is serialized to JSON once, when it is built; the cache holds only
+that payload and is bounded by its size. Hits are returned as a
+SerializedFigure, whose ``to_dict`` decodes the payload. Streamlit still
+re-encodes that dict for the browser, so a hit costs a JSON decode and encode
+(about 1 ms per chart) rather than a walk of the live figure tree (2-4 ms).
+This relies on Streamlit reading figures through ``to_dict``. Builders must
+return a finished figure, since nothing can be changed after it is serialized.
+"""
+import collections
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+DEFAULT_MAX_BYTES = 64 * 2 ** 20
+DEFAULT_WORKERS = 4
+# Values whose repr is their content
+_SCALAR_TYPES = (bool, int, float, complex, str, bytes, np.generic, pd.Timestamp, pd.Timedelta, pd.Period)
+
+
+def _update_fingerprint(digest, value):
+    """Feed a cheap, content-based hash of ``value`` into ``digest``"""
+    if isinstance(value, (pd.Series, pd.DataFrame, pd.Index)):
+        if isinstance(value, pd.DataFrame):
+            layout = (list(value.columns), [str(dtype) for dtype in value.dtypes])
+        else:
+            layout = (value.name, str(value.dtype))
+        digest.update(repr((type(value).__name__, layout)).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=not isinstance(value, pd.Index)).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray) and value.dtype.kind != 'O':
+        digest.update(repr((value.dtype.str, value.shape)).encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _update_fingerprint(digest, item)
+    elif isinstance(value, dict):
+        digest.update(f"dict{len(value)}".encode())
+        for key, item in value.items():
+            _update_fingerprint(digest, key)
+            _update_fingerprint(digest, item)
+    elif value is None or isinstance(value, _SCALAR_TYPES):
+        digest.update(repr((type(value).__name__, value)).encode())
+    else:
+        # A repr fallback would embed the object's id: a key that never hits and fills the cache
+        raise TypeError(f"cannot fingerprint a closed-over {type(value).__name__}; "
+                        "close over its data or a plain value instead")
+
+
+def _update_code_fingerprint(digest, code):
+    """Feed a code object's bytecode, names and constants into ``digest``
+
+    Nested code objects are hashed by content, not repr: the dashboard script
+    is re-executed every rerun, so its code objects (and their addresses) are
+    recreated each time.
+    """
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        if hasattr(const, 'co_code'):
+            _update_code_fingerprint(digest, const)
+        else:
+            digest.update(repr(const).encode())
+
+
+def figure_key(name, builder):
+    """Hash of a chart name, its builder's code and constants, and every value it closes over
+
+    Closed-over values must be pandas or NumPy data, plain scalars, None, or
+    lists, tuples and dicts of these; anything else raises TypeError.
+    """
+    digest = hashlib.blake2b(name.encode(), digest_size=16)
+    _update_code_fingerprint(digest, builder.__code__)
+    for cell in builder.__closure__ or ():
+        _update_fingerprint(digest, cell.cell_contents)
+    return digest.hexdigest()
+
+
+class SerializedFigure(go.Figure):
+    """A built figure carried as its serialized JSON
+
+    ``to_dict`` decodes the payload, which Streamlit's plotly element then
+    encodes again; ``to_json`` (used by ``payload_bytes``) returns it as is.
+    The figure's own ``data`` and ``layout`` are left empty and plotly does
+    not validate the payload again. Use ``rebuild`` for a full Figure.
+    """
+
+    def __init__(self, payload):
+        super().__init__()
+        self._payload = payload
+
+    def to_dict(self):
+        return json.loads(self._payload)
+
+    def to_plotly_json(self):
+        return self.to_dict()
+
+    def to_json(self, *args, **kwargs):
+        return self._payload
+
+    def rebuild(self):
+        """The figure as a full plotly Figure, parsed from the payload"""
+        return pio.from_json(self._payload)
+
+
+class FigureCache:
+    """Thread-safe LRU of serialized figures under a byte budget"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, workers=DEFAULT_WORKERS):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()  # key -> JSON payload
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='figure-build')
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return SerializedFigure(entry)
+
+    def _put(self, key, payload):
+        # Sized by the JSON the browser receives
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = payload
+            self._bytes += len(payload)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def _build(self, key, builder):
+        # The one serialization of this figure; hits decode it instead of walking the figure
+        payload = builder().to_json(validate=False)
+        self._put(key, payload)
+        return SerializedFigure(payload)
+
+    def figure(self, name, builder):
+        """The serialized figure for this name and builder, building it on a miss"""
+        key = figure_key(name, builder)
+        figure = self._get(key)
+        return figure if figure is not None else self._build(key, builder)
+
+    def figures(self, builders):
+        """Figures for a {name: builder} dict; misses are built concurrently"""
+        keys = {name: figure_key(name, builder) for name, builder in builders.items()}
+        found = {name: self._get(key) for name, key in keys.items()}
+        pending = {name: self._pool.submit(self._build, keys[name], builders[name])
+                   for name, figure in found.items() if figure is None}
+        return {name: pending[name].result() if name in pending else figure for name, figure in found.items()}
+
+    def stats(self):
+        """Hit/miss counts, entry count and bytes held"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries), 'bytes': self._bytes}
@@ -0,0 +1,97 @@
+"""Bitmap index over the filterable columns with an LRU cache of filter results"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+FILTER_COLUMNS = ['order_status', 'product_type', 'payment_method']
+
+
+class FilterIndex:
+    """Packed per-value bitmaps plus a sorted date index for the sidebar filters
+
+    Rows must already be sorted by ``purchase_date`` (see prepare_sales_data), so
+    a date range maps to one contiguous row slice found with ``searchsorted``.
+    Filter results are cached as row-index arrays keyed by the normalized filter,
+    never as DataFrame copies.
+    """
+
+    def __init__(self, df, columns=FILTER_COLUMNS, cache_size=32):
+        dates = df['purchase_date'].to_numpy()
+        if len(dates) > 1 and (dates[1:] < dates[:-1]).any():
+            raise ValueError("FilterIndex needs rows sorted by purchase_date")
+
+        self.dates = dates
+        self.n_rows = len(df)
+        self.index_dtype = np.int32 if self.n_rows < 2 ** 31 else np.int64
+        self.bitmaps = {}
+        for col in columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                codes, values = df[col].cat.codes.to_numpy(), df[col].cat.categories
+            else:
+                codes, values = pd.factorize(df[col])
+            self.bitmaps[col] = {value: np.packbits(codes == i) for i, value in enumerate(values)}
+
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def row_range(self, date_range):
+        """Row slice [lo, hi) covering an inclusive (start, end) date range"""
+        if len(date_range) != 2:
+            return 0, self.n_rows
+        lo = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(date_range[0])), side='left')
+        hi = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(date_range[1])), side='right')
+        return int(lo), int(hi)
+
+    def _normalize(self, date_range, selections):
+        """Hashable cache key; columns with every value selected drop out"""
+        lo, hi = self.row_range(date_range)
+        key = [(lo, hi)]
+        for col in self.bitmaps:
+            selected = set(selections.get(col, self.bitmaps[col])) & set(self.bitmaps[col])
+            key.append(None if len(selected) == len(self.bitmaps[col]) else tuple(sorted(selected)))
+        return tuple(key)
+
+    def _evaluate(self, key):
+        """OR the bitmaps within each column, AND across columns, over the date slice"""
+        (lo, hi), *column_keys = key
+        if lo >= hi:
+            return np.empty(0, dtype=self.index_dtype)
+
+        byte_lo, byte_hi = lo // 8, (hi + 7) // 8
+        combined = None
+        for col, selected in zip(self.bitmaps, column_keys):
+            if selected is None:
+                continue
+            col_bits = np.zeros(byte_hi - byte_lo, dtype=np.uint8)
+            for value in selected:
+                col_bits |= self.bitmaps[col][value][byte_lo:byte_hi]
+            combined = col_bits if combined is None else combined & col_bits
+
+        if combined is None:
+            return np.arange(lo, hi, dtype=self.index_dtype)
+        mask = np.unpackbits(combined)[lo - byte_lo * 8:hi - byte_lo * 8]
+        return (np.flatnonzero(mask) + lo).astype(self.index_dtype)
+
+    def lookup(self, date_range, selections):
+        """Row indices matching the date range and per-column value selections"""
+        key = self._normalize(date_range, selections)
+        with self._lock:
+            if key in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        rows = self._evaluate(key)
+        # Cached arrays are shared between sessions, so make them read-only
+        rows.flags.writeable = False
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = rows
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return rows
@@ -0,0 +1,154 @@
+"""Hot-path timing for dashboard reruns: named sections, rolling percentiles and a JSON-lines log
+
+A ``RerunTimer`` collects one record per timed section of a rerun (data load,
+filtering, each shared aggregate, each chart and table) with its wall time,
+rows in/out and the bytes of payload sent to the browser. ``SectionStats``
+keeps the last ROLLING_WINDOW timings per section across reruns and sessions
+for p50/p95, and ``append_log`` writes each rerun as one JSON line for offline
+analysis. When timing is off, ``NULL_TIMER`` takes the timer's place and
+records nothing.
+"""
+import collections
+import contextlib
+import io
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# Environment variable naming the JSON-lines log; timing is always on when it is set
+TIMINGS_LOG_ENV = 'SALES_TIMINGS_LOG'
+ROLLING_WINDOW = 200  # Timings kept per section for the rolling percentiles
+
+_local = threading.local()
+
+
+def rows_of(obj):
+    """Row count of a frame, series or array; None for anything without a length"""
+    try:
+        return len(obj)
+    except TypeError:
+        return None
+
+
+def payload_bytes(obj):
+    """Approximate bytes sent to the browser for a plotly figure or a DataFrame
+
+    Figures are measured as their JSON, frames as an Arrow IPC stream (the
+    encodings Streamlit uses); anything else is None.
+    """
+    if hasattr(obj, 'to_plotly_json'):
+        return len(obj.to_json(validate=False))
+    if isinstance(obj, pd.DataFrame) and HAS_PYARROW:
+        table = pa.Table.from_pandas(obj)
+        sink = io.BytesIO()
+        with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.tell()
+    return None
+
+
+class RerunTimer:
+    """Timed section records for one rerun"""
+
+    enabled = True
+
+    def __init__(self):
+        self.records = []
+        self.started = time.perf_counter()
+
+    @contextlib.contextmanager
+    def section(self, name, rows_in=None, kind='section'):
+        """Time the enclosed block; the yielded record takes ``rows_out`` and ``bytes``"""
+        record = {'name': name, 'kind': kind, 'rows_in': rows_in, 'rows_out': None, 'bytes': None}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['ms'] = (time.perf_counter() - start) * 1000
+            self.records.append(record)
+
+    def total_ms(self):
+        """Wall time since the timer was created"""
+        return (time.perf_counter() - self.started) * 1000
+
+    def frame(self):
+        """This rerun's records, slowest first"""
+        columns = ['name', 'kind', 'ms', 'rows_in', 'rows_out', 'bytes']
+        return pd.DataFrame(self.records, columns=columns).sort_values('ms', ascending=False, ignore_index=True)
+
+
+class _NullTimer:
+    """Stand-in when timing is off: sections run untimed and nothing is kept"""
+
+    enabled = False
+    records = ()
+
+    @contextlib.contextmanager
+    def section(self, name, rows_in=None, kind='section'):
+        yield {}
+
+
+NULL_TIMER = _NullTimer()
+
+
+def current_timer():
+    """The timer installed for this thread's rerun, or NULL_TIMER"""
+    return getattr(_local, 'timer', NULL_TIMER)
+
+
+def install_timer(timer):
+    """Make ``timer`` the current timer for this thread (each Streamlit session runs in its own)"""
+    _local.timer = timer
+
+
+class SectionStats:
+    """Rolling per-section timings across reruns, safe to share between sessions"""
+
+    def __init__(self, window=ROLLING_WINDOW):
+        self._lock = threading.Lock()
+        self._timings = collections.defaultdict(lambda: collections.deque(maxlen=window))
+        self._last = {}
+
+    def add(self, records):
+        """Fold one rerun's section records in"""
+        with self._lock:
+            for record in records:
+                key = (record['name'], record['kind'])
+                self._timings[key].append(record['ms'])
+                self._last[key] = record
+
+    def summary(self):
+        """Calls, p50/p95/max milliseconds and the latest rows/bytes per section, by p95"""
+        with self._lock:
+            rows = []
+            for (name, kind), timings in self._timings.items():
+                p50, p95 = np.percentile(timings, [50, 95])
+                last = self._last[(name, kind)]
+                rows.append({'name': name, 'kind': kind, 'calls': len(timings), 'p50_ms': p50, 'p95_ms': p95,
+                             'max_ms': max(timings), 'rows_in': last['rows_in'], 'rows_out': last['rows_out'],
+                             'bytes': last['bytes']})
+        columns = ['name', 'kind', 'calls', 'p50_ms', 'p95_ms', 'max_ms', 'rows_in', 'rows_out', 'bytes']
+        return pd.DataFrame(rows, columns=columns).sort_values('p95_ms', ascending=False, ignore_index=True)
+
+
+def log_path():
+    """JSON-lines log named by $SALES_TIMINGS_LOG, or None when unset"""
+    return os.environ.get(TIMINGS_LOG_ENV) or None
+
+
+def append_log(path, timer, **context):
+    """Append one rerun as a JSON line: timestamp, total time, context and every section"""
+    entry = {'ts': time.time(), 'total_ms': timer.total_ms(), **context, 'sections': timer.records}
+    with open(path, 'a') as f:
+        f.write(json.dumps(entry, default=str) + '\n')
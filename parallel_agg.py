@@ -0,0 +1,191 @@
+"""Process-parallel groupbys over key-sharded orders in shared memory
+
+Rows are split into one shard per worker by their group key - ranges of the
+key, or a greedy row-balanced assignment when the key is a categorical with few
+values - so every group lives in exactly one shard. The needed columns and
+each row's shard are copied once into a single shared-memory block
+(categoricals as their integer codes). Each worker picks its shard's rows
+straight out of the block, so no rows are pickled and the gather runs in
+parallel, then runs the ordinary serial aggregation on them and sends back
+only the per-group result.
+
+A shard keeps its rows in their original order, so every group is aggregated
+from the same values in the same order as by the serial groupby, and merging
+the partial results in key order reproduces the serial result exactly, float
+sums included.
+
+Usage:
+    SALES_WORKERS=16 streamlit run streamlit_dashboard.py     # or SALES_WORKERS=auto for every core
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+
+# Environment variable with the number of worker processes ('auto' for one per core); unset runs serially
+WORKERS_ENV = 'SALES_WORKERS'
+MIN_SHARD_ROWS = 100_000  # Smaller shards cost more to hand over than a worker saves
+BALANCED_MAX_KEYS = 1024  # Categorical keys with at most this many values are balanced by row count
+SAMPLE_PER_SHARD = 1000  # Keys sampled per shard to place the range boundaries
+_ALIGNMENT = 64
+
+# Workers are started fresh rather than forked from a (possibly threaded) server process
+_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def worker_count():
+    """Worker processes from $SALES_WORKERS: a number, 'auto' for every core, or 1 when unset"""
+    value = os.environ.get(WORKERS_ENV, '').strip().lower()
+    if value == 'auto':
+        return os.cpu_count() or 1
+    return max(1, int(value)) if value else 1
+
+
+def shard_workers(df, columns, workers):
+    """Workers worth sharding ``df`` over: at most one per MIN_SHARD_ROWS rows, 1 meaning serial
+
+    Columns that cannot be placed in shared memory (see ``shareable``) also mean serial.
+    """
+    if not shareable(df, columns):
+        return 1
+    return max(1, min(workers or 1, len(df) // MIN_SHARD_ROWS))
+
+
+def process_pool(workers):
+    """Shared process pool with at least ``workers`` processes, replaced when a bigger one is needed"""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._max_workers < workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(_START_METHOD))
+        return _pool
+
+
+def _reset_pool():
+    """Drop the pool, e.g. after a worker died, so the next call starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def shard_ids(keys, n_shards):
+    """Shard of each row such that equal keys share a shard, as uint16
+
+    Categorical keys with few values are dealt out largest first to the least
+    loaded shard. Other keys are split into ranges at quantiles of a sample, so
+    shards hold ascending key ranges and their results concatenate in key order.
+    """
+    categorical = isinstance(keys.dtype, pd.CategoricalDtype)
+    values = keys.cat.codes.to_numpy() if categorical else keys.to_numpy()
+    if categorical and len(keys.cat.categories) <= BALANCED_MAX_KEYS:
+        counts = np.bincount(values[values >= 0], minlength=len(keys.cat.categories))
+        table = np.zeros(len(counts) + 1, dtype=np.uint16)  # The last entry takes missing keys (code -1)
+        loads = np.zeros(n_shards, dtype=np.int64)
+        for code in np.argsort(-counts, kind='stable'):
+            shard = int(np.argmin(loads))
+            table[code] = shard
+            loads[shard] += counts[code]
+        return table[values]
+    sample = np.sort(values[::max(1, len(values) // (SAMPLE_PER_SHARD * n_shards))])
+    bounds = sample[(np.arange(1, n_shards) * len(sample)) // n_shards]
+    return np.searchsorted(bounds, values, side='right').astype(np.uint16)
+
+
+def shareable(df, columns):
+    """Whether every column is a NumPy or categorical column that can be placed in shared memory"""
+    return all(isinstance(df[col].dtype, (np.dtype, pd.CategoricalDtype)) and df[col].dtype != object
+               for col in columns)
+
+
+class SharedColumns:
+    """Columns of a frame, plus each row's shard, copied into one shared-memory block
+
+    ``layout`` describes each column (name, NumPy dtype, byte offset and, for
+    categoricals, the dtype to rebuild) for ``shard_frame`` in the workers. Use
+    as a context manager; the block is unlinked on exit.
+    """
+
+    def __init__(self, df, columns, shard):
+        sources = [(None, shard, None)]
+        for col in columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                sources.append((col, df[col].cat.codes.to_numpy(), df[col].dtype))
+            else:
+                sources.append((col, df[col].to_numpy(), None))
+        self.layout, size = [], 0
+        for col, values, dtype in sources:
+            self.layout.append((col, values.dtype.str, size, dtype))
+            size += -(-len(shard) * values.itemsize // _ALIGNMENT) * _ALIGNMENT
+        self.rows = len(shard)
+        self.memory = SharedMemory(create=True, size=max(size, 1))
+        try:
+            for (_, values, _), (_, dtype_str, offset, _) in zip(sources, self.layout):
+                np.ndarray(self.rows, dtype_str, self.memory.buf, offset)[:] = values
+        except BaseException:
+            self.close()
+            raise
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def close(self):
+        self.memory.close()
+        self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def shard_frame(buffer, layout, rows, shard):
+    """Frame of the rows of one shard in a SharedColumns block, in their original order"""
+    views = [(col, np.ndarray(rows, dtype_str, buffer, offset), dtype) for col, dtype_str, offset, dtype in layout]
+    positions = np.flatnonzero(views[0][1] == shard)
+    columns = {}
+    for col, values, dtype in views[1:]:
+        values = values.take(positions)
+        columns[col] = values if dtype is None else pd.Categorical.from_codes(values, dtype=dtype)
+    return pd.DataFrame(columns, copy=False)
+
+
+def _run_shard(task):
+    """Worker side: gather one shard's rows from shared memory and apply ``func`` to them"""
+    func, name, layout, rows, shard = task
+    memory = SharedMemory(name=name)
+    try:
+        frame = shard_frame(memory.buf, layout, rows, shard)
+    finally:
+        memory.close()
+    return func(frame)
+
+
+def map_shards(func, df, key, columns, workers):
+    """``func`` applied by a process pool to each shard of ``df`` split by ``key``
+
+    Only ``columns`` (which must include ``key``) reach the workers, and each
+    worker picks its own rows out of them, so the gather runs in parallel too.
+    ``func`` must be a module-level function taking a frame; its results are
+    returned in shard order, one per non-empty shard, for the caller to merge.
+    """
+    shard = shard_ids(df[key], workers)
+    sizes = np.bincount(shard, minlength=workers)
+    with SharedColumns(df, columns, shard) as shared:
+        tasks = [(func, shared.name, shared.layout, shared.rows, k) for k in np.flatnonzero(sizes)]
+        try:
+            return list(process_pool(workers).map(_run_shard, tasks))
+        except BrokenProcessPool:
+            _reset_pool()
+            raise
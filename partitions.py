@@ -0,0 +1,312 @@
+"""Month-partitioned columnar storage for the prepared sales history
+
+Each calendar month of ``purchase_date`` is one Feather file of prepared,
+date-sorted orders, and ``manifest.json`` records every partition's file, row
+count, min/max of its numeric and date columns and the filter values it
+holds. Readers prune on the manifest alone: a date range opens only the months
+it overlaps, and only the requested columns are read from each file. Orders
+without a purchase date go to a partition of their own, which has no date
+statistics and is skipped by any date range, as the date filter skips them.
+
+Value segments depend on a customer's whole history, so they are not stored in
+the partitions; they are looked up in the customer dimension saved next to the
+manifest. Appending orders writes only the months they fall in (a new file for
+a new month, a rewrite of that one month otherwise) and folds them into the
+customer dimension. The manifest is swapped in last, so readers always see a
+consistent dataset.
+
+Usage:
+    python partitions.py                                  # partition the CSV into sales_partitions/
+    python partitions.py --csv history.csv --out /srv/sales_partitions
+    python partitions.py --append new_orders.csv          # add orders, writing only their months
+    SALES_PARTITIONS=/srv/sales_partitions streamlit run streamlit_dashboard.py
+"""
+import argparse
+import json
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+try:
+    import pyarrow  # noqa: F401 - needed by pandas for Feather I/O
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+from customer_dimension import CustomerDimension
+from filter_index import FILTER_COLUMNS
+from sales_data import CACHE_VERSION, DATA_FILE, prepare_sales_data, read_sales_csv
+
+PARTITION_DIR = 'sales_partitions'
+# Environment variable naming the partitioned dataset to serve from
+PARTITIONS_ENV = 'SALES_PARTITIONS'
+MANIFEST_FILE = 'manifest.json'
+# Partition and customer-dimension files this module writes (and may delete)
+DATA_FILE_PATTERN = re.compile(r'^((\d{4}-\d{2}|undated)\.g\d+\.feather|customers\.g\d+\.npz)$')
+# Partition key of orders without a purchase date; sorts after every month
+UNDATED_PARTITION = 'undated'
+# Columns looked up from the customer dimension at read time instead of stored
+DERIVED_COLUMNS = ['value_segment']
+
+
+def partitions_path():
+    """Dataset to serve from: $SALES_PARTITIONS, else PARTITION_DIR if it has a manifest, else None"""
+    path = os.environ.get(PARTITIONS_ENV)
+    if path:
+        return path
+    return PARTITION_DIR if os.path.exists(os.path.join(PARTITION_DIR, MANIFEST_FILE)) else None
+
+
+def manifest_version(directory=PARTITION_DIR):
+    """Changes whenever the manifest is rewritten; a cheap cache key for the dataset"""
+    return os.stat(os.path.join(directory, MANIFEST_FILE)).st_mtime_ns
+
+
+def month_keys(dates):
+    """'YYYY-MM' partition key of each date, UNDATED_PARTITION for missing dates"""
+    keys = dates.to_numpy().astype('datetime64[M]').astype(str)
+    return pd.Index(np.where(dates.isna().to_numpy(), UNDATED_PARTITION, keys))
+
+
+def _json_value(value):
+    """A min/max statistic as JSON: ISO dates and plain numbers"""
+    if isinstance(value, pd.Timestamp):
+        return value.date().isoformat()
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _partition_stats(part):
+    """Row count, min/max of every numeric and date column, and the filter values present"""
+    min_max = {}
+    for col in part.columns:
+        if part[col].dtype.kind in 'iufM' and part[col].notna().any():
+            min_max[col] = [_json_value(part[col].min()), _json_value(part[col].max())]
+    values = {col: sorted(map(str, part[col].dropna().unique())) for col in FILTER_COLUMNS}
+    return {'rows': len(part), 'min_max': min_max, 'values': values}
+
+
+def _write_partition(directory, month, part, generation):
+    """Write one month's orders under a new file name; returns its manifest entry"""
+    name = f"{month}.g{generation}.feather"
+    path = os.path.join(directory, name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    part.reset_index(drop=True).to_feather(tmp_path)
+    os.replace(tmp_path, path)
+    return {'file': name, **_partition_stats(part)}
+
+
+def _write_manifest(directory, manifest):
+    """Swap in a new manifest atomically, then delete files it no longer references"""
+    path = os.path.join(directory, MANIFEST_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+    referenced = {entry['file'] for entry in manifest['partitions'].values()} | {manifest['customers']}
+    for name in os.listdir(directory):
+        if DATA_FILE_PATTERN.match(name) and name not in referenced:
+            os.remove(os.path.join(directory, name))
+
+
+def _commit(directory, manifest, customers, generation):
+    """Save the customer dimension for this generation and publish the manifest"""
+    manifest['generation'] = generation
+    manifest['customers'] = f"customers.g{generation}.npz"
+    manifest['rows'] = sum(entry['rows'] for entry in manifest['partitions'].values())
+    customers.save(os.path.join(directory, manifest['customers']))
+    _write_manifest(directory, manifest)
+    return manifest
+
+
+def write_partitions(df, customers, directory=PARTITION_DIR, source=None):
+    """Write a prepared frame as month partitions with its customer dimension; returns the manifest
+
+    Any dataset already in ``directory`` is replaced.
+    """
+    if not HAS_PYARROW:
+        raise ImportError("Partitioned storage needs the pyarrow package")
+    os.makedirs(directory, exist_ok=True)
+    try:
+        generation = read_manifest(directory)['generation'] + 1
+    except (OSError, ValueError, KeyError):
+        generation = 0
+    stored = df.drop(columns=DERIVED_COLUMNS, errors='ignore')
+    manifest = {'cache_version': CACHE_VERSION, 'source': source, 'partitions': {}}
+    for month, part in stored.groupby(month_keys(stored['purchase_date']), sort=True):
+        part = part.sort_values('purchase_date', kind='stable')
+        manifest['partitions'][month] = _write_partition(directory, month, part, generation)
+    return _commit(directory, manifest, customers, generation)
+
+
+def build_partitions(csv_path=DATA_FILE, directory=PARTITION_DIR):
+    """Prepare the CSV and write it as month partitions; returns the manifest"""
+    raw = read_sales_csv(csv_path)
+    customers = CustomerDimension.from_orders(raw)
+    df = prepare_sales_data(raw, customers)
+    return write_partitions(df, customers, directory, source=os.path.basename(csv_path))
+
+
+def read_manifest(directory=PARTITION_DIR):
+    """The dataset's manifest, checked against the current data version"""
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest['cache_version'] != CACHE_VERSION:
+        raise ValueError(f"{directory} was built for data version {manifest['cache_version']}, "
+                         f"expected {CACHE_VERSION}; rebuild it with `python partitions.py`")
+    return manifest
+
+
+def read_customers(directory=PARTITION_DIR, manifest=None):
+    """The customer dimension covering every partition"""
+    manifest = manifest or read_manifest(directory)
+    return CustomerDimension.load(os.path.join(directory, manifest['customers']))
+
+
+def dataset_profile(manifest):
+    """Total rows, first and last purchase date, and the values of each filter column"""
+    entries = list(manifest['partitions'].values())
+    dates = [entry['min_max']['purchase_date'] for entry in entries if 'purchase_date' in entry['min_max']]
+    return {
+        'rows': manifest['rows'],
+        'min_date': pd.Timestamp(min(lo for lo, _ in dates)) if dates else None,
+        'max_date': pd.Timestamp(max(hi for _, hi in dates)) if dates else None,
+        'values': {col: sorted(set().union(*(entry['values'][col] for entry in entries))) for col in FILTER_COLUMNS},
+    }
+
+
+def prune(manifest, date_range=(), selections=None):
+    """Months whose partitions can hold orders in ``date_range`` matching ``selections``, in order
+
+    ``date_range`` is an inclusive (start, end) pair and ``selections`` maps
+    filter columns to the values to keep, as passed to FilterIndex.lookup.
+    The undated partition is kept only when there is no date range.
+    """
+    start, end = ([pd.Timestamp(d).date().isoformat() for d in date_range] if len(date_range) == 2
+                  else (None, None))
+    months = []
+    for month, entry in sorted(manifest['partitions'].items()):
+        if start is not None:
+            if 'purchase_date' not in entry['min_max']:
+                continue
+            lo, hi = entry['min_max']['purchase_date']
+            if hi < start or lo > end:
+                continue
+        if any(not set(map(str, values)) & set(entry['values'][col]) for col, values in (selections or {}).items()):
+            continue
+        months.append(month)
+    return months
+
+
+def concat_partitions(frames):
+    """Concatenate partition frames, unioning categoricals whose categories differ
+
+    Partitions written by separate appends can see different category sets;
+    plain concatenation would turn those columns into objects.
+    """
+    if len(frames) == 1:
+        return frames[0]
+    combined = pd.concat(frames, ignore_index=True)
+    for col in combined.columns:
+        if isinstance(frames[0][col].dtype, pd.CategoricalDtype) and not isinstance(combined[col].dtype,
+                                                                                      pd.CategoricalDtype):
+            combined[col] = union_categoricals([frame[col] for frame in frames], sort_categories=True)
+    return combined
+
+
+def _read_partition(directory, entry, columns=None):
+    return pd.read_feather(os.path.join(directory, entry['file']), columns=columns)
+
+
+def iter_partitions(directory=PARTITION_DIR, columns=None, manifest=None):
+    """Yield (month, orders) one partition at a time, with only ``columns`` of stored data"""
+    manifest = manifest or read_manifest(directory)
+    for month, entry in sorted(manifest['partitions'].items()):
+        yield month, _read_partition(directory, entry, columns)
+
+
+def load_partitions(directory=PARTITION_DIR, date_range=(), columns=None, selections=None, manifest=None,
+                    customers=None):
+    """Orders in ``date_range``, read from the partitions that overlap it, with only ``columns``
+
+    Boundary months are trimmed to the range (partitions are date-sorted);
+    ``selections`` only prunes partitions, it does not filter rows.
+    ``value_segment`` is looked up in ``customers`` (read from the dataset
+    when not given) if requested. ``columns=None`` reads every column.
+    """
+    manifest = manifest or read_manifest(directory)
+    months = prune(manifest, date_range, selections)
+    segments = columns is None or 'value_segment' in columns
+    stored = None
+    if columns is not None:
+        stored = [col for col in columns if col not in DERIVED_COLUMNS]
+        if segments and 'customer_id' not in stored:
+            stored.append('customer_id')
+        if len(date_range) == 2 and 'purchase_date' not in stored:
+            stored.append('purchase_date')
+
+    frames = []
+    for month in months:
+        part = _read_partition(directory, manifest['partitions'][month], stored)
+        if len(date_range) == 2:
+            dates = part['purchase_date'].to_numpy()
+            lo = np.searchsorted(dates, np.datetime64(pd.Timestamp(date_range[0])), side='left')
+            hi = np.searchsorted(dates, np.datetime64(pd.Timestamp(date_range[1])), side='right')
+            if lo > 0 or hi < len(part):
+                part = part.iloc[lo:hi]
+        frames.append(part)
+    if not frames:
+        first = next(iter(manifest['partitions'].values()), None)
+        frames = [_read_partition(directory, first, stored).iloc[:0]] if first else [pd.DataFrame(columns=stored)]
+    df = concat_partitions(frames).reset_index(drop=True)
+
+    if segments:
+        if customers is None:
+            customers = read_customers(directory, manifest)
+        df['value_segment'] = customers.value_segments(df['customer_id'])
+    return df if columns is None else df[list(columns)]
+
+
+def append_partitions(new_orders, directory=PARTITION_DIR):
+    """Add raw orders (as read by read_sales_csv), writing only the months they fall in; returns the manifest
+
+    A month not stored yet becomes a new partition file; orders landing in a
+    stored month are merged into a rewrite of that one partition.
+    """
+    manifest = read_manifest(directory)
+    customers = read_customers(directory, manifest).update(new_orders)
+    new = prepare_sales_data(new_orders, customers).drop(columns=DERIVED_COLUMNS)
+    generation = manifest['generation'] + 1
+    for month, part in new.groupby(month_keys(new['purchase_date']), sort=True):
+        if month in manifest['partitions']:
+            part = concat_partitions([_read_partition(directory, manifest['partitions'][month]), part])
+        part = part.sort_values('purchase_date', kind='stable')
+        manifest['partitions'][month] = _write_partition(directory, month, part, generation)
+    return _commit(directory, manifest, customers, generation)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=DATA_FILE, help="source CSV to partition")
+    parser.add_argument('--out', default=PARTITION_DIR, help="dataset directory")
+    parser.add_argument('--append', metavar='CSV', help="add this CSV's orders to the existing dataset")
+    args = parser.parse_args(argv)
+
+    if args.append:
+        before = read_manifest(args.out)
+        manifest = append_partitions(read_sales_csv(args.append), args.out)
+        written = sorted(month for month, entry in manifest['partitions'].items()
+                         if entry['file'] != before['partitions'].get(month, {}).get('file'))
+        print(f"Appended {manifest['rows'] - before['rows']:,} rows, writing {', '.join(written) or 'nothing'}")
+    else:
+        manifest = build_partitions(args.csv, args.out)
+        print(f"Wrote {manifest['rows']:,} rows to {len(manifest['partitions'])} partitions in {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
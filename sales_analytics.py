@@ -0,0 +1,282 @@
+"""Headless analytics behind the dashboard - pure functions over order frames
+
+Every function takes pandas frames and returns frames, series or dicts, with
+no Streamlit calls, so each one can be timed and regression-tested on its own.
+Functions documented as taking ``completed`` expect completed orders only
+(see ``completed_orders``); ``daily`` is the output of ``daily_revenue``.
+"""
+import numpy as np
+import pandas as pd
+
+from crosstab import crosstab
+from parallel_agg import map_shards, shard_workers
+from sales_data import ADDON_COLUMNS, ADDON_TYPES, DAY_ORDER, SEASON_BY_MONTH, SEASON_ORDER
+
+# Months in dataset order (the export runs September to August)
+FISCAL_MONTH_ORDER = ['September', 'October', 'November', 'December', 'January', 'February',
+                      'March', 'April', 'May', 'June', 'July', 'August']
+
+# Columns the per-customer and per-SKU groupbys read, shipped to workers in parallel mode
+CUSTOMER_METRIC_COLUMNS = ['customer_id', 'total_price', 'rating', 'purchase_date']
+SKU_COLUMNS = ['sku', 'product_type', 'total_price', 'rating', 'quantity']
+
+
+def completed_orders(df):
+    """Completed orders only"""
+    return df[df['order_status'] == 'Completed']
+
+
+def kpis(df):
+    """Headline metrics: revenue, orders, customers, average order value, completion rate"""
+    is_completed = df['order_status'] == 'Completed'
+    completed_prices = df['total_price'][is_completed]
+    return {
+        'total_revenue': completed_prices.sum(),
+        'total_orders': len(df),
+        'unique_customers': df['customer_id'].nunique(),
+        'avg_order_value': completed_prices.mean(),
+        'completion_rate': is_completed.mean() * 100,
+    }
+
+
+def product_summary(df):
+    """Revenue, average order value, order count and rating per product type"""
+    summary = df.groupby('product_type', observed=True).agg({
+        'total_price': ['sum', 'mean', 'count'],
+        'rating': 'mean'
+    })
+    summary.columns = ['Total Revenue', 'Avg Order Value', 'Order Count', 'Avg Rating']
+    return summary.sort_values('Total Revenue', ascending=False)
+
+
+def loyalty_analysis(df):
+    """Average order value, add-on spend and rating for members vs non-members"""
+    return df.groupby('loyalty_member', observed=True).agg({
+        'total_price': 'mean',
+        'add_on_total': 'mean',
+        'rating': 'mean'
+    })
+
+
+def customer_metrics(completed, workers=1):
+    """Spend, frequency, rating and purchase span per customer
+
+    With ``workers`` > 1, large inputs are sharded by customer across a process
+    pool (see parallel_agg); the result is identical to the serial one.
+    """
+    workers = shard_workers(completed, CUSTOMER_METRIC_COLUMNS, workers)
+    if workers > 1:
+        return pd.concat(map_shards(customer_metrics, completed, 'customer_id', CUSTOMER_METRIC_COLUMNS,
+                                    workers)).sort_index()
+    metrics = completed.groupby('customer_id').agg({
+        'total_price': ['sum', 'mean', 'count'],
+        'rating': 'mean',
+        'purchase_date': ['min', 'max']
+    })
+    metrics.columns = ['total_spent', 'avg_order_value', 'order_count', 'avg_rating',
+                       'first_purchase', 'last_purchase']
+    return metrics
+
+
+def top_customers(metrics, n=10, rfm=None):
+    """The ``n`` customers with the highest spend, from ``customer_metrics`` output
+
+    Given ``rfm`` (CustomerDimension.rfm_scores output), each customer's
+    all-time R, F, M and total RFM scores are added.
+    """
+    top = metrics[['total_spent', 'avg_order_value', 'order_count', 'avg_rating']]
+    top.columns = ['Total Spent', 'Avg Order Value', 'Order Count', 'Avg Rating']
+    top = top.sort_values('Total Spent', ascending=False).head(n)
+    if rfm is not None:
+        scores = rfm[['r_score', 'f_score', 'm_score', 'rfm_score']]
+        scores.columns = ['R', 'F', 'M', 'RFM Score']
+        top = top.join(scores)
+    return top
+
+
+def _sku_totals(completed):
+    """Revenue, order value, rating and units per SKU x product type, in key order"""
+    totals = completed.groupby(['sku', 'product_type'], observed=True).agg({
+        'total_price': ['sum', 'mean', 'count'],
+        'rating': 'mean',
+        'quantity': 'sum'
+    })
+    totals.columns = ['Total Revenue', 'Avg Order Value', 'Order Count', 'Avg Rating', 'Units Sold']
+    return totals
+
+
+def sku_performance(completed, n=None, workers=1):
+    """Revenue, order value, rating and units per SKU, best sellers first
+
+    With ``workers`` > 1, large inputs are sharded by SKU across a process pool
+    (see parallel_agg); the result is identical to the serial one.
+    """
+    workers = shard_workers(completed, SKU_COLUMNS, workers)
+    if workers > 1:
+        performance = pd.concat(map_shards(_sku_totals, completed, 'sku', SKU_COLUMNS, workers)).sort_index()
+    else:
+        performance = _sku_totals(completed)
+    performance = performance.sort_values('Total Revenue', ascending=False)
+    return performance if n is None else performance.head(n)
+
+
+def _group_codes(df, column):
+    """Integer group codes and labels for a column (category codes when categorical)"""
+    if isinstance(df[column].dtype, pd.CategoricalDtype):
+        return df[column].cat.codes.to_numpy(), df[column].cat.categories
+    return pd.factorize(df[column])
+
+
+def _group_sums(codes, n_groups, *weights):
+    """Row count plus per-group sums of each weight array, one bincount pass each"""
+    if len(codes) and codes.min() < 0:
+        valid = codes >= 0
+        codes, weights = codes[valid], [w[valid] for w in weights]
+    return [np.bincount(codes, minlength=n_groups)] + [np.bincount(codes, weights=w, minlength=n_groups)
+                                                       for w in weights]
+
+
+def addon_analysis(df):
+    """Average add-on value and add-on attachment rate per product type"""
+    has_addon = pd.Series(pd.Categorical.from_codes((df['add_on_total'].to_numpy() > 0).astype(np.int8),
+                                                    [False, True]), name='has_addon')
+    grids = crosstab(df, 'product_type', has_addon, value='add_on_total')
+    orders = grids['count'].sum(axis=1)
+    attached = grids['count'].get(True, 0)
+    return pd.DataFrame({
+        'Avg Add-on Value': grids['sum'].sum(axis=1) / orders,
+        'Add-on Attachment Rate (%)': attached / orders * 100,
+    })
+
+
+def addon_type_summary(df):
+    """Add-on items, attachment and revenue per product type x add-on type
+
+    Built from the per-order add-on count columns, so no list strings are
+    parsed. An order's add_on_total is split across its add-on items evenly,
+    since the data has no per-item add-on prices.
+    """
+    codes, labels = _group_codes(df, 'product_type')
+    n_groups = len(labels)
+    counts = [df[col].to_numpy() for col in ADDON_COLUMNS]
+    items_per_order = np.sum(counts, axis=0)
+    value_per_item = np.divide(df['add_on_total'].to_numpy(), items_per_order,
+                               out=np.zeros(len(df)), where=items_per_order > 0)
+
+    orders, *sums = _group_sums(codes, n_groups, *counts, *[c > 0 for c in counts],
+                                *[c * value_per_item for c in counts])
+    n_types = len(ADDON_TYPES)
+    items = np.column_stack(sums[:n_types])
+    attached = np.column_stack(sums[n_types:2 * n_types])
+    revenue = np.column_stack(sums[2 * n_types:])
+
+    kept = np.flatnonzero(orders > 0)
+    items, attached, revenue = items[kept], attached[kept], revenue[kept]
+    items_in_group = items.sum(axis=1, keepdims=True)
+    return pd.DataFrame({
+        'product_type': np.repeat(np.asarray(labels)[kept], n_types),
+        'addon_type': np.tile(ADDON_TYPES, len(kept)),
+        'items': items.ravel().astype(np.int64),
+        'orders_with_addon': attached.ravel().astype(np.int64),
+        'attachment_rate': (attached / orders[kept, None] * 100).ravel(),
+        'mix_share': np.divide(items, items_in_group, out=np.zeros_like(items),
+                               where=items_in_group > 0).ravel() * 100,
+        'revenue': revenue.ravel(),
+    })
+
+
+def segment_revenue(completed):
+    """Revenue per customer value segment"""
+    return completed.groupby('value_segment', observed=True)['total_price'].sum()
+
+
+def customer_lifetime_value(metrics):
+    """Average order value x purchase frequency x lifespan, from ``customer_metrics`` output
+
+    Returns the summary figures and the per-customer frame with its lifespan column.
+    """
+    metrics = metrics[['total_spent', 'avg_order_value', 'order_count', 'first_purchase', 'last_purchase']].copy()
+    metrics['customer_lifespan_days'] = (metrics['last_purchase'] - metrics['first_purchase']).dt.days
+    metrics['customer_lifespan_days'] = metrics['customer_lifespan_days'].fillna(0)
+
+    avg_order_value = metrics['avg_order_value'].mean()
+    avg_purchase_frequency = metrics['order_count'].mean()
+    avg_customer_lifespan = metrics['customer_lifespan_days'].mean() / 365  # in years
+    summary = {
+        'avg_order_value': avg_order_value,
+        'avg_purchase_frequency': avg_purchase_frequency,
+        'avg_customer_lifespan': avg_customer_lifespan,
+        'clv': avg_order_value * avg_purchase_frequency * avg_customer_lifespan,
+    }
+    return summary, metrics
+
+
+def product_totals(completed):
+    """Revenue and units per product type"""
+    return completed.groupby('product_type', observed=True).agg({
+        'total_price': 'sum',
+        'quantity': 'sum'
+    })
+
+
+def product_profitability(totals, cost_percentage):
+    """Estimated cost, gross profit and margin from ``product_totals`` output"""
+    profit = totals.copy()
+    profit['estimated_cost'] = profit['total_price'] * cost_percentage
+    profit['gross_profit'] = profit['total_price'] - profit['estimated_cost']
+    profit['profit_margin'] = (profit['gross_profit'] / profit['total_price'] * 100).round(2)
+    return profit
+
+
+def conversion_rates(df):
+    """Completed orders, total orders and conversion rate per product type"""
+    counts = crosstab(df, 'product_type', 'order_status')['count']
+    conversion = pd.DataFrame({
+        'completed_orders': counts.get('Completed', 0),
+        'total_orders': counts.sum(axis=1),
+    })
+    conversion['conversion_rate'] = (conversion['completed_orders'] / conversion['total_orders'] * 100).round(2)
+    return conversion
+
+
+def daily_revenue(completed):
+    """Revenue sum and order count per purchase date"""
+    return completed.groupby('purchase_date')['total_price'].agg(['sum', 'count'])
+
+
+def monthly_revenue(daily):
+    """Revenue per calendar month"""
+    return daily['sum'].groupby(daily.index.to_period('M')).sum()
+
+
+def season_totals(daily):
+    """Revenue sum and order count per season"""
+    seasons = pd.Categorical(daily.index.month.map(SEASON_BY_MONTH), categories=SEASON_ORDER)
+    return daily.groupby(seasons, observed=True).sum()
+
+
+def weekday_average_order_value(daily):
+    """Average order value per day of week, Monday first"""
+    totals = daily.groupby(daily.index.day_name()).sum()
+    average = totals['sum'] / totals['count']
+    return average.reindex([day for day in DAY_ORDER if day in average.index])
+
+
+def seasonal_multipliers(totals):
+    """Each season's average order value relative to the overall average"""
+    overall_avg = totals['sum'].sum() / totals['count'].sum()
+    multipliers = (totals['sum'] / totals['count'] / overall_avg).round(2)
+    return pd.DataFrame({
+        'Season': multipliers.index,
+        'Multiplier': multipliers.values,
+        'Performance': ['Above Average' if x > 1.0 else 'Below Average' for x in multipliers.values]
+    })
+
+
+def revenue_heatmap(completed, value='total_price'):
+    """Revenue pivot of product type x month, months in dataset order
+
+    Works on raw completed orders or on completed cube rows (``value='revenue'``).
+    """
+    pivot = crosstab(completed, 'product_type', 'month_name', value=value)['sum']
+    return pivot.reindex(columns=[m for m in FISCAL_MONTH_ORDER if m in pivot.columns])
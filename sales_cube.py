@@ -0,0 +1,87 @@
+"""Pre-aggregated sales cube answering the filterable count/sum views"""
+import pandas as pd
+
+from sales_data import MONTH_ORDER
+
+# Cube grain: one row per day x product x status x payment x shipping x loyalty
+CUBE_DIMENSIONS = [
+    'purchase_date', 'product_type', 'order_status',
+    'payment_method', 'shipping_type', 'loyalty_member'
+]
+# Order columns build_sales_cube reads
+CUBE_COLUMNS = CUBE_DIMENSIONS + ['total_price', 'rating', 'quantity']
+
+
+def build_sales_cube(df):
+    """Aggregate raw orders to the cube grain with sum/count/sum-of-squares measures"""
+    measures = pd.DataFrame({
+        'total_price': df['total_price'],
+        'total_price_sq': df['total_price'] ** 2,
+        'rating': df['rating'],
+        'quantity': df['quantity'],
+    })
+    measures[CUBE_DIMENSIONS] = df[CUBE_DIMENSIONS]
+
+    cube = measures.groupby(CUBE_DIMENSIONS, observed=True).agg(
+        order_count=('total_price', 'size'),
+        revenue=('total_price', 'sum'),
+        revenue_sq=('total_price_sq', 'sum'),
+        rating_sum=('rating', 'sum'),
+        rating_count=('rating', 'count'),
+        units=('quantity', 'sum'),
+    ).reset_index()
+
+    # Keep the calendar label the heatmap pivots on, derived once per cube row
+    cube['month_name'] = pd.Categorical.from_codes(cube['purchase_date'].dt.month - 1, MONTH_ORDER)
+    return cube
+
+
+def completed(cube):
+    """Cube rows for completed orders only"""
+    return cube[cube['order_status'] == 'Completed']
+
+
+def cube_kpis(cube):
+    """Revenue, order count, average order value and completion rate"""
+    done = completed(cube)
+    total_orders = int(cube['order_count'].sum())
+    completed_orders = int(done['order_count'].sum())
+    total_revenue = done['revenue'].sum()
+    return {
+        'total_revenue': total_revenue,
+        'total_orders': total_orders,
+        'avg_order_value': total_revenue / completed_orders if completed_orders else float('nan'),
+        'completion_rate': completed_orders / total_orders * 100 if total_orders else float('nan'),
+    }
+
+
+def cube_daily_revenue(cube):
+    """Completed-order revenue sum and order count per purchase date"""
+    daily = completed(cube).groupby('purchase_date')[['revenue', 'order_count']].sum()
+    daily.columns = ['sum', 'count']
+    return daily[daily['count'] > 0]
+
+
+def cube_counts(cube, dimension):
+    """Order counts per value of a cube dimension, largest first"""
+    counts = cube.groupby(dimension, observed=True)['order_count'].sum()
+    return counts[counts > 0].sort_values(ascending=False)
+
+
+def cube_summary(cube, dimension):
+    """Revenue sum/mean/std, order count and average rating per dimension value"""
+    grouped = cube.groupby(dimension, observed=True)[
+        ['order_count', 'revenue', 'revenue_sq', 'rating_sum', 'rating_count', 'units']
+    ].sum()
+    grouped = grouped[grouped['order_count'] > 0]
+
+    summary = pd.DataFrame(index=grouped.index)
+    summary['revenue'] = grouped['revenue']
+    summary['mean'] = grouped['revenue'] / grouped['order_count']
+    summary['count'] = grouped['order_count']
+    # Sample standard deviation from the sum-of-squares measure
+    variance = (grouped['revenue_sq'] - grouped['revenue'] ** 2 / grouped['order_count']) / (grouped['order_count'] - 1)
+    summary['std'] = variance.clip(lower=0) ** 0.5
+    summary['rating'] = grouped['rating_sum'] / grouped['rating_count']
+    summary['units'] = grouped['units']
+    return summary
@@ -0,0 +1,227 @@
+"""Typed load path and on-disk columnar cache for the electronic sales data"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from customer_dimension import RFM_LEVELS, VALUE_BINS, VALUE_LABELS, CustomerDimension  # noqa: F401 - re-exported
+
+try:
+    import pyarrow  # noqa: F401 - needed by pandas for Feather I/O
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+DATA_FILE = 'Electronic_sales_Sep2023-Sep2024.csv'
+CACHE_DIR = '.sales_cache'
+# Bump whenever prepare_sales_data() changes its output schema
+CACHE_VERSION = 5
+
+# Low-cardinality string columns stored as pandas categoricals
+CATEGORICAL_COLUMNS = [
+    'gender', 'loyalty_member', 'product_type', 'sku', 'order_status',
+    'payment_method', 'shipping_type', 'add_ons_purchased'
+]
+
+# Integer columns downcast to the smallest dtype that holds their range.
+# Money columns stay float64 so revenue totals keep cent precision.
+INTEGER_COLUMNS = ['customer_id', 'age', 'rating', 'quantity']
+
+CUSTOMER_CACHE_SUFFIX = '-customers.npz'
+
+MONTH_ORDER = ['January', 'February', 'March', 'April', 'May', 'June', 'July',
+               'August', 'September', 'October', 'November', 'December']
+DAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+SEASON_ORDER = ['Winter', 'Spring', 'Summer', 'Fall']
+SEASON_BY_MONTH = {12: 'Winter', 1: 'Winter', 2: 'Winter',
+                   3: 'Spring', 4: 'Spring', 5: 'Spring',
+                   6: 'Summer', 7: 'Summer', 8: 'Summer',
+                   9: 'Fall', 10: 'Fall', 11: 'Fall'}
+
+AGE_BINS = [0, 25, 35, 45, 55, 100]
+AGE_LABELS = ['18-24', '25-34', '35-44', '45-54', '55+']
+
+# Add-on types found in the add_ons_purchased lists, and their per-order count columns
+ADDON_TYPES = ['Accessory', 'Extended Warranty', 'Impulse Item']
+ADDON_COLUMNS = ['addon_accessory', 'addon_extended_warranty', 'addon_impulse_item']
+
+
+def clean_column_name(name):
+    """Normalize a raw CSV header - handle spaces, hyphens, and case"""
+    return name.replace(' ', '_').replace('-', '_').lower()
+
+
+def addon_counts(addons):
+    """Per-order item count of each add-on type, as an int8 matrix (orders x ADDON_TYPES)
+
+    Each distinct list string is tokenized once and the resulting small table
+    is expanded to rows by its codes, so no string work happens per order.
+    Tokens outside ADDON_TYPES are ignored.
+    """
+    if isinstance(addons.dtype, pd.CategoricalDtype):
+        codes, values = addons.cat.codes.to_numpy(), addons.cat.categories
+    else:
+        codes, values = pd.factorize(addons)
+
+    # The extra last row stays zero and is picked by code -1 (no add-ons)
+    table = np.zeros((len(values) + 1, len(ADDON_TYPES)), dtype=np.int8)
+    for i, value in enumerate(values):
+        for token in str(value).split(','):
+            token = token.strip()
+            if token in ADDON_TYPES:
+                table[i, ADDON_TYPES.index(token)] += 1
+    return table[codes]
+
+
+def read_sales_csv(path=DATA_FILE):
+    """Read the raw CSV with compact dtypes and cleaned column names"""
+    header = pd.read_csv(path, nrows=0).columns
+    dtype = {raw: 'category' for raw in header if clean_column_name(raw) in CATEGORICAL_COLUMNS}
+    # Dates repeat heavily, so parse them through the date dimension instead of per row
+    dtype.update({raw: 'category' for raw in header if clean_column_name(raw) == 'purchase_date'})
+
+    df = pd.read_csv(path, dtype=dtype)
+    df.columns = [clean_column_name(c) for c in df.columns]
+
+    for col in INTEGER_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+            if df[col].dtype.kind == 'f':
+                # Missing values force a float column; float32 is exact for these small integers
+                df[col] = df[col].astype('float32')
+    return df
+
+
+def build_date_dimension(dates):
+    """Return per-row date codes and one calendar row per distinct purchase date"""
+    if isinstance(dates.dtype, pd.CategoricalDtype):
+        codes = dates.cat.codes.to_numpy()
+        uniques = pd.to_datetime(dates.cat.categories)
+    else:
+        codes, uniques = pd.factorize(pd.to_datetime(dates), sort=True)
+
+    dim = pd.DataFrame({'purchase_date': pd.DatetimeIndex(uniques)})
+    month = dim['purchase_date'].dt.month
+    dim['year'] = dim['purchase_date'].dt.year.astype('int16')
+    dim['month'] = month.astype('int8')
+    dim['month_name'] = pd.Categorical.from_codes(month - 1, MONTH_ORDER)
+    dim['day_name'] = pd.Categorical.from_codes(dim['purchase_date'].dt.dayofweek, DAY_ORDER)
+    dim['quarter'] = dim['purchase_date'].dt.quarter.astype('int8')
+    dim['season'] = pd.Categorical(month.map(SEASON_BY_MONTH), categories=SEASON_ORDER)
+    return codes, dim
+
+
+def prepare_sales_data(df, customers=None):
+    """Derive calendar fields, age groups and customer value segments, sorted by date
+
+    Value segments are looked up in ``customers``, a CustomerDimension covering
+    every customer in ``df``; one is built from ``df`` when not given.
+    """
+    # Expand calendar fields from the small date dimension instead of per-row strftime;
+    # a missing date (code -1) gets NaT and missing calendar fields, as pd.to_datetime gives
+    codes, date_dim = build_date_dimension(df['purchase_date'])
+    for col in date_dim.columns:
+        df[col] = date_dim[col].array.take(codes, allow_fill=True)
+        if df[col].dtype.kind == 'f':
+            # Integer calendar fields turn float around missing dates; float32 is exact for them
+            df[col] = df[col].astype('float32')
+
+    # Tokenize the add-on lists once into per-type item counts
+    counts = addon_counts(df['add_ons_purchased'])
+    for i, col in enumerate(ADDON_COLUMNS):
+        df[col] = counts[:, i]
+
+    # Create age groups
+    df['age_group'] = pd.cut(df['age'],
+                             bins=AGE_BINS,
+                             labels=AGE_LABELS,
+                             include_lowest=True)
+
+    # Customer value segments by total spending, read from the customer dimension by code
+    if customers is None:
+        customers = CustomerDimension.from_orders(df)
+    df['value_segment'] = customers.value_segments(df['customer_id'])
+
+    # Keep rows in purchase-date order so a date range is one contiguous slice
+    return df.sort_values('purchase_date', kind='stable', ignore_index=True)
+
+
+def _cache_path(path, cache_dir, suffix='.feather'):
+    """Cache file name keyed by the source file's size and mtime"""
+    stat = os.stat(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{stem}-{stat.st_size}-{stat.st_mtime_ns}-v{CACHE_VERSION}{suffix}")
+
+
+def _remove_stale_caches(path, cache_dir, keep, suffix='.feather'):
+    """Drop cache files left behind by older versions of the source file"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    for name in os.listdir(cache_dir):
+        candidate = os.path.join(cache_dir, name)
+        if name.startswith(f"{stem}-") and name.endswith(suffix) and candidate != keep:
+            os.remove(candidate)
+
+
+def _save_customers(customers, path, cache_dir):
+    """Persist the customer dimension next to the Feather cache"""
+    os.makedirs(cache_dir, exist_ok=True)
+    customer_file = _cache_path(path, cache_dir, CUSTOMER_CACHE_SUFFIX)
+    customers.save(customer_file)
+    _remove_stale_caches(path, cache_dir, keep=customer_file, suffix=CUSTOMER_CACHE_SUFFIX)
+
+
+def load_sales_data(path=DATA_FILE, cache_dir=CACHE_DIR, use_cache=True, workers=1):
+    """Load the prepared sales frame, reusing the Feather cache when it is fresh
+
+    ``workers`` > 1 builds the customer dimension behind the value segments in
+    parallel (see CustomerDimension.from_orders).
+    """
+    use_cache = use_cache and HAS_PYARROW
+    if use_cache:
+        cache_file = _cache_path(path, cache_dir)
+        if os.path.exists(cache_file):
+            return pd.read_feather(cache_file)
+
+    raw = read_sales_csv(path)
+    customers = CustomerDimension.from_orders(raw, workers)
+    df = prepare_sales_data(raw, customers)
+
+    if use_cache:
+        _save_customers(customers, path, cache_dir)
+        # Write to a temporary name first so concurrent readers never see a partial file
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        df.to_feather(tmp_file)
+        os.replace(tmp_file, cache_file)
+        _remove_stale_caches(path, cache_dir, keep=cache_file)
+    return df
+
+
+def load_customer_dimension(path=DATA_FILE, cache_dir=CACHE_DIR, use_cache=True, workers=1):
+    """Load the customer dimension for a sales file, from its cache when fresh"""
+    if use_cache:
+        customer_file = _cache_path(path, cache_dir, CUSTOMER_CACHE_SUFFIX)
+        if os.path.exists(customer_file):
+            return CustomerDimension.load(customer_file)
+
+    customers = CustomerDimension.from_orders(load_sales_data(path, cache_dir, use_cache, workers), workers)
+    if use_cache:
+        _save_customers(customers, path, cache_dir)
+    return customers
+
+
+def append_sales_data(df, new_orders, customers):
+    """Append raw orders to a prepared frame, updating ``customers`` in place
+
+    Only the new orders are aggregated; existing rows just re-read their value
+    segment, since appended spend can move a customer to another segment.
+    """
+    customers.update(new_orders)
+    new = prepare_sales_data(new_orders, customers)
+    combined = pd.concat([df, new], ignore_index=True)
+    for col in combined.columns:
+        # Align categories that differ between the two frames
+        if isinstance(df[col].dtype, pd.CategoricalDtype) and not isinstance(combined[col].dtype,
+                                                                               pd.CategoricalDtype):
+            combined[col] = combined[col].astype('category')
+    combined['value_segment'] = customers.value_segments(combined['customer_id'])
+    return combined.sort_values('purchase_date', kind='stable', ignore_index=True)
@@ -0,0 +1,187 @@
+"""Per-rerun view over the filtered orders with memoized shared aggregates"""
+import cohorts
+import copurchase
+import crosstab
+import export
+import rollups
+import sales_analytics as analytics
+from instrumentation import NULL_TIMER, rows_of
+from sales_cube import cube_daily_revenue
+
+
+class SalesView:
+    """Filtered orders plus the subsets and groupbys every dashboard section shares
+
+    Each aggregate is computed on first use and reused for the rest of the rerun.
+    ``scan_count`` counts the passes made over row-level data so the cost of a
+    rerun is visible. ``customers`` is a CustomerDimension to read per-customer
+    metrics from; pass it only when ``df`` holds every order, since the
+    dimension does not know the filters. With a ``timer`` (see instrumentation)
+    each computed aggregate is timed as its own section.
+
+    ``timeline`` answers per-period completed revenue: a callable taking a
+    resolution, e.g. SalesRollups.series bound to the current filters. Without
+    it, per-day revenue comes from the cube (or the rows when there is none).
+
+    ``sample`` is a uniform sample of the filtered orders (see
+    SalesSketches.sample_rows) for row-level charts to plot in place of every
+    order; every aggregate still comes from ``df``, so it stays exact.
+
+    ``workers`` > 1 computes the per-customer and per-SKU groupbys on that many
+    processes (see parallel_agg); results are identical to the serial ones.
+    """
+
+    def __init__(self, df, cube=None, customers=None, timer=NULL_TIMER, timeline=None, sample=None,
+                 workers=1):
+        self.df = df
+        self.cube = cube
+        self.customers = customers
+        self.timer = timer
+        self.timeline = timeline
+        self.sample = sample
+        self.workers = workers
+        self.scan_count = 0
+        self._memo = {}
+
+    def _cached(self, key, compute):
+        """Return a memoized result, counting a row scan when it is computed"""
+        if key not in self._memo:
+            self.scan_count += 1
+            name = key if isinstance(key, str) else '/'.join(map(str, key))
+            with self.timer.section(f"view.{name}", rows_in=len(self.df), kind='aggregate') as record:
+                self._memo[key] = compute()
+                record['rows_out'] = rows_of(self._memo[key])
+        return self._memo[key]
+
+    def _precomputed(self, key, read):
+        """Memoize a read from precomputed structures; it is not a row scan"""
+        if key not in self._memo:
+            self._memo[key] = read()
+        return self._memo[key]
+
+    @property
+    def is_sample(self):
+        """Whether row-level charts plot a sample rather than every filtered order"""
+        return self.sample is not None
+
+    @property
+    def sample_weight(self):
+        """Filtered orders each row of ``chart_orders`` stands for (1 without a sample)"""
+        if self.sample is None:
+            return 1.0
+        return len(self.df) / max(len(self.sample), 1)
+
+    @property
+    def chart_orders(self):
+        """Completed orders for row-level charts: the sample's when there is one"""
+        if self.sample is None:
+            return self.completed
+        return self._cached('sample_completed', lambda: analytics.completed_orders(self.sample))
+
+    @property
+    def completed(self):
+        """Completed orders - the subset most sections aggregate"""
+        return self._cached('completed', lambda: analytics.completed_orders(self.df))
+
+    @property
+    def unique_customers(self):
+        """Distinct customers among the filtered orders"""
+        return self._cached('unique_customers', lambda: self.df['customer_id'].nunique())
+
+    def counts(self, column):
+        """Order counts per value of a column"""
+        return self._cached(('counts', column), lambda: self.df[column].value_counts())
+
+    @property
+    def per_customer(self):
+        """Completed-order spend, frequency, rating and purchase span per customer"""
+        if self.customers is not None:
+            return self._precomputed('per_customer', self.customers.completed_metrics)
+        return self._cached('per_customer', lambda: analytics.customer_metrics(self.completed, self.workers))
+
+    @property
+    def cohorts(self):
+        """Acquisition-month cohort sizes, retention and revenue-per-customer matrices"""
+        return self._cached('cohorts', lambda: cohorts.cohort_matrices(self.completed))
+
+    @property
+    def per_product(self):
+        """Completed-order revenue and units per product type"""
+        return self._cached('per_product', lambda: analytics.product_totals(self.completed))
+
+    @property
+    def per_sku(self):
+        """Completed-order revenue, rating and units per SKU, best sellers first"""
+        return self._cached('per_sku', lambda: analytics.sku_performance(self.completed, workers=self.workers))
+
+    @property
+    def per_loyalty(self):
+        """Average order value, add-on spend and rating for members vs non-members"""
+        return self._cached('per_loyalty', lambda: analytics.loyalty_analysis(self.df))
+
+    @property
+    def per_product_addons(self):
+        """Average add-on value and add-on attachment rate per product type"""
+        return self._cached('per_product_addons', lambda: analytics.addon_analysis(self.df))
+
+    @property
+    def per_product_addon_types(self):
+        """Add-on items, attachment and revenue per product type x add-on type"""
+        return self._cached('per_product_addon_types', lambda: analytics.addon_type_summary(self.df))
+
+    @property
+    def per_product_status(self):
+        """Completed orders, total orders and conversion rate per product type"""
+        return self._cached('per_product_status', lambda: analytics.conversion_rates(self.df))
+
+    @property
+    def per_segment(self):
+        """Completed-order revenue per customer value segment"""
+        return self._cached('per_segment', lambda: analytics.segment_revenue(self.completed))
+
+    def crosstab(self, rows, columns, value=None, completed_only=False):
+        """Count, sum and mean grids of ``value`` per rows x columns cell"""
+        orders = (lambda: self.completed) if completed_only else (lambda: self.df)
+        return self._cached(('crosstab', rows, columns, value, completed_only),
+                            lambda: crosstab.crosstab(orders(), rows, columns, value))
+
+    @property
+    def per_day(self):
+        """Completed-order revenue and order count per purchase date"""
+        if self.timeline is not None:
+            return self._precomputed('per_day', lambda: self.timeline('day'))
+        if self.cube is not None:
+            return self._cached('per_day', lambda: cube_daily_revenue(self.cube))
+        return self._cached('per_day', lambda: analytics.daily_revenue(self.completed))
+
+    def export_estimate(self, fmt):
+        """Row count and estimated file size of the filtered orders exported as ``fmt``"""
+        return self._cached(('export_estimate', fmt), lambda: export.estimate_export(self.df, fmt))
+
+    def co_purchases(self, item, window_days=0):
+        """Completed-order item pairs bought in the same basket, every pair kept"""
+        return self._cached(('co_purchases', item, window_days),
+                            lambda: copurchase.co_purchases(self.completed, item, window_days, min_count=1))
+
+    # Calendar rollups below are derived from per_day, so they cost no extra scan
+
+    def per_period(self, resolution):
+        """Completed-order revenue sum and count per day, week, month or quarter"""
+        if self.timeline is not None:
+            return self._precomputed(('per_period', resolution), lambda: self.timeline(resolution))
+        return rollups.resample(self.per_day, resolution)
+
+    def resolution(self, min_points):
+        """Coarsest resolution with at least ``min_points`` periods over the filtered dates"""
+        days = self.per_day.index
+        if days.empty:
+            return 'day'
+        return rollups.choose_resolution(days.min(), days.max(), min_points)
+
+    def per_season(self):
+        """Completed-order revenue sum and count per season"""
+        return analytics.season_totals(self.per_day)
+
+    def per_weekday(self):
+        """Completed-order average order value per day of week"""
+        return analytics.weekday_average_order_value(self.per_day)
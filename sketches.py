@@ -0,0 +1,231 @@
+"""Mergeable per-partition sketches for approximate KPIs over very large histories
+
+Orders are partitioned by calendar period (month by default) x every
+combination of the sidebar filter columns. Each partition keeps:
+
+- a HyperLogLog register array over customer ids, for distinct customers
+- a log-bucketed order-value histogram (DDSketch), for quantiles within a
+  fixed relative error
+- a bottom-k priority sample of its rows, for the row-level charts
+
+All three merge by elementwise max, sum or union, so any filter combination
+is answered by merging the matching partitions. Periods cut by the ends of a
+date range are sketched on the fly from their rows (at most two contiguous
+row slices), so date filters stay exact to the day. Rows must be sorted by
+``purchase_date``, as FilterIndex also requires.
+"""
+import functools
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from filter_index import FILTER_COLUMNS
+from rollups import period_starts
+
+HLL_PRECISION = 12  # 4096 registers per partition, 1.6% standard error
+QUANTILE_ACCURACY = 0.01  # Relative error of order-value quantiles
+MIN_ORDER_VALUE = 0.01  # Smaller (and non-positive) values share the lowest bucket
+EXACT_MAX_ROWS = 1_000_000  # Filters matching no more orders than this are computed exactly
+SAMPLE_ROWS = 20_000  # Rows handed to the row-level charts
+# Rows kept per partition: enough that any filter over EXACT_MAX_ROWS yields SAMPLE_ROWS with margin
+SAMPLE_RATE = min(1.0, 2 * SAMPLE_ROWS / EXACT_MAX_ROWS)
+Z_95 = 1.96
+
+
+def hll_cells(hashes, precision=HLL_PRECISION):
+    """Register index and rank (position of the first set bit) for 64-bit hashes"""
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    rest = hashes & np.uint64((1 << (64 - precision)) - 1)
+    # rest < 2**52 converts to float exactly; frexp's exponent is its bit length
+    _, bit_length = np.frexp(rest.astype(np.float64))
+    rank = (64 - precision + 1 - bit_length).astype(np.uint8)
+    return index, rank
+
+
+def hll_estimate(registers):
+    """Distinct-count estimate from one HyperLogLog register array"""
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.ldexp(1.0, -registers.astype(np.int64)).sum()
+    zeros = np.count_nonzero(registers == 0)
+    if raw <= 2.5 * m and zeros:
+        # Linear counting is more accurate while many registers are empty
+        return m * np.log(m / zeros)
+    return raw
+
+
+class SalesSketches:
+    """HyperLogLog, order-value quantile and sample sketches per period x filter combination"""
+
+    def __init__(self, df, period='month', columns=FILTER_COLUMNS, precision=HLL_PRECISION,
+                 accuracy=QUANTILE_ACCURACY, sample_rate=SAMPLE_RATE, seed=0, cache_size=8):
+        dates = df['purchase_date'].to_numpy()
+        if len(dates) > 1 and (dates[1:] < dates[:-1]).any():
+            raise ValueError("SalesSketches needs rows sorted by purchase_date")
+
+        self.dates = dates
+        self.n_rows = len(df)
+        self.precision = precision
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.customer_ids = df['customer_id'].to_numpy()
+        self.prices = df['total_price'].to_numpy(dtype=np.float64)
+
+        # Filter values and per-row codes; categorical codes are views, not copies
+        self.values = {}
+        self.codes = {}
+        for col in columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                self.codes[col], self.values[col] = df[col].cat.codes.to_numpy(), df[col].cat.categories
+            else:
+                self.codes[col], self.values[col] = pd.factorize(df[col])
+        self.n_combos = int(np.prod([len(values) for values in self.values.values()], dtype=np.int64))
+
+        # Rows are date-sorted, so every period is one contiguous row slice
+        if self.n_rows:
+            days = np.arange(dates[0].astype('datetime64[D]'), dates[-1].astype('datetime64[D]') + 1)
+            starts = np.unique(period_starts(days, period))
+        else:
+            starts = np.empty(0, dtype='datetime64[D]')
+        self.bounds = np.r_[np.searchsorted(dates, starts.astype(dates.dtype)), self.n_rows]
+        self.bounds[0] = 0
+
+        buckets = self._buckets(self.prices)
+        self.bucket_offset = int(buckets.min(initial=0))
+        self.n_buckets = int(buckets.max(initial=0)) - self.bucket_offset + 1
+
+        # One pass per period slice
+        n_periods = len(starts)
+        m = 1 << precision
+        self.registers = np.zeros((n_periods, self.n_combos, m), dtype=np.uint8)
+        self.value_counts = np.zeros((n_periods, self.n_combos, self.n_buckets), dtype=np.int64)
+        rng = np.random.default_rng(seed)
+        positions, priorities, combos = [], [], []
+        for p in range(n_periods):
+            lo, hi = int(self.bounds[p]), int(self.bounds[p + 1])
+            combo, self.registers[p], self.value_counts[p] = self._sketch_rows(lo, hi)
+            priority = rng.random(hi - lo)
+            kept = np.flatnonzero(priority < sample_rate)
+            positions.append(kept + lo)
+            priorities.append(priority[kept])
+            combos.append(combo[kept])
+        self.sample_positions = np.concatenate(positions) if positions else np.empty(0, dtype=np.int64)
+        self.sample_priorities = np.concatenate(priorities) if priorities else np.empty(0)
+        self.sample_combos = np.concatenate(combos) if combos else np.empty(0, dtype=np.int64)
+
+        self._edge_cache = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def _buckets(self, values):
+        """DDSketch bucket of each order value"""
+        values = np.maximum(values, MIN_ORDER_VALUE)
+        return np.ceil(np.log(values) / np.log(self.gamma)).astype(np.int64)
+
+    def _combos(self, lo, hi):
+        """Filter-combination code of rows [lo, hi)"""
+        combo = np.zeros(hi - lo, dtype=np.int64)
+        for col, values in self.values.items():
+            combo = combo * len(values) + self.codes[col][lo:hi]
+        return combo
+
+    def _sketch_rows(self, lo, hi):
+        """Combination codes plus per-combination registers and value counts for rows [lo, hi)"""
+        combo = self._combos(lo, hi)
+        m = 1 << self.precision
+        registers = np.zeros(self.n_combos * m, dtype=np.uint8)
+        index, rank = hll_cells(pd.util.hash_array(self.customer_ids[lo:hi]), self.precision)
+        np.maximum.at(registers, combo * m + index, rank)
+        buckets = self._buckets(self.prices[lo:hi]) - self.bucket_offset
+        value_counts = np.bincount(combo * self.n_buckets + buckets, minlength=self.n_combos * self.n_buckets)
+        return combo, registers.reshape(self.n_combos, m), value_counts.reshape(self.n_combos, self.n_buckets)
+
+    def _edge_sketch(self, lo, hi):
+        """Registers and value counts per combination for a slice cut by a date range, cached"""
+        with self._lock:
+            if (lo, hi) in self._edge_cache:
+                self._edge_cache.move_to_end((lo, hi))
+                return self._edge_cache[(lo, hi)]
+        _, registers, value_counts = self._sketch_rows(lo, hi)
+        with self._lock:
+            self._edge_cache[(lo, hi)] = registers, value_counts
+            while len(self._edge_cache) > self._cache_size:
+                self._edge_cache.popitem(last=False)
+        return registers, value_counts
+
+    def row_range(self, date_range):
+        """Row slice [lo, hi) covering an inclusive (start, end) date range"""
+        if len(date_range) != 2:
+            return 0, self.n_rows
+        lo = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(date_range[0])), side='left')
+        hi = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(date_range[1])), side='right')
+        return int(lo), int(hi)
+
+    def combo_mask(self, selections):
+        """Boolean mask over filter combinations; columns missing from ``selections`` match everything"""
+        masks = [values.isin(list(selections[col])) if col in selections else np.ones(len(values), dtype=bool)
+                 for col, values in self.values.items()]
+        return functools.reduce(lambda acc, mask: np.logical_and.outer(acc, mask).ravel(), masks,
+                                np.ones(1, dtype=bool))
+
+    def _merged(self, date_range, selections):
+        """Registers and value counts merged over every partition matching the filters"""
+        lo, hi = self.row_range(date_range)
+        mask = self.combo_mask(selections)
+        registers = np.zeros(1 << self.precision, dtype=np.uint8)
+        value_counts = np.zeros(self.n_buckets, dtype=np.int64)
+        if lo >= hi or not mask.any():
+            return registers, value_counts
+
+        # Periods lying entirely inside [lo, hi) merge their stored sketches
+        first = int(np.searchsorted(self.bounds[:-1], lo, side='left'))
+        last = int(np.searchsorted(self.bounds[1:], hi, side='right')) - 1
+        if first <= last:
+            registers = self.registers[first:last + 1, mask].max(axis=(0, 1))
+            value_counts = self.value_counts[first:last + 1, mask].sum(axis=(0, 1))
+            edges = [(lo, int(self.bounds[first])), (int(self.bounds[last + 1]), hi)]
+        else:
+            edges = [(lo, hi)]
+
+        # Cut periods at either end are sketched from their rows
+        for edge_lo, edge_hi in edges:
+            if edge_lo < edge_hi:
+                edge_registers, edge_counts = self._edge_sketch(edge_lo, edge_hi)
+                registers = np.maximum(registers, edge_registers[mask].max(axis=0))
+                value_counts = value_counts + edge_counts[mask].sum(axis=0)
+        return registers, value_counts
+
+    def unique_customers(self, date_range, selections):
+        """Distinct customers among matching orders: ``estimate`` with a 95% ``low``/``high`` interval"""
+        registers, _ = self._merged(date_range, selections)
+        estimate = hll_estimate(registers)
+        margin = Z_95 * 1.04 / np.sqrt(len(registers)) * estimate
+        return {'estimate': estimate, 'low': max(0.0, estimate - margin), 'high': estimate + margin}
+
+    def order_value_quantiles(self, date_range, selections, quantiles=(0.5, 0.9)):
+        """Order-value quantiles of matching orders, each within ``accuracy`` relative error"""
+        _, value_counts = self._merged(date_range, selections)
+        total = value_counts.sum()
+        if total == 0:
+            return {q: float('nan') for q in quantiles}
+        ranks = np.floor(np.asarray(quantiles) * (total - 1))
+        buckets = np.searchsorted(np.cumsum(value_counts), ranks, side='right') + self.bucket_offset
+        values = 2 * self.gamma ** buckets.astype(np.float64) / (self.gamma + 1)
+        return dict(zip(quantiles, values.tolist()))
+
+    def sample_rows(self, date_range, selections, size=SAMPLE_ROWS):
+        """Row positions of a uniform sample of up to ``size`` matching orders, in row order
+
+        Each row drew one random priority at build time and partitions keep
+        their lowest-priority rows, so the lowest ``size`` priorities across
+        the matching partitions are a uniform sample of the filtered orders.
+        """
+        lo, hi = self.row_range(date_range)
+        keep = self.combo_mask(selections)[self.sample_combos]
+        keep &= (self.sample_positions >= lo) & (self.sample_positions < hi)
+        positions, priorities = self.sample_positions[keep], self.sample_priorities[keep]
+        if len(positions) > size:
+            positions = np.sort(positions[np.argpartition(priorities, size)[:size]])
+        return positions
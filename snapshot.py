@@ -0,0 +1,121 @@
+"""Memory-mapped dataset snapshot shared by every session and worker process on a host
+
+An offline build step writes the prepared frame (derived columns included) to
+an uncompressed Arrow IPC file holding a single record batch. Opening it maps
+the file read-only and wraps each column's buffer without copying: numeric and
+date columns map straight through, and categoricals are stored as their plain
+integer codes (categories live in the file's metadata) so they map too. All
+sessions of a process share one frame, and all processes mapping the same file
+share the OS page-cache copy.
+
+Usage:
+    python snapshot.py                              # build sales_snapshot.arrow from the CSV
+    python snapshot.py --csv data.csv --out /srv/sales.arrow
+    SALES_SNAPSHOT=/srv/sales.arrow streamlit run streamlit_dashboard.py
+"""
+import argparse
+import json
+import os
+import sys
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+from sales_data import CACHE_VERSION, DATA_FILE, load_sales_data
+
+SNAPSHOT_FILE = 'sales_snapshot.arrow'
+# Environment variable naming the snapshot to serve from
+SNAPSHOT_ENV = 'SALES_SNAPSHOT'
+_METADATA_KEY = b'sales_snapshot'
+
+
+def snapshot_path():
+    """Snapshot to serve from: $SALES_SNAPSHOT, else SNAPSHOT_FILE if it exists, else None"""
+    path = os.environ.get(SNAPSHOT_ENV)
+    if path:
+        return path
+    return SNAPSHOT_FILE if os.path.exists(SNAPSHOT_FILE) else None
+
+
+def write_snapshot(df, path=SNAPSHOT_FILE, source=None):
+    """Write a prepared frame as a memory-mappable snapshot, atomically"""
+    if not HAS_PYARROW:
+        raise ImportError("Snapshots need the pyarrow package")
+    columns, categoricals = {}, {}
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            # Store codes (-1 for missing) rather than an Arrow dictionary column,
+            # whose pandas conversion always copies
+            columns[col] = df[col].cat.codes.to_numpy()
+            categoricals[col] = {'categories': df[col].cat.categories.tolist(),
+                                 'ordered': bool(df[col].cat.ordered)}
+        else:
+            columns[col] = df[col].to_numpy()
+    metadata = {'cache_version': CACHE_VERSION, 'rows': len(df), 'source': source,
+                'categoricals': categoricals}
+    table = pa.table(columns).replace_schema_metadata({_METADATA_KEY: json.dumps(metadata)})
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        # One record batch, so every column is one contiguous buffer
+        with pyarrow.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=max(1, len(df)))
+    os.replace(tmp_path, path)
+
+
+def build_snapshot(csv_path=DATA_FILE, path=SNAPSHOT_FILE):
+    """Prepare the CSV and write its snapshot; returns the row count"""
+    df = load_sales_data(csv_path, use_cache=False)
+    write_snapshot(df, path, source=os.path.basename(csv_path))
+    return len(df)
+
+
+def open_snapshot(path=SNAPSHOT_FILE):
+    """Map a snapshot read-only as a DataFrame whose columns point into the mapping
+
+    The frame is shared, so treat it as immutable: writing into its columns
+    raises, while derived frames (filters, takes, new columns) are ordinary
+    copies.
+    """
+    if not HAS_PYARROW:
+        raise ImportError("Snapshots need the pyarrow package")
+    table = pyarrow.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    raw_metadata = (table.schema.metadata or {}).get(_METADATA_KEY)
+    if raw_metadata is None:
+        raise ValueError(f"{path} is not a sales snapshot")
+    metadata = json.loads(raw_metadata)
+    if metadata['cache_version'] != CACHE_VERSION:
+        raise ValueError(f"{path} was built for data version {metadata['cache_version']}, "
+                         f"expected {CACHE_VERSION}; rebuild it with `python snapshot.py`")
+
+    # Build the frame from one array per column: no block consolidation, so no copies
+    columns = {}
+    for col in table.column_names:
+        values = table.column(col).to_numpy()
+        spec = metadata['categoricals'].get(col)
+        if spec is not None:
+            dtype = pd.CategoricalDtype(spec['categories'], ordered=spec['ordered'])
+            values = pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+        columns[col] = values
+    return pd.DataFrame(columns, copy=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=DATA_FILE, help="source CSV")
+    parser.add_argument('--out', default=SNAPSHOT_FILE, help="snapshot file to write")
+    args = parser.parse_args(argv)
+
+    n_rows = build_snapshot(args.csv, args.out)
+    print(f"Wrote {n_rows:,} rows to {args.out} ({os.path.getsize(args.out) / 2 ** 20:.1f} MiB)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
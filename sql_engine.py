@@ -0,0 +1,641 @@
+"""Embedded SQLite engine for running Electronic_sales_database.sql without a MySQL server
+
+The CSV is ingested straight into a ``sales`` table with the script's indexes,
+and the script's own SELECT statements (data validation, Q1-Q11, the views and
+the executive summary) run unchanged: the MySQL functions they use are
+registered as SQLite functions. Results are streamed from the cursor in
+batches, and the dashboard's sidebar filters can be pushed down as
+parameterized SQL.
+
+The script's materialized summary tables are mirrored here: SQLite has no
+stored procedures, so refresh_summaries folds new orders in with SQLite's
+upsert syntax, and ``--compare`` times the views and the old UNION ALL
+executive summary against them.
+
+Usage:
+    python sql_engine.py                                   # full report, building sales.db on first run
+    python sql_engine.py --start 2024-01-01 --end 2024-03-31 --status Completed
+    python sql_engine.py --query "SELECT sku, SUM(total_price) FROM sales GROUP BY sku" --payment Cash
+    python sql_engine.py --compare                         # base-table queries vs the summary tables
+"""
+import argparse
+import csv
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import date, datetime
+
+import pandas as pd
+
+from filter_index import FILTER_COLUMNS
+from sales_data import DATA_FILE, MONTH_ORDER, clean_column_name
+
+SQL_SCRIPT = 'Electronic_sales_database.sql'
+DB_FILE = 'sales.db'
+BATCH_SIZE = 50_000
+
+# The MySQL schema with ENUMs relaxed to TEXT: the CSV carries values the ENUMs
+# reject (PayPal, Bank Transfer, Same Day, Expedited) and one missing gender.
+# The (customer_id, purchase_date, sku) key is a plain index because the CSV
+# repeats it once; a primary key would silently drop that order.
+SALES_TABLE = """
+CREATE TABLE sales (
+    customer_id INTEGER NOT NULL,
+    age INTEGER,
+    gender TEXT,
+    loyalty_member TEXT NOT NULL DEFAULT 'No',
+    product_type TEXT NOT NULL,
+    sku TEXT NOT NULL,
+    rating INTEGER,
+    order_status TEXT NOT NULL,
+    payment_method TEXT NOT NULL,
+    total_price REAL NOT NULL,
+    unit_price REAL NOT NULL,
+    quantity INTEGER NOT NULL DEFAULT 1,
+    purchase_date TEXT NOT NULL,
+    shipping_type TEXT NOT NULL,
+    addons_purchased TEXT,
+    addon_total REAL DEFAULT 0
+)
+"""
+
+# Indexes declared inside the MySQL CREATE TABLE, built after the bulk insert
+SALES_INDEXES = {
+    'idx_order_key': 'customer_id, purchase_date, sku',
+    'idx_purchase_date': 'purchase_date',
+    'idx_customer_id': 'customer_id',
+    'idx_product_type': 'product_type',
+    'idx_order_status': 'order_status',
+    'idx_payment_method': 'payment_method',
+    'idx_loyalty_member': 'loyalty_member',
+    'idx_total_price': 'total_price',
+    'idx_rating': 'rating',
+    'idx_age': 'age',
+    'idx_gender': 'gender',
+    'idx_shipping_type': 'shipping_type',
+}
+
+# CSV columns whose cleaned name differs from the SQL column name
+SQL_COLUMN_NAMES = {'add_ons_purchased': 'addons_purchased', 'add_on_total': 'addon_total'}
+
+# CSV fields loaded as NULL
+NULL_VALUES = ['', '#N/A']
+
+# MySQL DATE_FORMAT specifiers used by the script, as strftime specifiers
+DATE_FORMAT_CODES = {'%M': '%B', '%b': '%b', '%Y': '%Y', '%y': '%y', '%m': '%m', '%d': '%d', '%e': '%d'}
+
+# Statements of the MySQL script that set up the server rather than query data
+SKIPPED_STATEMENTS = re.compile(r'^(DROP DATABASE|CREATE DATABASE|USE|CREATE TABLE|DROP FUNCTION|DROP PROCEDURE|CALL)\b',
+                                re.I)
+
+# The script's summary tables in SQLite types ({schema} is main, or temp under pushed-down filters).
+# Customers are keyed with age -1 and gender '' standing in for NULL, as in the script.
+SUMMARY_TABLES = {
+    'summary_refresh': """
+CREATE TABLE IF NOT EXISTS {schema}.summary_refresh (
+    id INTEGER PRIMARY KEY,
+    watermark TEXT NOT NULL,
+    rows_folded INTEGER NOT NULL,
+    refreshed_at TEXT NOT NULL
+)""",
+    'customer_summary': """
+CREATE TABLE IF NOT EXISTS {schema}.customer_summary (
+    customer_id INTEGER NOT NULL,
+    age INTEGER NOT NULL,
+    gender TEXT NOT NULL,
+    loyalty_member TEXT NOT NULL,
+    total_orders INTEGER NOT NULL,
+    completed_orders INTEGER NOT NULL,
+    total_spent REAL NOT NULL,
+    total_addon_spend REAL NOT NULL,
+    rating_sum INTEGER NOT NULL,
+    rating_count INTEGER NOT NULL,
+    first_purchase TEXT NOT NULL,
+    last_purchase TEXT NOT NULL,
+    PRIMARY KEY (customer_id, age, gender, loyalty_member)
+)""",
+    'product_summary': """
+CREATE TABLE IF NOT EXISTS {schema}.product_summary (
+    product_type TEXT NOT NULL,
+    sku TEXT NOT NULL,
+    total_orders INTEGER NOT NULL,
+    completed_orders INTEGER NOT NULL,
+    units_sold INTEGER NOT NULL,
+    total_revenue REAL NOT NULL,
+    unit_price_sum REAL NOT NULL,
+    rating_sum INTEGER NOT NULL,
+    rating_count INTEGER NOT NULL,
+    addon_revenue REAL NOT NULL,
+    addon_count INTEGER NOT NULL,
+    PRIMARY KEY (product_type, sku)
+)""",
+    'daily_revenue_summary': """
+CREATE TABLE IF NOT EXISTS {schema}.daily_revenue_summary (
+    purchase_date TEXT PRIMARY KEY,
+    total_orders INTEGER NOT NULL,
+    completed_orders INTEGER NOT NULL,
+    units_sold INTEGER NOT NULL,
+    gross_revenue REAL NOT NULL,
+    completed_revenue REAL NOT NULL
+)""",
+}
+
+# refresh_sales_summaries' upserts: orders in (watermark, new watermark] added onto the stored sums
+SUMMARY_UPSERTS = [
+    """
+INSERT INTO {schema}.customer_summary
+SELECT customer_id, COALESCE(age, -1), COALESCE(gender, ''), loyalty_member,
+       COUNT(*), COUNT(CASE WHEN order_status = 'Completed' THEN 1 END), SUM(total_price),
+       COALESCE(SUM(addon_total), 0), COALESCE(SUM(rating), 0), COUNT(rating),
+       MIN(purchase_date), MAX(purchase_date)
+FROM {schema}.sales
+WHERE purchase_date > ? AND purchase_date <= ?
+GROUP BY customer_id, age, gender, loyalty_member
+ON CONFLICT (customer_id, age, gender, loyalty_member) DO UPDATE SET
+    total_orders = total_orders + excluded.total_orders,
+    completed_orders = completed_orders + excluded.completed_orders,
+    total_spent = total_spent + excluded.total_spent,
+    total_addon_spend = total_addon_spend + excluded.total_addon_spend,
+    rating_sum = rating_sum + excluded.rating_sum,
+    rating_count = rating_count + excluded.rating_count,
+    first_purchase = MIN(first_purchase, excluded.first_purchase),
+    last_purchase = MAX(last_purchase, excluded.last_purchase)""",
+    """
+INSERT INTO {schema}.product_summary
+SELECT product_type, sku, COUNT(*), COUNT(CASE WHEN order_status = 'Completed' THEN 1 END), SUM(quantity),
+       SUM(total_price), SUM(unit_price), COALESCE(SUM(rating), 0), COUNT(rating),
+       COALESCE(SUM(addon_total), 0), COUNT(addon_total)
+FROM {schema}.sales
+WHERE purchase_date > ? AND purchase_date <= ?
+GROUP BY product_type, sku
+ON CONFLICT (product_type, sku) DO UPDATE SET
+    total_orders = total_orders + excluded.total_orders,
+    completed_orders = completed_orders + excluded.completed_orders,
+    units_sold = units_sold + excluded.units_sold,
+    total_revenue = total_revenue + excluded.total_revenue,
+    unit_price_sum = unit_price_sum + excluded.unit_price_sum,
+    rating_sum = rating_sum + excluded.rating_sum,
+    rating_count = rating_count + excluded.rating_count,
+    addon_revenue = addon_revenue + excluded.addon_revenue,
+    addon_count = addon_count + excluded.addon_count""",
+    """
+INSERT INTO {schema}.daily_revenue_summary
+SELECT purchase_date, COUNT(*), COUNT(CASE WHEN order_status = 'Completed' THEN 1 END), SUM(quantity),
+       SUM(total_price), SUM(CASE WHEN order_status = 'Completed' THEN total_price ELSE 0 END)
+FROM {schema}.sales
+WHERE purchase_date > ? AND purchase_date <= ?
+GROUP BY purchase_date
+ON CONFLICT (purchase_date) DO UPDATE SET
+    total_orders = total_orders + excluded.total_orders,
+    completed_orders = completed_orders + excluded.completed_orders,
+    units_sold = units_sold + excluded.units_sold,
+    gross_revenue = gross_revenue + excluded.gross_revenue,
+    completed_revenue = completed_revenue + excluded.completed_revenue""",
+]
+
+# Watermark of summaries that hold nothing yet: before every purchase date
+EMPTY_WATERMARK = '1000-01-01'
+
+# The script's executive summary before it became a single scan: the baseline for compare_summaries
+UNION_EXECUTIVE_SUMMARY = """
+SELECT 'EXECUTIVE SUMMARY' as section, 'Total Orders' as metric, FORMAT(COUNT(*), 0) as value FROM sales
+UNION ALL
+SELECT 'Revenue Performance', 'Total Revenue', FORMAT(SUM(total_price), 2) FROM sales WHERE order_status = 'Completed'
+UNION ALL
+SELECT 'Customer Base', 'Unique Customers', FORMAT(COUNT(DISTINCT customer_id), 0) FROM sales
+UNION ALL
+SELECT 'Order Performance', 'Completion Rate',
+       CONCAT(ROUND(COUNT(CASE WHEN order_status = 'Completed' THEN 1 END) * 100.0 / COUNT(*), 1), '%') FROM sales
+UNION ALL
+SELECT 'Customer Loyalty', 'Loyalty Member Rate',
+       CONCAT(ROUND(COUNT(CASE WHEN loyalty_member = 'Yes' THEN 1 END) * 100.0 / COUNT(*), 1), '%') FROM sales
+UNION ALL
+SELECT 'Product Performance', 'Average Order Value', CONCAT('$', FORMAT(ROUND(AVG(total_price), 2), 2))
+FROM sales WHERE order_status = 'Completed'
+UNION ALL
+SELECT 'Add-on Success', 'Add-on Attachment Rate',
+       CONCAT(ROUND(COUNT(CASE WHEN addon_total > 0 THEN 1 END) * 100.0 / COUNT(*), 1), '%') FROM sales
+UNION ALL
+SELECT 'Customer Satisfaction', 'Average Rating', CONCAT(ROUND(AVG(rating), 2), '/5') FROM sales
+WHERE rating IS NOT NULL
+"""
+
+# (label, query over sales, equivalent query over the summary tables) timed by compare_summaries
+SUMMARY_COMPARISONS = [
+    ('Customer analytics', 'SELECT * FROM customer_analytics', 'SELECT * FROM customer_analytics_mv'),
+    ('Top 100 customers', 'SELECT * FROM customer_analytics ORDER BY total_spent DESC, customer_id LIMIT 100',
+     'SELECT * FROM customer_analytics_mv ORDER BY total_spent DESC, customer_id LIMIT 100'),
+    ('Product performance', 'SELECT * FROM product_performance', 'SELECT * FROM product_performance_mv'),
+    ('Daily revenue',
+     "SELECT purchase_date, COUNT(*), SUM(CASE WHEN order_status = 'Completed' THEN total_price ELSE 0 END) "
+     "FROM sales GROUP BY purchase_date",
+     'SELECT purchase_date, total_orders, completed_revenue FROM daily_revenue_summary'),
+]
+
+
+def _format(value, decimals=0):
+    """MySQL FORMAT(): thousands separators and fixed decimals"""
+    if value is None:
+        return None
+    return f"{float(value):,.{int(decimals)}f}"
+
+
+def _concat(*values):
+    """MySQL CONCAT(): NULL if any argument is NULL"""
+    if any(v is None for v in values):
+        return None
+    return ''.join(str(v) for v in values)
+
+
+def _month(value):
+    """MySQL MONTH() on an ISO date"""
+    return None if value is None else int(value[5:7])
+
+
+def _monthname(value):
+    """MySQL MONTHNAME() on an ISO date"""
+    return None if value is None else MONTH_ORDER[int(value[5:7]) - 1]
+
+
+def _datediff(end, start):
+    """MySQL DATEDIFF(): whole days from start to end"""
+    if end is None or start is None:
+        return None
+    return (date.fromisoformat(end[:10]) - date.fromisoformat(start[:10])).days
+
+
+def _date_format(value, fmt):
+    """MySQL DATE_FORMAT() for the specifiers in DATE_FORMAT_CODES"""
+    if value is None:
+        return None
+    fmt = re.sub(r'%[A-Za-z]', lambda m: DATE_FORMAT_CODES.get(m.group(), m.group()), fmt)
+    return datetime.fromisoformat(value[:10]).strftime(fmt)
+
+
+def get_primary_addon(addon_string):
+    """First add-on in a comma-separated list - the script's stored function"""
+    if not addon_string:
+        return 'No Add-on'
+    return addon_string.split(',')[0].strip() or 'No Add-on'
+
+
+def connect(db_path=':memory:'):
+    """Open a SQLite database with the script's MySQL functions registered"""
+    conn = sqlite3.connect(db_path)
+    for name, func, n_args in [('FORMAT', _format, 1), ('FORMAT', _format, 2), ('CONCAT', _concat, -1),
+                               ('MONTH', _month, 1), ('MONTHNAME', _monthname, 1),
+                               ('DATEDIFF', _datediff, 2), ('DATE_FORMAT', _date_format, 2),
+                               ('get_primary_addon', get_primary_addon, 1)]:
+        conn.create_function(name, n_args, func, deterministic=True)
+    return conn
+
+
+def sql_column_names(columns):
+    """SQL column names for the CSV's header"""
+    return [SQL_COLUMN_NAMES.get(c, c) for c in map(clean_column_name, columns)]
+
+
+def chunk_rows(chunk):
+    """Row tuples of a parsed chunk with missing values as None
+
+    Binding Python ints and floats is much cheaper for SQLite than converting
+    numeric text by column affinity.
+    """
+    columns = []
+    for col in chunk.columns:
+        values = chunk[col]
+        missing = values.isna().to_numpy()
+        if missing.any() or values.dtype.kind not in 'iuf':
+            values = values.to_numpy(dtype=object)
+            values[missing] = None
+        columns.append(values.tolist())
+    return list(zip(*columns))
+
+
+def _read_batches(path, batch_size):
+    """Yield the SQL column names, then lists of row tuples ``batch_size`` rows at a time
+
+    pandas parses and types each chunk in C.
+    """
+    chunks = pd.read_csv(path, chunksize=batch_size, keep_default_na=False, na_values=NULL_VALUES)
+    first = True
+    for chunk in chunks:
+        if first:
+            yield sql_column_names(chunk.columns)
+            first = False
+        yield chunk_rows(chunk)
+
+
+def ingest_csv(conn, path=DATA_FILE, batch_size=BATCH_SIZE):
+    """(Re)create the sales table from the CSV and build its indexes; returns the row count
+
+    Rows go in with batched executemany inside one transaction, and indexes are
+    built once at the end rather than maintained on every insert.
+    """
+    batches = _read_batches(path, batch_size)
+    columns = next(batches)
+    insert = f"INSERT INTO sales ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+    n_rows = 0
+    with conn:
+        conn.execute('DROP TABLE IF EXISTS sales')
+        conn.execute(SALES_TABLE)
+        for batch in batches:
+            conn.executemany(insert, batch)
+            n_rows += len(batch)
+        for name, cols in SALES_INDEXES.items():
+            conn.execute(f'CREATE INDEX {name} ON sales({cols})')
+        record_source(conn, path)
+        invalidate_summaries(conn)
+    conn.execute('ANALYZE')
+    return n_rows
+
+
+def source_meta(path):
+    """Identity of a source CSV, used to tell whether the database is stale"""
+    stat = os.stat(path)
+    return {'source': os.path.abspath(path), 'size': str(stat.st_size), 'mtime_ns': str(stat.st_mtime_ns)}
+
+
+def record_source(conn, path):
+    """Mark the database as holding this version of the CSV (see ensure_loaded)"""
+    conn.execute('CREATE TABLE IF NOT EXISTS load_meta (key TEXT PRIMARY KEY, value TEXT)')
+    conn.executemany('INSERT OR REPLACE INTO load_meta VALUES (?, ?)', source_meta(path).items())
+
+
+def ensure_loaded(conn, path=DATA_FILE, batch_size=BATCH_SIZE):
+    """Ingest the CSV unless the database already holds this version of it"""
+    try:
+        stored = dict(conn.execute('SELECT key, value FROM load_meta'))
+    except sqlite3.OperationalError:
+        stored = {}
+    if stored != source_meta(path):
+        ingest_csv(conn, path, batch_size)
+
+
+def invalidate_summaries(conn):
+    """Forget the summaries' watermark after the sales table is replaced, forcing a rebuild"""
+    conn.execute('DROP TABLE IF EXISTS summary_refresh')
+
+
+def refresh_summaries(conn, schema='main', full=False):
+    """Fold orders dated after the watermark into the summary tables; returns the orders folded
+
+    The watermark is the newest purchase date already folded in. Orders that
+    arrived since with an older date (a reload or a backfill) change the count
+    at or before the watermark, which rebuilds the summaries from scratch, as
+    does ``full``. Orders are bounded by the newest date seen at the start, so
+    each one is folded exactly once.
+    """
+    with conn:
+        for ddl in SUMMARY_TABLES.values():
+            conn.execute(ddl.format(schema=schema))
+        watermark, folded = conn.execute(f'SELECT MAX(watermark), COALESCE(MAX(rows_folded), 0) '
+                                         f'FROM {schema}.summary_refresh WHERE id = 1').fetchone()
+        if full or watermark is None or conn.execute(f'SELECT COUNT(*) FROM {schema}.sales WHERE purchase_date <= ?',
+                                                     (watermark,)).fetchone()[0] != folded:
+            for name in SUMMARY_TABLES:
+                conn.execute(f'DELETE FROM {schema}.{name}')
+            watermark, folded = EMPTY_WATERMARK, 0
+
+        new_rows, new_mark = conn.execute(f'SELECT COUNT(*), MAX(purchase_date) FROM {schema}.sales '
+                                          f'WHERE purchase_date > ?', (watermark,)).fetchone()
+        if new_rows:
+            for upsert in SUMMARY_UPSERTS:
+                conn.execute(upsert.format(schema=schema), (watermark, new_mark))
+            watermark = new_mark
+        conn.execute(f'INSERT OR REPLACE INTO {schema}.summary_refresh VALUES (1, ?, ?, ?)',
+                     (watermark, folded + new_rows, datetime.now().isoformat(sep=' ', timespec='seconds')))
+    return new_rows
+
+
+def has_summaries(conn):
+    """Whether the main schema holds the summary tables"""
+    return conn.execute("SELECT 1 FROM main.sqlite_master WHERE name = 'summary_refresh'").fetchone() is not None
+
+
+def filter_clause(date_range=(), selections=None):
+    """Parameterized WHERE clause for the dashboard's sidebar filters
+
+    ``date_range`` is an inclusive (start, end) pair and ``selections`` maps
+    filter columns to the values to keep, as passed to FilterIndex.lookup.
+    Returns the clause ('' when nothing is filtered) and its parameters.
+    """
+    conditions, params = [], []
+    if len(date_range) == 2:
+        conditions.append('purchase_date BETWEEN ? AND ?')
+        params += [str(d)[:10] for d in date_range]
+    for col, values in (selections or {}).items():
+        if col not in FILTER_COLUMNS:
+            raise ValueError(f"Cannot filter on {col!r}; expected one of {FILTER_COLUMNS}")
+        values = list(values)
+        if not values:
+            conditions.append('0')
+            continue
+        conditions.append(f"{col} IN ({', '.join('?' * len(values))})")
+        params += values
+    return ('WHERE ' + ' AND '.join(conditions) if conditions else ''), params
+
+
+def push_down_filters(conn, date_range=(), selections=None):
+    """Shadow ``sales`` with a temp table of the filtered orders; returns its row count
+
+    SQLite resolves unqualified names in the temp schema first, so every query
+    (including the script's subqueries) then reads the filtered rows. Views in
+    the main schema stay bound to main.sales, so they are mirrored as temp
+    views, and the summary tables (if built) get temp copies summarizing the
+    filtered rows. Call ``clear_filters`` to go back to the full table.
+    """
+    where, params = filter_clause(date_range, selections)
+    clear_filters(conn)
+    conn.execute(f'CREATE TEMP TABLE sales AS SELECT * FROM main.sales {where}', params)
+    if has_summaries(conn):
+        refresh_summaries(conn, schema='temp')
+    for (sql,) in conn.execute("SELECT sql FROM main.sqlite_master WHERE type = 'view'").fetchall():
+        conn.execute(_scope_to_filters(sql))
+    return conn.execute('SELECT COUNT(*) FROM temp.sales').fetchone()[0]
+
+
+def clear_filters(conn):
+    """Drop the filtered temp tables and views so ``sales`` means the full table again"""
+    for (name,) in conn.execute("SELECT name FROM temp.sqlite_master WHERE type = 'view'").fetchall():
+        conn.execute(f'DROP VIEW temp.{name}')
+    for name in ['sales', *SUMMARY_TABLES]:
+        conn.execute(f'DROP TABLE IF EXISTS temp.{name}')
+
+
+def filters_active(conn):
+    """Whether ``sales`` currently means the filtered temp table"""
+    return conn.execute("SELECT 1 FROM temp.sqlite_master WHERE name = 'sales'").fetchone() is not None
+
+
+def _scope_to_filters(statement):
+    """Rewrite view DDL to target the temp schema, where the filtered sales live"""
+    statement = re.sub(r'^DROP VIEW IF EXISTS (\w+)', r'DROP VIEW IF EXISTS temp.\1', statement, flags=re.I)
+    return re.sub(r'^CREATE VIEW', 'CREATE TEMP VIEW', statement, flags=re.I)
+
+
+def iter_rows(cursor, batch_size=BATCH_SIZE):
+    """Stream a cursor's rows via fetchmany, never holding the full result"""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def iter_filtered_orders(conn, date_range=(), selections=None, columns=None, batch_size=BATCH_SIZE):
+    """Stream the orders matching the sidebar filters straight from the indexed table"""
+    where, params = filter_clause(date_range, selections)
+    cursor = conn.execute(f"SELECT {', '.join(columns) if columns else '*'} FROM main.sales {where} "
+                          f"ORDER BY purchase_date", params)
+    return iter_rows(cursor, batch_size)
+
+
+def script_statements(path=SQL_SCRIPT):
+    """(title, statement) pairs from the MySQL script that SQLite can run
+
+    Server setup, the schemas (replaced by SALES_TABLE and SUMMARY_TABLES), the
+    stored function (registered in Python) and the summary refresh procedure
+    (refresh_summaries) are skipped. Titles come from the comment above each
+    statement.
+    """
+    with open(path) as f:
+        script = f.read()
+    # Stored routine bodies use their own delimiter; drop the whole blocks
+    script = re.sub(r'DELIMITER \$\$.*?DELIMITER ;', '', script, flags=re.S)
+
+    statements, title, lines = [], None, []
+    for line in script.splitlines():
+        stripped = line.strip()
+        if stripped.startswith('--'):
+            if not lines and stripped[2:].strip():
+                title = stripped[2:].strip()
+            continue
+        if stripped:
+            lines.append(line)
+        if stripped.endswith(';'):
+            statement = '\n'.join(lines).rstrip(';')
+            lines = []
+            if SKIPPED_STATEMENTS.match(statement.strip()):
+                continue
+            statement = re.sub(r'^CREATE INDEX\b', 'CREATE INDEX IF NOT EXISTS', statement.strip())
+            statements.append((title, statement))
+    return statements
+
+
+def run_script(conn, out=sys.stdout, path=SQL_SCRIPT, batch_size=BATCH_SIZE):
+    """Run every statement of the analysis script, streaming result rows to ``out``"""
+    filtered = filters_active(conn)
+    for title, statement in script_statements(path):
+        if filtered:
+            statement = _scope_to_filters(statement)
+        start = time.perf_counter()
+        cursor = conn.execute(statement)
+        if cursor.description is None:
+            continue
+        print(f"\n== {title} ==", file=out)
+        print(' | '.join(col[0] for col in cursor.description), file=out)
+        n_rows = 0
+        for row in iter_rows(cursor, batch_size):
+            print(' | '.join('' if v is None else str(v) for v in row), file=out)
+            n_rows += 1
+        print(f"({n_rows} rows, {(time.perf_counter() - start) * 1000:.1f} ms)", file=out)
+
+
+def _best_time(conn, query, repeat):
+    """Fastest of ``repeat`` full fetches of a query, in ms, and its rows"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = conn.execute(query).fetchall()
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best, rows
+
+
+def compare_summaries(conn, out=sys.stdout, path=SQL_SCRIPT, repeat=3):
+    """Time the script's base-table views and UNION ALL executive summary against their replacements
+
+    The views are (re)created from the script first; each query's best of
+    ``repeat`` runs is reported, with a check that both sides return the
+    same rows.
+    """
+    filtered = filters_active(conn)
+    statements = script_statements(path)
+    for _, statement in statements:
+        if re.match(r'^(DROP|CREATE) VIEW\b', statement, re.I):
+            conn.execute(_scope_to_filters(statement) if filtered else statement)
+    executive_summary = dict(statements)['Key Business Insights Summary']
+
+    def rounded(rows):
+        # Sums accumulated in a different order differ in the last bits
+        return sorted(tuple(float(f'{v:.10g}') if isinstance(v, float) else v for v in row) for row in rows)
+
+    print(f"{'Query':<22}{'Base table':>12}{'Summary':>12}{'Speed-up':>10}  Same rows", file=out)
+    for label, base, summary in SUMMARY_COMPARISONS + [('Executive summary', UNION_EXECUTIVE_SUMMARY,
+                                                         executive_summary)]:
+        base_ms, base_rows = _best_time(conn, base, repeat)
+        summary_ms, summary_rows = _best_time(conn, summary, repeat)
+        same = rounded(base_rows) == rounded(summary_rows)
+        print(f"{label:<22}{base_ms:>9.1f} ms{summary_ms:>9.1f} ms{base_ms / max(summary_ms, 1e-6):>9.1f}x  "
+              f"{'yes' if same else 'NO'}", file=out)
+
+    schema = 'temp' if filtered else 'main'
+    for label, full in [('Summary rebuild', True), ('Summary catch-up', False)]:
+        start = time.perf_counter()
+        refresh_summaries(conn, schema, full=full)
+        print(f"{label:<22}{(time.perf_counter() - start) * 1000:>21.1f} ms", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=DB_FILE, help="SQLite database file (':memory:' for none)")
+    parser.add_argument('--csv', default=DATA_FILE, help="source CSV, ingested when the database is stale")
+    parser.add_argument('--reload', action='store_true', help="re-ingest the CSV even if the database is fresh")
+    parser.add_argument('--script', default=SQL_SCRIPT, help="analysis script to run")
+    parser.add_argument('--query', help="run this SQL instead of the analysis script")
+    parser.add_argument('--compare', action='store_true',
+                        help="time the base-table views and executive summary against the summary tables")
+    parser.add_argument('--start', help="first purchase date to include (YYYY-MM-DD)")
+    parser.add_argument('--end', help="last purchase date to include (YYYY-MM-DD)")
+    parser.add_argument('--status', nargs='+', help="order statuses to include")
+    parser.add_argument('--product', nargs='+', help="product types to include")
+    parser.add_argument('--payment', nargs='+', help="payment methods to include")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    start = time.perf_counter()
+    if args.reload:
+        n_rows = ingest_csv(conn, args.csv, args.batch_size)
+        print(f"Loaded {n_rows:,} rows in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    else:
+        ensure_loaded(conn, args.csv, args.batch_size)
+    n_folded = refresh_summaries(conn)
+    if n_folded:
+        print(f"Folded {n_folded:,} orders into the summary tables", file=sys.stderr)
+
+    date_range = (args.start or '0000-01-01', args.end or '9999-12-31') if args.start or args.end else ()
+    selections = {col: values for col, values in zip(FILTER_COLUMNS, [args.status, args.product, args.payment])
+                  if values}
+    if date_range or selections:
+        n_rows = push_down_filters(conn, date_range, selections)
+        print(f"Filtered to {n_rows:,} orders", file=sys.stderr)
+
+    if args.query:
+        cursor = conn.execute(args.query)
+        writer = csv.writer(sys.stdout)
+        writer.writerow([col[0] for col in cursor.description or []])
+        writer.writerows(iter_rows(cursor, args.batch_size))
+    elif args.compare:
+        compare_summaries(conn, path=args.script)
+    else:
+        run_script(conn, path=args.script, batch_size=args.batch_size)
+    conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
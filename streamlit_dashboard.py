@@ -5,7 +5,26 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
 from datetime import datetime, timedelta
+from functools import partial
 import warnings
+from copurchase import DEFAULT_MIN_COUNT, co_occurrence_matrix
+from crosstab import CROSSTAB_DIMENSIONS, CROSSTAB_MEASURES
+from downsampling import DEFAULT_MAX_POINTS, density_bins, lttb, stratified_sample
+from export import EXPORT_FORMATS, available_formats, export_file
+from figure_cache import FigureCache
+from filter_index import FILTER_COLUMNS, FilterIndex
+from instrumentation import (RerunTimer, NULL_TIMER, SectionStats, append_log, current_timer, install_timer,
+                             log_path, payload_bytes, rows_of)
+from partitions import (concat_partitions, dataset_profile, iter_partitions, load_partitions, manifest_version,
+                        partitions_path, read_customers, read_manifest)
+from parallel_agg import worker_count
+import sales_analytics as analytics
+from rollups import DETAIL_MIN_POINTS, RESOLUTION_LABELS, TREND_MIN_POINTS, SalesRollups
+from sales_cube import CUBE_COLUMNS, build_sales_cube, completed, cube_counts, cube_kpis, cube_summary
+from sales_data import ADDON_COLUMNS, DATA_FILE, RFM_LEVELS, CustomerDimension, load_customer_dimension, load_sales_data
+from sales_views import SalesView
+from sketches import EXACT_MAX_ROWS, SalesSketches
+from snapshot import open_snapshot, snapshot_path
 warnings.filterwarnings('ignore')
 
 # Configure the page
@@ -32,61 +51,759 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 @st.cache_data
-def load_data():
+def load_session_data():
     """Load and preprocess the electronic sales data"""
     try:
-        # Load the CSV data
-        df = pd.read_csv('Electronic_sales_Sep2023-Sep2024.csv')
+        # Typed load path backed by a Feather cache keyed on the CSV's mtime and size
+        return load_sales_data(DATA_FILE, workers=worker_count())
+    except Exception as e:
+        st.error(f"Error loading data: {str(e)}")
+        return None
+
+@st.cache_resource
+def load_snapshot(path):
+    """Memory-mapped snapshot, one read-only frame shared by every session"""
+    try:
+        return open_snapshot(path)
+    except Exception as e:
+        st.error(f"Error loading snapshot {path}: {str(e)}")
+        return None
+
+@st.cache_resource
+def load_manifest(path, version):
+    """Manifest of the partitioned dataset, re-read when ``version`` (its mtime) changes after an append"""
+    try:
+        return read_manifest(path)
+    except Exception as e:
+        st.error(f"Error loading partition manifest in {path}: {str(e)}")
+        return None
+
+@st.cache_resource(max_entries=4)
+def load_partition_data(path, version, date_range, columns):
+    """Orders in a date range with only the given columns, read from the partitions it overlaps"""
+    try:
+        return load_partitions(path, date_range, columns and list(columns), manifest=load_manifest(path, version),
+                               customers=load_customers(version))
+    except Exception as e:
+        st.error(f"Error loading partitions from {path}: {str(e)}")
+        return None
+
+def data_version():
+    """Cache key for the dataset: the partition manifest's version, or None for a fixed dataset"""
+    path = partitions_path()
+    return manifest_version(path) if path else None
+
+def load_data(date_range=(), columns=None):
+    """Sales data from the partitioned dataset or the shared snapshot when configured, else a per-session copy
+
+    A partitioned dataset reads only the months overlapping ``date_range`` and
+    only ``columns`` (every column when None); the in-memory sources ignore both.
+    """
+    path = partitions_path()
+    if path:
+        return load_partition_data(path, manifest_version(path), tuple(date_range),
+                                   tuple(columns) if columns else None)
+    path = snapshot_path()
+    return load_snapshot(path) if path else load_session_data()
+
+@st.cache_data
+def load_cube(version=None):
+    """Build the pre-aggregated sales cube once per dataset"""
+    path = partitions_path()
+    if path:
+        # One partition at a time: days never span partitions, so their cubes concatenate exactly
+        manifest = load_manifest(path, version)
+        return concat_partitions([build_sales_cube(part) for _, part in iter_partitions(path, CUBE_COLUMNS, manifest)])
+    df = load_data()
+    return None if df is None else build_sales_cube(df)
+
+@st.cache_resource
+def load_rollups():
+    """Day/week/month/quarter revenue rollups per product and status, built once per dataset"""
+    df = load_data()
+    return None if df is None else SalesRollups(df)
+
+@st.cache_resource
+def load_customers(version=None):
+    """Customer dimension with per-customer aggregates and RFM scores, cached on disk"""
+    try:
+        path = partitions_path()
+        if path:
+            # Saved with the partitions and updated by every append
+            return read_customers(path, load_manifest(path, version))
+        if snapshot_path():
+            # Snapshot hosts may not have the CSV; derive it from the mapped frame
+            df = load_data()
+            return None if df is None else CustomerDimension.from_orders(df, worker_count())
+        return load_customer_dimension(DATA_FILE, workers=worker_count())
+    except Exception as e:
+        st.error(f"Error loading customer dimension: {str(e)}")
+        return None
+
+@st.cache_resource
+def load_rfm_scores(version=None):
+    """All-time recency, frequency and monetary scores per customer, from the customer dimension"""
+    customers = load_customers(version)
+    return None if customers is None else customers.rfm_scores()
+
+@st.cache_resource
+def load_filter_index():
+    """Bitmap filter index shared by all sessions, with its LRU of filter results"""
+    df = load_data()
+    return None if df is None else FilterIndex(df)
+
+@st.cache_resource
+def load_sketches():
+    """Per-partition distinct-customer, order-value and sample sketches for approximate mode"""
+    df = load_data()
+    return None if df is None else SalesSketches(df)
+
+def apply_filters(frame, date_range, selected_status, selected_products, selected_payment):
+    """Apply the sidebar filters to the raw orders or the cube"""
+    if len(date_range) == 2:
+        mask = (frame['purchase_date'] >= pd.Timestamp(date_range[0])) & \
+               (frame['purchase_date'] <= pd.Timestamp(date_range[1]))
+        frame = frame[mask]
+    
+    return frame[
+        (frame['order_status'].isin(selected_status)) &
+        (frame['product_type'].isin(selected_products)) &
+        (frame['payment_method'].isin(selected_payment))
+    ]
+
+@st.cache_resource
+def load_figure_cache():
+    """Built figures shared by every session, LRU under a byte budget"""
+    return FigureCache()
+
+def build_figures(**builders):
+    """Figures from the shared cache by name; misses are built concurrently"""
+    with current_timer().section(', '.join(builders), kind='figures'):
+        return load_figure_cache().figures(builders)
+
+@st.cache_resource
+def load_section_stats():
+    """Rolling section timings shared by every session"""
+    return SectionStats()
+
+def show_chart(name, fig):
+    """Render a plotly chart, timed as a named chart section with its payload size"""
+    timer = current_timer()
+    with timer.section(name, kind='chart') as record:
+        st.plotly_chart(fig, use_container_width=True)
+    if timer.enabled:
+        record['bytes'] = payload_bytes(fig)
+
+def show_table(name, data, **kwargs):
+    """Render a dataframe, timed as a named table section with its rows and payload size"""
+    timer = current_timer()
+    with timer.section(name, kind='table') as record:
+        st.dataframe(data, use_container_width=True, **kwargs)
+    if timer.enabled:
+        record['rows_out'] = rows_of(data)
+        record['bytes'] = payload_bytes(data)
+
+def render_timing_panel(timer, stats):
+    """Developer sidebar panel: this rerun's sections and rolling p50/p95 across reruns"""
+    with st.sidebar.expander("⏱️ Timings", expanded=True):
+        st.caption(f"This rerun: {timer.total_ms():.0f} ms")
+        st.dataframe(timer.frame().round(1), hide_index=True)
+        st.caption("Rolling p50/p95 across reruns (all sessions)")
+        st.dataframe(stats.summary().round(1), hide_index=True)
+        cache = load_figure_cache().stats()
+        st.caption(f"Figure cache: {cache['hits']:,} hits, {cache['misses']:,} misses, "
+                   f"{cache['entries']} figures, {cache['bytes'] / 2 ** 20:.1f} MB")
+
+def render_sales_overview(view):
+    """Sales Overview tab: order mix, payment methods and product summary"""
+    st.header("Sales Overview")
+    
+    # Order status and payment method distributions
+    status_counts = cube_counts(view.cube, 'order_status')
+    payment_counts = cube_counts(view.cube, 'payment_method')
+    figures = build_figures(
+        status=lambda: px.pie(
+            values=status_counts.values,
+            names=status_counts.index,
+            title="Order Status Distribution",
+            color_discrete_map={'Completed': '#2E8B57', 'Cancelled': '#DC143C'}
+        ),
+        payment=lambda: px.bar(
+            x=payment_counts.values,
+            y=payment_counts.index,
+            orientation='h',
+            title="Payment Method Distribution",
+            labels={'x': 'Number of Orders', 'y': 'Payment Method'}
+        ).update_layout(yaxis={'categoryorder': 'total ascending'})
+    )
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        show_chart('status', figures['status'])
+    
+    with col2:
+        show_chart('payment', figures['payment'])
+    
+    # Product type performance
+    product_summary = cube_summary(view.cube, 'product_type')[
+        ['revenue', 'mean', 'count', 'rating']
+    ].round(2)
+    
+    product_summary.columns = ['Total Revenue', 'Avg Order Value', 'Order Count', 'Avg Rating']
+    product_summary = product_summary.sort_values('Total Revenue', ascending=False)
+    
+    st.subheader("Product Type Performance")
+    show_table('product_summary', product_summary)
+
+def render_customer_analytics(view):
+    """Customer Analytics tab: demographics, loyalty, segments and top customers"""
+    st.header("Customer Analytics")
+    
+    # Age, gender and value segment distributions
+    age_dist = view.counts('age_group')
+    gender_dist = view.counts('gender')
+    value_segments = view.counts('value_segment')
+    figures = build_figures(
+        age=lambda: px.bar(
+            x=age_dist.index,
+            y=age_dist.values,
+            title="Customer Age Distribution",
+            labels={'x': 'Age Group', 'y': 'Number of Customers'}
+        ),
+        gender=lambda: px.pie(
+            values=gender_dist.values,
+            names=gender_dist.index,
+            title="Gender Distribution"
+        ),
+        segments=lambda: px.bar(
+            x=value_segments.values,
+            y=value_segments.index,
+            orientation='h',
+            title="Customer Value Segments"
+        )
+    )
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        show_chart('age', figures['age'])
+    
+    with col2:
+        show_chart('gender', figures['gender'])
+    
+    col3, col4 = st.columns(2)
+    
+    with col3:
+        # Loyalty member analysis
+        loyalty_analysis = view.per_loyalty.round(2)
         
-        # Clean column names - handle spaces, hyphens, and case
-        df.columns = df.columns.str.replace(' ', '_').str.replace('-', '_').str.lower()
+        st.subheader("Loyalty Member Analysis")
+        show_table('loyalty_analysis', loyalty_analysis)
+    
+    with col4:
+        show_chart('segments', figures['segments'])
+    
+    # Top customers table
+    st.subheader("Top 10 Customers by Revenue")
+    top_customers = analytics.top_customers(view.per_customer, n=10, rfm=load_rfm_scores(data_version())).round(2)
+    show_table('top_customers', top_customers)
+    st.caption(f"R, F and M score each customer's recency, frequency and spend across all completed orders "
+               f"from 1 (lowest fifth) to {RFM_LEVELS} (highest fifth); customers with equal values share a score.")
+
+def render_product_performance(view):
+    """Product Performance tab: product revenue, ratings, SKUs and add-ons"""
+    st.header("Product Performance")
+    
+    # Best selling products by revenue, ratings distribution and add-on mix
+    product_revenue = completed(view.cube).groupby('product_type', observed=True)['revenue'].sum().sort_values(ascending=False)
+    rating_dist = view.counts('rating').sort_index()
+    addon_types = view.per_product_addon_types
+    figures = build_figures(
+        product_revenue=lambda: px.bar(
+            x=product_revenue.values,
+            y=product_revenue.index,
+            orientation='h',
+            title="Revenue by Product Type",
+            labels={'x': 'Total Revenue ($)', 'y': 'Product Type'}
+        ),
+        rating=lambda: px.bar(
+            x=rating_dist.index,
+            y=rating_dist.values,
+            title="Product Ratings Distribution",
+            labels={'x': 'Rating', 'y': 'Number of Reviews'}
+        ),
+        addon_mix=lambda: px.bar(
+            addon_types,
+            x='product_type',
+            y='items',
+            color='addon_type',
+            title="Add-on Mix by Product Type",
+            labels={'product_type': 'Product Type', 'items': 'Add-on Items', 'addon_type': 'Add-on Type'}
+        )
+    )
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        show_chart('product_revenue', figures['product_revenue'])
+    
+    with col2:
+        show_chart('rating', figures['rating'])
+    
+    # SKU performance table
+    st.subheader("Top 15 SKUs by Performance")
+    sku_performance = view.per_sku.head(15).round(2)
+    show_table('sku_performance', sku_performance)
+    
+    # Add-on analysis
+    st.subheader("Add-on Performance Analysis")
+    addon_analysis = view.per_product_addons.round(2)
+    show_table('addon_analysis', addon_analysis)
+    
+    # Add-on type breakdown from the per-order add-on counts
+    col3, col4 = st.columns(2)
+    
+    with col3:
+        show_chart('addon_mix', figures['addon_mix'])
+    
+    with col4:
+        st.write("**Add-on Attachment Rate by Type (%):**")
+        attachment = addon_types.pivot(index='product_type', columns='addon_type', values='attachment_rate')
+        show_table('attachment', attachment.round(2))
         
-        # Convert date column
-        df['purchase_date'] = pd.to_datetime(df['purchase_date'])
+        st.write("**Add-on Revenue by Type ($, split evenly across an order's add-ons):**")
+        addon_revenue = addon_types.pivot(index='product_type', columns='addon_type', values='revenue')
+        show_table('addon_revenue', addon_revenue.round(2))
+
+def render_time_series(view):
+    """Time Series Analysis tab: revenue trend, seasonal, weekday and detailed revenue"""
+    st.header("Time Series Analysis")
+    
+    # Revenue trend at the coarsest resolution that still shows a trend
+    trend_resolution = view.resolution(TREND_MIN_POINTS)
+    trend_sales = view.per_period(trend_resolution)['sum']
+    
+    # Seasonal and day of week analysis
+    seasonal_sales = view.per_season()['sum']
+    dow_sales = view.per_weekday()
+    
+    # Detailed revenue pattern: days over short ranges, coarser over long histories,
+    # downsampled with LTTB when it still exceeds the point budget
+    detail_resolution = view.resolution(DETAIL_MIN_POINTS)
+    detail_sales = view.per_period(detail_resolution)['sum']
+    max_points = st.session_state.get('max_chart_points', DEFAULT_MAX_POINTS)
+    if len(detail_sales) > max_points:
+        detail_sales = detail_sales.iloc[lttb(detail_sales.index, detail_sales.values, max_points)]
+    
+    figures = build_figures(
+        trend=lambda: px.line(
+            x=trend_sales.index,
+            y=trend_sales.values,
+            title=f'{RESOLUTION_LABELS[trend_resolution]} Revenue Trend',
+            labels={'x': 'Period Starting', 'y': 'Revenue ($)'}
+        ),
+        seasonal=lambda: px.bar(
+            x=seasonal_sales.index,
+            y=seasonal_sales.values,
+            title="Revenue by Season",
+            labels={'x': 'Season', 'y': 'Total Revenue ($)'}
+        ),
+        dow=lambda: px.bar(
+            x=dow_sales.index,
+            y=dow_sales.values,
+            title="Average Order Value by Day of Week",
+            labels={'x': 'Day of Week', 'y': 'Average Order Value ($)'}
+        ),
+        detail=lambda: px.line(
+            x=detail_sales.index,
+            y=detail_sales.values,
+            title=f'{RESOLUTION_LABELS[detail_resolution]} Revenue Pattern',
+            labels={'x': 'Date', 'y': 'Revenue ($)'}
+        )
+    )
+    
+    show_chart('trend', figures['trend'])
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        show_chart('seasonal', figures['seasonal'])
+    
+    with col2:
+        show_chart('dow', figures['dow'])
+    
+    show_chart('detail', figures['detail'])
+
+def render_revenue_analysis(view):
+    """Revenue Analysis tab: shipping, segments, quantity vs price and heatmap"""
+    st.header("Revenue Analysis")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Revenue by shipping type
+        shipping_revenue = cube_summary(completed(view.cube), 'shipping_type')[
+            ['revenue', 'mean', 'count']
+        ].round(2)
+        shipping_revenue.columns = ['Total Revenue', 'Avg Order Value', 'Order Count']
+        
+        st.subheader("Revenue by Shipping Type")
+        show_table('shipping_revenue', shipping_revenue)
+    
+    with col2:
+        # Revenue contribution by customer segment
+        segment_revenue = view.per_segment
+        fig_segment_revenue = load_figure_cache().figure('segment_revenue', lambda: px.pie(
+            values=segment_revenue.values,
+            names=segment_revenue.index,
+            title="Revenue Contribution by Customer Segment"
+        ))
+        show_chart('segment_revenue', fig_segment_revenue)
+    
+    # Quantity vs Price analysis
+    st.subheader("Quantity vs Price Analysis")
+    
+    # Create scatter plot, within the point budget for large selections
+    # (in approximate mode, from the uniform sample of the filtered orders)
+    completed_orders = view.chart_orders
+    # Plain values for the figure builders: a closed-over view would give them a new cache key every rerun
+    is_sample = view.is_sample
+    sample_note = f' - sample of {len(completed_orders):,} completed orders' if is_sample else ''
+    max_points = st.session_state.get('max_chart_points', DEFAULT_MAX_POINTS)
+    scatter_mode = "All orders"
+    if len(completed_orders) > max_points:
+        scatter_mode = st.radio(
+            "Rendering",
+            ["Density bins", "Stratified sample"],
+            horizontal=True,
+            help=f"{len(completed_orders):,} orders exceed the {max_points:,} point budget"
+        )
+    
+    if scatter_mode == "Density bins":
+        binned = density_bins(completed_orders, 'quantity', 'total_price', by='product_type',
+                              size='rating', max_points=max_points)
+        if is_sample:
+            # Sampled bin counts scaled up to estimates for all filtered orders
+            binned['orders'] = (binned['orders'] * view.sample_weight).round()
+        scatter = lambda: px.scatter(
+            binned,
+            x='quantity',
+            y='total_price',
+            color='product_type',
+            size='orders',
+            hover_data=['orders', 'rating'],
+            title=f"Order Quantity vs Total Price (Size = {'≈ ' if is_sample else ''}Orders per Bin)"
+        )
+    else:
+        if scatter_mode == "Stratified sample":
+            completed_orders = stratified_sample(completed_orders, 'product_type', 'total_price',
+                                                 max_points=max_points)
+        scatter_points = completed_orders[['quantity', 'total_price', 'product_type', 'rating', 'customer_id', 'sku']]
+        scatter = lambda: px.scatter(
+            scatter_points,
+            x='quantity',
+            y='total_price',
+            color='product_type',
+            size='rating',
+            hover_data=['customer_id', 'sku'],
+            title='Order Quantity vs Total Price (Size = Rating)' + sample_note
+        )
+    
+    # Revenue heatmap by month and product
+    pivot_data = analytics.revenue_heatmap(completed(view.cube), value='revenue')
+    
+    figures = build_figures(
+        scatter=scatter,
+        heatmap=lambda: px.imshow(
+            pivot_data.values,
+            labels=dict(x="Month", y="Product Type", color="Revenue"),
+            x=pivot_data.columns,
+            y=pivot_data.index,
+            title="Revenue Heatmap: Product Type vs Month"
+        )
+    )
+    show_chart('scatter', figures['scatter'])
+    show_chart('heatmap', figures['heatmap'])
+    
+    # Two-way breakdown of any pair of order dimensions
+    st.subheader("Two-Way Breakdown")
+    dimensions = list(CROSSTAB_DIMENSIONS)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        row_dimension = st.selectbox("Rows", dimensions, index=dimensions.index('age_group'),
+                                     format_func=CROSSTAB_DIMENSIONS.get, key="crosstab_rows")
+    with col2:
+        column_dimension = st.selectbox("Columns", dimensions, index=dimensions.index('payment_method'),
+                                        format_func=CROSSTAB_DIMENSIONS.get, key="crosstab_columns")
+    with col3:
+        measure = st.selectbox("Measure", list(CROSSTAB_MEASURES), key="crosstab_measure")
+    
+    if row_dimension == column_dimension:
+        st.info("Choose two different dimensions.")
+    else:
+        value, grid_name, completed_only = CROSSTAB_MEASURES[measure]
+        grid = view.crosstab(row_dimension, column_dimension, value, completed_only)[grid_name]
+        row_label, column_label = CROSSTAB_DIMENSIONS[row_dimension], CROSSTAB_DIMENSIONS[column_dimension]
+        fig_crosstab = load_figure_cache().figure('crosstab', lambda: px.imshow(
+            grid.values,
+            labels=dict(x=column_label, y=row_label, color=measure),
+            x=grid.columns.astype(str),
+            y=grid.index.astype(str),
+            text_auto='.3s',
+            aspect='auto',
+            title=f"{measure}: {row_label} vs {column_label}"
+        ))
+        show_chart('crosstab', fig_crosstab)
+
+def render_bundling_opportunities(view):
+    """Bundling Opportunities tab: items bought together in the same basket"""
+    st.header("Bundling Opportunities")
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        level = st.selectbox("Bundle Level", ["Product Type", "SKU"])
+    
+    with col2:
+        window_days = st.number_input(
+            "Basket Window (days)",
+            min_value=0,
+            max_value=90,
+            value=0,
+            help="0 = same customer, same day (as in the SQL Q11); N = a customer's consecutive orders "
+                 "no more than N days apart, so a basket can span longer than N days"
+        )
+    
+    with col3:
+        min_count = st.number_input("Minimum Co-purchases", min_value=1, value=DEFAULT_MIN_COUNT)
+    
+    item = 'product_type' if level == "Product Type" else 'sku'
+    pairs = view.co_purchases(item, int(window_days))
+    pairs = pairs[pairs['co_purchase_count'] >= min_count]
+    
+    if pairs.empty:
+        st.info("No item pairs reach the minimum co-purchase count for this selection.")
+        return
+    
+    # Each pair appears in both directions; chart it once
+    top_pairs = pairs[pairs['primary'] < pairs['secondary']].head(15)
+    matrix = co_occurrence_matrix(pairs)
+    figures = build_figures(
+        pairs=lambda: px.bar(
+            x=top_pairs['co_purchase_count'],
+            y=top_pairs['primary'].astype(str) + " + " + top_pairs['secondary'].astype(str),
+            orientation='h',
+            title="Most Frequent Co-purchases",
+            labels={'x': 'Co-purchases', 'y': 'Bundle'}
+        ).update_layout(yaxis={'categoryorder': 'total ascending'}),
+        matrix=lambda: px.imshow(
+            matrix.values,
+            labels=dict(x="Secondary", y="Primary", color="Co-purchases"),
+            x=matrix.columns,
+            y=matrix.index,
+            title="Co-purchase Matrix"
+        )
+    )
+    
+    col4, col5 = st.columns(2)
+    
+    with col4:
+        show_chart('pairs', figures['pairs'])
+    
+    with col5:
+        show_chart('matrix', figures['matrix'])
+    
+    st.subheader("Bundle Candidates")
+    bundle_table = pairs.round({'support': 4, 'confidence': 4, 'lift': 2})
+    bundle_table.columns = ['Primary', 'Secondary', 'Co-purchases', 'Unique Customers',
+                            'Avg Combined Value', 'Baskets', 'Support', 'Confidence', 'Lift']
+    show_table('bundle_table', bundle_table, hide_index=True)
+
+@st.fragment
+def render_custom_calculations(view):
+    """Custom Calculations tab: interactive calculators and data export"""
+    st.header("Custom Calculations")
+    
+    st.subheader("🧮 Interactive Calculator")
+    
+    # Custom calculation options
+    calc_type = st.selectbox(
+        "Select Calculation Type",
+        ["Customer Lifetime Value", "Customer Cohorts", "Product Profitability", "Conversion Rates",
+         "Seasonal Multipliers"]
+    )
+    
+    if calc_type == "Customer Lifetime Value":
+        st.write("**Calculate Customer Lifetime Value (CLV)**")
         
-        # Create additional date features
-        df['year'] = df['purchase_date'].dt.year
-        df['month'] = df['purchase_date'].dt.month
-        df['month_name'] = df['purchase_date'].dt.strftime('%B')
-        df['day_name'] = df['purchase_date'].dt.strftime('%A')
-        df['quarter'] = df['purchase_date'].dt.quarter
+        # CLV calculation
+        clv_summary, customer_metrics = analytics.customer_lifetime_value(view.per_customer)
         
-        # Create age groups
-        df['age_group'] = pd.cut(df['age'], 
-                               bins=[0, 25, 35, 45, 55, 100], 
-                               labels=['18-24', '25-34', '35-44', '45-54', '55+'],
-                               include_lowest=True)
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Average Order Value", f"${clv_summary['avg_order_value']:.2f}")
+        with col2:
+            st.metric("Avg Purchase Frequency", f"{clv_summary['avg_purchase_frequency']:.2f}")
+        with col3:
+            st.metric("Avg Customer Lifespan", f"{clv_summary['avg_customer_lifespan']:.2f} years")
+        with col4:
+            st.metric("Estimated CLV", f"${clv_summary['clv']:.2f}")
+        
+        # CLV distribution
+        total_spent = customer_metrics[['total_spent']]
+        fig_clv = load_figure_cache().figure('clv', lambda: px.histogram(
+            total_spent,
+            x='total_spent',
+            nbins=30,
+            title='Customer Lifetime Value Distribution'
+        ))
+        show_chart('clv', fig_clv)
+    
+    elif calc_type == "Customer Cohorts":
+        st.write("**Acquisition-Month Cohorts**")
+        
+        cohorts = view.cohorts
+        if cohorts['sizes'].empty:
+            st.info("No completed orders in the current selection.")
+        else:
+            cohort_labels = cohorts['retention'].index.astype(str)
+            
+            # Retention heatmap: share of each cohort ordering again N months later
+            retention = cohorts['retention'] * 100
+            fig_retention = load_figure_cache().figure('retention', lambda: px.imshow(
+                retention.values,
+                labels=dict(x="Months Since First Order", y="Cohort", color="Retention (%)"),
+                x=retention.columns,
+                y=cohort_labels,
+                color_continuous_scale='Blues',
+                text_auto='.0f',
+                title="Monthly Retention by Acquisition Cohort (%)"
+            ))
+            show_chart('retention', fig_retention)
+            
+            st.write("**Cumulative Revenue per Customer by Cohort ($):**")
+            revenue_per_customer = cohorts['revenue_per_customer'].round(2)
+            revenue_per_customer.index = cohort_labels
+            revenue_per_customer.insert(0, 'Customers', cohorts['sizes'].values)
+            show_table('revenue_per_customer', revenue_per_customer)
+    
+    elif calc_type == "Product Profitability":
+        st.write("**Product Profitability Analysis**")
         
-        # Create customer value segments based on total spending
-        customer_spending = df.groupby('customer_id')['total_price'].sum().reset_index()
-        customer_spending['value_segment'] = pd.cut(customer_spending['total_price'],
-                                                   bins=[0, 500, 2000, 5000, float('inf')],
-                                                   labels=['Low (<$500)', 'Regular ($500-2K)', 'Medium ($2K-5K)', 'High ($5K+)'],
-                                                   include_lowest=True)
+        # Assume cost percentage for calculation
+        cost_percentage = st.slider("Estimated Cost of Goods Sold (%)", 40, 80, 60) / 100
         
-        # Merge back with main dataframe
-        df = df.merge(customer_spending[['customer_id', 'value_segment']], on='customer_id', how='left')
+        product_profit = analytics.product_profitability(view.per_product, cost_percentage)
         
-        # Create season column
-        df['season'] = df['month'].map({12: 'Winter', 1: 'Winter', 2: 'Winter',
-                                       3: 'Spring', 4: 'Spring', 5: 'Spring',
-                                       6: 'Summer', 7: 'Summer', 8: 'Summer',
-                                       9: 'Fall', 10: 'Fall', 11: 'Fall'})
+        show_table('product_profit', product_profit)
+    
+    elif calc_type == "Conversion Rates":
+        st.write("**Conversion Rate Analysis**")
         
-        return df
-    except Exception as e:
-        st.error(f"Error loading data: {str(e)}")
-        return None
+        conversion_metrics = view.per_product_status
+        
+        conversion_rate = conversion_metrics['conversion_rate']
+        fig_conversion = load_figure_cache().figure('conversion', lambda: px.bar(
+            x=conversion_rate.index,
+            y=conversion_rate.values,
+            title='Conversion Rate by Product Type (%)',
+            labels={'x': 'Product Type', 'y': 'Conversion Rate (%)'}
+        ))
+        show_chart('conversion', fig_conversion)
+        
+        show_table('conversion_metrics', conversion_metrics)
+    
+    elif calc_type == "Seasonal Multipliers":
+        st.write("**Seasonal Performance Multipliers**")
+        
+        # Calculate seasonal multipliers
+        multiplier_df = analytics.seasonal_multipliers(view.per_season())
+        
+        fig_multipliers = load_figure_cache().figure('multipliers', lambda: px.bar(
+            x=multiplier_df['Season'],
+            y=multiplier_df['Multiplier'],
+            title='Seasonal Performance Multipliers (1.0 = Average)',
+            labels={'x': 'Season', 'y': 'Multiplier'}
+        ).add_hline(y=1.0, line_dash="dash", line_color="red", annotation_text="Average"))
+        show_chart('multipliers', fig_multipliers)
+        
+        st.write("**Seasonal Multipliers Table:**")
+        show_table('multipliers', multiplier_df)
+    
+    # Export data section
+    st.markdown("---")
+    st.subheader("📤 Export Filtered Data")
+    
+    export_format = st.selectbox("Export Format", available_formats())
+    
+    # Size the export from a small sample, once per filter and format (the view outlives
+    # fragment reruns); the file itself is only written on download
+    estimate = view.export_estimate(export_format)
+    st.caption(f"{estimate['rows']:,} rows, about {estimate['bytes'] / 2 ** 20:,.1f} MB")
+    
+    extension, mime = EXPORT_FORMATS[export_format]
+    st.download_button(
+        label=f"Download {export_format} file",
+        data=lambda: export_file(view.df, export_format),
+        file_name=f"electronic_sales_filtered_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}",
+        mime=mime,
+        on_click="ignore"
+    )
+
+# Order columns every rerun reads: the sidebar filters and the unique-customers KPI
+BASE_COLUMNS = ['purchase_date', 'order_status', 'product_type', 'payment_method', 'customer_id']
+
+# Dashboard tabs, their renderers and the further order columns each reads (None: every column).
+# A partitioned dataset loads only the open tab's columns.
+TABS = [
+    ("📊 Sales Overview", render_sales_overview, []),
+    ("👥 Customer Analytics", render_customer_analytics,
+     ['age_group', 'gender', 'loyalty_member', 'value_segment', 'rating', 'total_price', 'add_on_total']),
+    ("📱 Product Performance", render_product_performance,
+     ['sku', 'rating', 'quantity', 'total_price', 'add_on_total'] + ADDON_COLUMNS),
+    ("📅 Time Series Analysis", render_time_series, []),
+    ("💰 Revenue Analysis", render_revenue_analysis, list(CROSSTAB_DIMENSIONS) + ['sku', 'quantity', 'total_price']),
+    ("🛍️ Bundling Opportunities", render_bundling_opportunities, ['sku', 'total_price']),
+    ("🧮 Custom Calculations", render_custom_calculations, None),
+]
+
+def tab_columns(label):
+    """Order columns the tab with this label needs, or None for every column"""
+    extra = {name: columns for name, _, columns in TABS}.get(label, TABS[0][2])
+    return None if extra is None else list(dict.fromkeys(BASE_COLUMNS + extra))
 
 def main():
+    # Time this rerun when the developer panel is on or a timings log is configured
+    timings_log = log_path()
+    show_timings = st.session_state.get("dev_timings", False)
+    timer = RerunTimer() if show_timings or timings_log else NULL_TIMER
+    install_timer(timer)
+    
     st.title("📊 Electronic Sales Analytics Dashboard")
     st.markdown("---")
     
-    # Load data
-    df = load_data()
-    
-    if df is None:
-        st.stop()
+    # Load data - a partitioned dataset describes itself from its manifest and loads orders after the filters
+    partitions = partitions_path()
+    version = data_version()
+    if partitions:
+        manifest = load_manifest(partitions, version)
+        if manifest is None:
+            st.stop()
+        profile = dataset_profile(manifest)
+    else:
+        with timer.section('load_data') as record:
+            df = load_data()
+            record['rows_out'] = rows_of(df)
+        
+        if df is None:
+            st.stop()
+        profile = {
+            'rows': len(df),
+            'min_date': df['purchase_date'].min(),
+            'max_date': df['purchase_date'].max(),
+            'values': {col: list(df[col].unique()) for col in FILTER_COLUMNS}
+        }
     
     # Sidebar filters
     st.sidebar.header("🎛️ Dashboard Filters")
@@ -94,43 +811,100 @@ def main():
     # Date range filter
     date_range = st.sidebar.date_input(
         "Select Date Range",
-        value=(df['purchase_date'].min(), df['purchase_date'].max()),
-        min_value=df['purchase_date'].min(),
-        max_value=df['purchase_date'].max()
+        value=(profile['min_date'], profile['max_date']),
+        min_value=profile['min_date'],
+        max_value=profile['max_date']
     )
     
     # Other filters
     selected_status = st.sidebar.multiselect(
         "Order Status", 
-        options=df['order_status'].unique(),
-        default=df['order_status'].unique()
+        options=profile['values']['order_status'],
+        default=profile['values']['order_status']
     )
     
     selected_products = st.sidebar.multiselect(
         "Product Types",
-        options=df['product_type'].unique(),
-        default=df['product_type'].unique()
+        options=profile['values']['product_type'],
+        default=profile['values']['product_type']
     )
     
     selected_payment = st.sidebar.multiselect(
         "Payment Methods",
-        options=df['payment_method'].unique(),
-        default=df['payment_method'].unique()
+        options=profile['values']['payment_method'],
+        default=profile['values']['payment_method']
     )
     
-    # Apply filters
-    if len(date_range) == 2:
-        mask = (df['purchase_date'] >= pd.Timestamp(date_range[0])) & \
-               (df['purchase_date'] <= pd.Timestamp(date_range[1]))
-        filtered_df = df[mask]
+    # Point budget for row-level charts (scatter and daily line)
+    st.sidebar.number_input(
+        "Max Chart Points",
+        min_value=500,
+        max_value=100000,
+        value=DEFAULT_MAX_POINTS,
+        step=500,
+        key="max_chart_points"
+    )
+    
+    st.sidebar.toggle(
+        "≈ Approximate mode",
+        key="approximate",
+        disabled=partitions is not None,
+        help=f"Above {EXACT_MAX_ROWS:,} matching orders, answer distinct customers and order-value "
+             "quantiles from sketches and the row-level charts from a uniform sample"
+             + (" (unavailable for partitioned datasets, which load only the selected months)" if partitions else "")
+    )
+    
+    st.sidebar.toggle("🛠️ Developer timings", key="dev_timings")
+    
+    # Apply filters - the cube answers count/sum views, raw rows back the rest
+    filters = (date_range, selected_status, selected_products, selected_payment)
+    selections = {
+        'order_status': selected_status,
+        'product_type': selected_products,
+        'payment_method': selected_payment
+    }
+    with timer.section('cube_kpis') as record:
+        filtered_cube = apply_filters(load_cube(version), *filters)
+        kpis = cube_kpis(filtered_cube)
+        record['rows_in'] = len(filtered_cube)
+    
+    if partitions:
+        # Only the partitions the date range overlaps, and only the open tab's columns
+        with timer.section('load_data') as record:
+            df = load_data(date_range, tab_columns(st.session_state.get("active_tab")))
+            record['rows_out'] = rows_of(df)
+        
+        if df is None:
+            st.stop()
+        filter_orders = lambda: apply_filters(df, *filters)
     else:
-        filtered_df = df.copy()
+        filter_orders = lambda: df.take(load_filter_index().lookup(date_range, selections))
     
-    filtered_df = filtered_df[
-        (filtered_df['order_status'].isin(selected_status)) &
-        (filtered_df['product_type'].isin(selected_products)) &
-        (filtered_df['payment_method'].isin(selected_payment))
-    ]
+    # Approximate mode only kicks in for large selections; small ones stay exact
+    approximate = (st.session_state.get("approximate", False) and not partitions
+                   and kpis['total_orders'] > EXACT_MAX_ROWS)
+    with timer.section('filter', rows_in=len(df)) as record:
+        filtered_df = filter_orders()
+        record['rows_out'] = len(filtered_df)
+    sample = None
+    if approximate:
+        # Only the row-level charts plot the sample; every aggregate reads the filtered orders
+        with timer.section('sample', rows_in=len(df)) as record:
+            sample = df.take(load_sketches().sample_rows(date_range, selections))
+            record['rows_out'] = len(sample)
+    
+    # Shared per-rerun view: the completed subset and common groupbys are computed once.
+    # Unfiltered, per-customer metrics come straight from the customer dimension.
+    customers = load_customers(version) if kpis['total_orders'] == profile['rows'] else None
+    # Rollups are keyed by product and status; a narrowed payment filter (or a partitioned
+    # dataset, which never holds every order) falls back to the cube
+    timeline = None
+    if not partitions and len(date_range) == 2 and set(selected_payment) == set(profile['values']['payment_method']):
+        timeline = partial(load_rollups().series, start=date_range[0], end=date_range[1],
+                           products=selected_products,
+                           statuses=[s for s in selected_status if s == 'Completed'])
+    view = SalesView(filtered_df, filtered_cube, customers, timer, timeline, sample=sample,
+                     workers=worker_count())
     
     # Key Metrics
     st.header("📈 Key Performance Metrics")
@@ -138,433 +912,65 @@ def main():
     col1, col2, col3, col4, col5 = st.columns(5)
     
     with col1:
-        total_revenue = filtered_df[filtered_df['order_status'] == 'Completed']['total_price'].sum()
+        total_revenue = kpis['total_revenue']
         st.metric("Total Revenue", f"${total_revenue:,.2f}")
     
     with col2:
-        total_orders = len(filtered_df)
+        total_orders = kpis['total_orders']
         st.metric("Total Orders", f"{total_orders:,}")
     
     with col3:
-        unique_customers = filtered_df['customer_id'].nunique()
-        st.metric("Unique Customers", f"{unique_customers:,}")
+        # Distinct counts don't aggregate: raw rows, or mergeable HyperLogLog sketches at scale
+        if approximate:
+            with timer.section('sketch unique_customers', kind='aggregate'):
+                unique_customers = load_sketches().unique_customers(date_range, selections)
+            st.metric("Unique Customers", f"≈{unique_customers['estimate']:,.0f}",
+                      help=f"95% interval {unique_customers['low']:,.0f} – {unique_customers['high']:,.0f}")
+        else:
+            unique_customers = view.unique_customers
+            st.metric("Unique Customers", f"{unique_customers:,}")
     
     with col4:
-        avg_order_value = filtered_df[filtered_df['order_status'] == 'Completed']['total_price'].mean()
+        avg_order_value = kpis['avg_order_value']
         st.metric("Avg Order Value", f"${avg_order_value:.2f}")
     
     with col5:
-        completion_rate = (filtered_df['order_status'] == 'Completed').mean() * 100
+        completion_rate = kpis['completion_rate']
         st.metric("Completion Rate", f"{completion_rate:.1f}%")
     
+    if approximate:
+        sketches = load_sketches()
+        with timer.section('sketch order_value_quantiles', kind='aggregate'):
+            quantiles = sketches.order_value_quantiles(date_range, {
+                **selections, 'order_status': [s for s in selected_status if s == 'Completed']
+            })
+        st.caption(
+            f"≈ Approximate mode: completed order value median ≈ ${quantiles[0.5]:,.2f}, "
+            f"90th percentile ≈ ${quantiles[0.9]:,.2f} (±{sketches.accuracy:.0%}). Unique customers and "
+            f"these quantiles are estimates; every other figure is exact. The quantity vs price scatter "
+            f"plots a uniform sample of {len(sample):,} of {kpis['total_orders']:,} orders."
+        )
+    
     st.markdown("---")
     
     # Main dashboard tabs
-    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
-        "📊 Sales Overview", 
-        "👥 Customer Analytics", 
-        "📱 Product Performance", 
-        "📅 Time Series Analysis",
-        "💰 Revenue Analysis",
-        "🧮 Custom Calculations"
-    ])
-    
-    with tab1:
-        st.header("Sales Overview")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # Order status distribution
-            status_counts = filtered_df['order_status'].value_counts()
-            fig_status = px.pie(
-                values=status_counts.values,
-                names=status_counts.index,
-                title="Order Status Distribution",
-                color_discrete_map={'Completed': '#2E8B57', 'Cancelled': '#DC143C'}
-            )
-            st.plotly_chart(fig_status, use_container_width=True)
-        
-        with col2:
-            # Payment method distribution
-            payment_counts = filtered_df['payment_method'].value_counts()
-            fig_payment = px.bar(
-                x=payment_counts.values,
-                y=payment_counts.index,
-                orientation='h',
-                title="Payment Method Distribution",
-                labels={'x': 'Number of Orders', 'y': 'Payment Method'}
-            )
-            fig_payment.update_layout(yaxis={'categoryorder': 'total ascending'})
-            st.plotly_chart(fig_payment, use_container_width=True)
-        
-        # Product type performance
-        product_summary = filtered_df.groupby('product_type').agg({
-            'total_price': ['sum', 'mean', 'count'],
-            'rating': 'mean'
-        }).round(2)
-        
-        product_summary.columns = ['Total Revenue', 'Avg Order Value', 'Order Count', 'Avg Rating']
-        product_summary = product_summary.sort_values('Total Revenue', ascending=False)
-        
-        st.subheader("Product Type Performance")
-        st.dataframe(product_summary, use_container_width=True)
+    tabs = st.tabs([label for label, _, _ in TABS], key="active_tab", on_change="rerun")
     
-    with tab2:
-        st.header("Customer Analytics")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # Customer age distribution
-            age_dist = filtered_df['age_group'].value_counts()
-            fig_age = px.bar(
-                x=age_dist.index,
-                y=age_dist.values,
-                title="Customer Age Distribution",
-                labels={'x': 'Age Group', 'y': 'Number of Customers'}
-            )
-            st.plotly_chart(fig_age, use_container_width=True)
-        
-        with col2:
-            # Gender distribution
-            gender_dist = filtered_df['gender'].value_counts()
-            fig_gender = px.pie(
-                values=gender_dist.values,
-                names=gender_dist.index,
-                title="Gender Distribution"
-            )
-            st.plotly_chart(fig_gender, use_container_width=True)
-        
-        col3, col4 = st.columns(2)
-        
-        with col3:
-            # Loyalty member analysis
-            loyalty_analysis = filtered_df.groupby('loyalty_member').agg({
-                'total_price': 'mean',
-                'add_on_total': 'mean',
-                'rating': 'mean'
-            }).round(2)
-            
-            st.subheader("Loyalty Member Analysis")
-            st.dataframe(loyalty_analysis, use_container_width=True)
-        
-        with col4:
-            # Customer value segments
-            value_segments = filtered_df['value_segment'].value_counts()
-            fig_segments = px.bar(
-                x=value_segments.values,
-                y=value_segments.index,
-                orientation='h',
-                title="Customer Value Segments"
-            )
-            st.plotly_chart(fig_segments, use_container_width=True)
-        
-        # Top customers table
-        st.subheader("Top 10 Customers by Revenue")
-        top_customers = filtered_df[filtered_df['order_status'] == 'Completed'].groupby('customer_id').agg({
-            'total_price': ['sum', 'mean', 'count'],
-            'rating': 'mean'
-        }).round(2)
-        
-        top_customers.columns = ['Total Spent', 'Avg Order Value', 'Order Count', 'Avg Rating']
-        top_customers = top_customers.sort_values('Total Spent', ascending=False).head(10)
-        st.dataframe(top_customers, use_container_width=True)
+    # Only the open tab runs its analytics; switching tabs triggers a rerun
+    for tab, (_, render, _) in zip(tabs, TABS):
+        if tab.open:
+            with tab, timer.section(f"tab {render.__name__[len('render_'):]}", rows_in=len(filtered_df), kind='tab'):
+                render(view)
     
-    with tab3:
-        st.header("Product Performance")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # Best selling products by revenue
-            product_revenue = filtered_df[filtered_df['order_status'] == 'Completed'].groupby('product_type')['total_price'].sum().sort_values(ascending=False)
-            fig_product_revenue = px.bar(
-                x=product_revenue.values,
-                y=product_revenue.index,
-                orientation='h',
-                title="Revenue by Product Type",
-                labels={'x': 'Total Revenue ($)', 'y': 'Product Type'}
-            )
-            st.plotly_chart(fig_product_revenue, use_container_width=True)
-        
-        with col2:
-            # Product ratings distribution
-            rating_dist = filtered_df.dropna(subset=['rating'])['rating'].value_counts().sort_index()
-            fig_rating = px.bar(
-                x=rating_dist.index,
-                y=rating_dist.values,
-                title="Product Ratings Distribution",
-                labels={'x': 'Rating', 'y': 'Number of Reviews'}
-            )
-            st.plotly_chart(fig_rating, use_container_width=True)
-        
-        # SKU performance table
-        st.subheader("Top 15 SKUs by Performance")
-        sku_performance = filtered_df[filtered_df['order_status'] == 'Completed'].groupby(['sku', 'product_type']).agg({
-            'total_price': ['sum', 'mean', 'count'],
-            'rating': 'mean',
-            'quantity': 'sum'
-        }).round(2)
-        
-        sku_performance.columns = ['Total Revenue', 'Avg Order Value', 'Order Count', 'Avg Rating', 'Units Sold']
-        sku_performance = sku_performance.sort_values('Total Revenue', ascending=False).head(15)
-        st.dataframe(sku_performance, use_container_width=True)
-        
-        # Add-on analysis
-        st.subheader("Add-on Performance Analysis")
-        addon_analysis = filtered_df.groupby('product_type').agg({
-            'add_on_total': ['mean', lambda x: (x > 0).mean() * 100]
-        }).round(2)
-        
-        addon_analysis.columns = ['Avg Add-on Value', 'Add-on Attachment Rate (%)']
-        st.dataframe(addon_analysis, use_container_width=True)
-    
-    with tab4:
-        st.header("Time Series Analysis")
-        
-        # Monthly sales trend
-        monthly_sales = filtered_df[filtered_df['order_status'] == 'Completed'].groupby(
-            filtered_df['purchase_date'].dt.to_period('M')
-        )['total_price'].sum().reset_index()
-        monthly_sales['purchase_date'] = monthly_sales['purchase_date'].dt.to_timestamp()
-        
-        fig_monthly = px.line(
-            monthly_sales,
-            x='purchase_date',
-            y='total_price',
-            title='Monthly Revenue Trend',
-            labels={'purchase_date': 'Month', 'total_price': 'Revenue ($)'}
-        )
-        st.plotly_chart(fig_monthly, use_container_width=True)
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # Seasonal analysis
-            seasonal_sales = filtered_df[filtered_df['order_status'] == 'Completed'].groupby('season')['total_price'].sum()
-            fig_seasonal = px.bar(
-                x=seasonal_sales.index,
-                y=seasonal_sales.values,
-                title="Revenue by Season",
-                labels={'x': 'Season', 'y': 'Total Revenue ($)'}
-            )
-            st.plotly_chart(fig_seasonal, use_container_width=True)
-        
-        with col2:
-            # Day of week analysis
-            dow_sales = filtered_df[filtered_df['order_status'] == 'Completed'].groupby('day_name')['total_price'].mean()
-            # Reorder days of week
-            day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-            dow_sales = dow_sales.reindex([day for day in day_order if day in dow_sales.index])
-            
-            fig_dow = px.bar(
-                x=dow_sales.index,
-                y=dow_sales.values,
-                title="Average Order Value by Day of Week",
-                labels={'x': 'Day of Week', 'y': 'Average Order Value ($)'}
-            )
-            st.plotly_chart(fig_dow, use_container_width=True)
-        
-        # Daily sales pattern
-        daily_sales = filtered_df[filtered_df['order_status'] == 'Completed'].groupby('purchase_date')['total_price'].sum()
-        
-        fig_daily = px.line(
-            x=daily_sales.index,
-            y=daily_sales.values,
-            title='Daily Revenue Pattern',
-            labels={'x': 'Date', 'y': 'Daily Revenue ($)'}
-        )
-        st.plotly_chart(fig_daily, use_container_width=True)
-    
-    with tab5:
-        st.header("Revenue Analysis")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # Revenue by shipping type
-            shipping_revenue = filtered_df[filtered_df['order_status'] == 'Completed'].groupby('shipping_type').agg({
-                'total_price': ['sum', 'mean', 'count']
-            }).round(2)
-            shipping_revenue.columns = ['Total Revenue', 'Avg Order Value', 'Order Count']
-            
-            st.subheader("Revenue by Shipping Type")
-            st.dataframe(shipping_revenue, use_container_width=True)
-        
-        with col2:
-            # Revenue contribution by customer segment
-            segment_revenue = filtered_df[filtered_df['order_status'] == 'Completed'].groupby('value_segment')['total_price'].sum()
-            fig_segment_revenue = px.pie(
-                values=segment_revenue.values,
-                names=segment_revenue.index,
-                title="Revenue Contribution by Customer Segment"
-            )
-            st.plotly_chart(fig_segment_revenue, use_container_width=True)
-        
-        # Quantity vs Price analysis
-        st.subheader("Quantity vs Price Analysis")
-        
-        # Create scatter plot
-        completed_orders = filtered_df[filtered_df['order_status'] == 'Completed']
-        fig_scatter = px.scatter(
-            completed_orders,
-            x='quantity',
-            y='total_price',
-            color='product_type',
-            size='rating',
-            hover_data=['customer_id', 'sku'],
-            title='Order Quantity vs Total Price (Size = Rating)'
-        )
-        st.plotly_chart(fig_scatter, use_container_width=True)
-        
-        # Revenue heatmap by month and product
-        pivot_data = filtered_df[filtered_df['order_status'] == 'Completed'].pivot_table(
-            values='total_price',
-            index='product_type',
-            columns='month_name',
-            aggfunc='sum',
-            fill_value=0
-        )
-        
-        # Reorder months
-        month_order = ['September', 'October', 'November', 'December', 'January', 'February', 
-                      'March', 'April', 'May', 'June', 'July', 'August']
-        pivot_data = pivot_data.reindex(columns=[m for m in month_order if m in pivot_data.columns])
-        
-        fig_heatmap = px.imshow(
-            pivot_data.values,
-            labels=dict(x="Month", y="Product Type", color="Revenue"),
-            x=pivot_data.columns,
-            y=pivot_data.index,
-            title="Revenue Heatmap: Product Type vs Month"
-        )
-        st.plotly_chart(fig_heatmap, use_container_width=True)
+    st.sidebar.caption(f"Row scans this rerun: {view.scan_count}")
     
-    with tab6:
-        st.header("Custom Calculations")
-        
-        st.subheader("🧮 Interactive Calculator")
-        
-        # Custom calculation options
-        calc_type = st.selectbox(
-            "Select Calculation Type",
-            ["Customer Lifetime Value", "Product Profitability", "Conversion Rates", "Seasonal Multipliers"]
-        )
-        
-        if calc_type == "Customer Lifetime Value":
-            st.write("**Calculate Customer Lifetime Value (CLV)**")
-            
-            # CLV calculation
-            customer_metrics = filtered_df[filtered_df['order_status'] == 'Completed'].groupby('customer_id').agg({
-                'total_price': ['sum', 'mean', 'count'],
-                'purchase_date': ['min', 'max']
-            })
-            
-            customer_metrics.columns = ['total_spent', 'avg_order_value', 'order_count', 'first_purchase', 'last_purchase']
-            customer_metrics['customer_lifespan_days'] = (customer_metrics['last_purchase'] - customer_metrics['first_purchase']).dt.days
-            customer_metrics['customer_lifespan_days'] = customer_metrics['customer_lifespan_days'].fillna(0)
-            
-            # Calculate CLV metrics
-            avg_order_value = customer_metrics['avg_order_value'].mean()
-            avg_purchase_frequency = customer_metrics['order_count'].mean()
-            avg_customer_lifespan = customer_metrics['customer_lifespan_days'].mean() / 365  # in years
-            
-            clv = avg_order_value * avg_purchase_frequency * avg_customer_lifespan
-            
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric("Average Order Value", f"${avg_order_value:.2f}")
-            with col2:
-                st.metric("Avg Purchase Frequency", f"{avg_purchase_frequency:.2f}")
-            with col3:
-                st.metric("Avg Customer Lifespan", f"{avg_customer_lifespan:.2f} years")
-            with col4:
-                st.metric("Estimated CLV", f"${clv:.2f}")
-            
-            # CLV distribution
-            fig_clv = px.histogram(
-                customer_metrics,
-                x='total_spent',
-                nbins=30,
-                title='Customer Lifetime Value Distribution'
-            )
-            st.plotly_chart(fig_clv, use_container_width=True)
-        
-        elif calc_type == "Product Profitability":
-            st.write("**Product Profitability Analysis**")
-            
-            # Assume cost percentage for calculation
-            cost_percentage = st.slider("Estimated Cost of Goods Sold (%)", 40, 80, 60) / 100
-            
-            product_profit = filtered_df[filtered_df['order_status'] == 'Completed'].groupby('product_type').agg({
-                'total_price': 'sum',
-                'quantity': 'sum'
-            })
-            
-            product_profit['estimated_cost'] = product_profit['total_price'] * cost_percentage
-            product_profit['gross_profit'] = product_profit['total_price'] - product_profit['estimated_cost']
-            product_profit['profit_margin'] = (product_profit['gross_profit'] / product_profit['total_price'] * 100).round(2)
-            
-            st.dataframe(product_profit, use_container_width=True)
-        
-        elif calc_type == "Conversion Rates":
-            st.write("**Conversion Rate Analysis**")
-            
-            conversion_metrics = filtered_df.groupby('product_type').agg({
-                'order_status': [lambda x: (x == 'Completed').sum(), 'count']
-            })
-            
-            conversion_metrics.columns = ['completed_orders', 'total_orders']
-            conversion_metrics['conversion_rate'] = (conversion_metrics['completed_orders'] / conversion_metrics['total_orders'] * 100).round(2)
-            
-            fig_conversion = px.bar(
-                x=conversion_metrics.index,
-                y=conversion_metrics['conversion_rate'],
-                title='Conversion Rate by Product Type (%)',
-                labels={'x': 'Product Type', 'y': 'Conversion Rate (%)'}
-            )
-            st.plotly_chart(fig_conversion, use_container_width=True)
-            
-            st.dataframe(conversion_metrics, use_container_width=True)
-        
-        elif calc_type == "Seasonal Multipliers":
-            st.write("**Seasonal Performance Multipliers**")
-            
-            # Calculate seasonal multipliers
-            overall_avg = filtered_df[filtered_df['order_status'] == 'Completed']['total_price'].mean()
-            seasonal_avg = filtered_df[filtered_df['order_status'] == 'Completed'].groupby('season')['total_price'].mean()
-            seasonal_multipliers = (seasonal_avg / overall_avg).round(2)
-            
-            fig_multipliers = px.bar(
-                x=seasonal_multipliers.index,
-                y=seasonal_multipliers.values,
-                title='Seasonal Performance Multipliers (1.0 = Average)',
-                labels={'x': 'Season', 'y': 'Multiplier'}
-            )
-            fig_multipliers.add_hline(y=1.0, line_dash="dash", line_color="red", annotation_text="Average")
-            st.plotly_chart(fig_multipliers, use_container_width=True)
-            
-            st.write("**Seasonal Multipliers Table:**")
-            multiplier_df = pd.DataFrame({
-                'Season': seasonal_multipliers.index,
-                'Multiplier': seasonal_multipliers.values,
-                'Performance': ['Above Average' if x > 1.0 else 'Below Average' for x in seasonal_multipliers.values]
-            })
-            st.dataframe(multiplier_df, use_container_width=True)
-        
-        # Export data section
-        st.markdown("---")
-        st.subheader("📤 Export Filtered Data")
-        
-        if st.button("Export Current View to CSV"):
-            csv = filtered_df.to_csv(index=False)
-            st.download_button(
-                label="Download CSV file",
-                data=csv,
-                file_name=f"electronic_sales_filtered_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                mime="text/csv"
-            )
+    if timer.enabled:
+        stats = load_section_stats()
+        stats.add(timer.records)
+        if timings_log:
+            append_log(timings_log, timer, tab=st.session_state.get("active_tab"), rows=len(filtered_df))
+        if show_timings:
+            render_timing_panel(timer, stats)
     
     # Footer
     st.markdown("---")
@@ -0,0 +1,74 @@
+"""Exact-match checks behind the analytics' fast paths, on the bundled CSV
+
+Sharded customer and SKU aggregations must equal the serial groupbys bit for
+bit, float sums included, and the bincount cross-tab must match pandas.
+Shards are normally at least parallel_agg.MIN_SHARD_ROWS rows, so the tests
+lower that limit to shard the 20k orders across several worker processes.
+
+Usage:
+    python -m pytest test_analytics.py
+"""
+import pandas as pd
+import pytest
+
+import parallel_agg
+import sales_analytics as analytics
+from benchmark_analytics import identical
+from crosstab import CROSSTAB_DIMENSIONS, crosstab
+from customer_dimension import CustomerDimension
+from sales_data import DATA_FILE, prepare_sales_data, read_sales_csv
+
+WORKERS = 4
+
+
+@pytest.fixture(scope='module')
+def raw():
+    return read_sales_csv(DATA_FILE)
+
+
+@pytest.fixture(scope='module')
+def orders(raw):
+    return prepare_sales_data(raw)
+
+
+@pytest.fixture
+def small_shards(monkeypatch):
+    monkeypatch.setattr(parallel_agg, 'MIN_SHARD_ROWS', 1000)
+
+
+def test_customer_metrics_sharded_matches_serial(orders, small_shards):
+    completed = analytics.completed_orders(orders)
+    assert parallel_agg.shard_workers(completed, analytics.CUSTOMER_METRIC_COLUMNS, WORKERS) == WORKERS
+    assert identical(analytics.customer_metrics(completed), analytics.customer_metrics(completed, WORKERS))
+
+
+def test_sku_performance_sharded_matches_serial(orders, small_shards):
+    completed = analytics.completed_orders(orders)
+    assert parallel_agg.shard_workers(completed, analytics.SKU_COLUMNS, WORKERS) == WORKERS
+    assert identical(analytics.sku_performance(completed), analytics.sku_performance(completed, workers=WORKERS))
+
+
+def test_customer_dimension_sharded_matches_serial(raw, small_shards):
+    serial = CustomerDimension.from_orders(raw).fields
+    assert identical(serial, CustomerDimension.from_orders(raw, WORKERS).fields)
+
+
+@pytest.mark.parametrize('rows, columns', [
+    ('age_group', 'payment_method'),
+    ('product_type', 'rating'),
+    ('value_segment', 'day_name'),
+    ('rating', 'order_status'),
+])
+def test_crosstab_matches_pandas(orders, rows, columns):
+    assert rows in CROSSTAB_DIMENSIONS and columns in CROSSTAB_DIMENSIONS
+    grids = crosstab(orders, rows, columns, value='total_price')
+    grouped = orders.groupby([rows, columns], observed=True)['total_price']
+    expected = {
+        'count': grouped.size().unstack(fill_value=0),
+        'sum': grouped.sum().unstack(fill_value=0.0),
+        'mean': grouped.mean().unstack(),
+    }
+    for name, frame in expected.items():
+        # Counts are exact; bincount sums rows in order where pandas compensates, so floats agree to rounding
+        pd.testing.assert_frame_equal(grids[name], frame, check_exact=name == 'count', rtol=1e-12,
+                                      check_dtype=False, check_index_type=False, check_column_type=False)